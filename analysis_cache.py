@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Analysis Cache
+Memoizes the signal of each ticker on disk, keyed on a hash of its price and
+volume history and of the scoring rules, so that unchanged tickers (weekends,
+holidays, halted lines) are not re-analyzed
+
+The cache is one JSON file whose entries are kept in least-recently-used
+order and evicted beyond MAX_ENTRIES when it is saved.
+
+Usage:
+    python analysis_cache.py stats <cache.json>
+    python analysis_cache.py invalidate <cache.json> [TICKER ...]   # all tickers when none given
+"""
+
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sys
+
+import numpy as np
+
+from signal_scoring import DEFAULT_SCORING_PARAMS
+
+# 2: signals carry their full-precision indicator_values
+CACHE_VERSION = 2
+MAX_ENTRIES = 10000
+
+# Modules whose code determines the indicators and signals stored in the cache
+SCORING_MODULES = ('batch_indicators', 'extended_indicators', 'indicator_graph', 'indicator_kernels',
+                   'indicator_state', 'signal_scoring', 'timeframes')
+
+def scoring_fingerprint(signal_function, params=None):
+    """Hash the scoring parameters and the source of the indicator and signal code
+
+    The source files of SCORING_MODULES and of the module defining the
+    signal function are hashed, so editing generate_signal, its thresholds
+    or any indicator computation changes the fingerprint and signals scored
+    by the old code are never served.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params or DEFAULT_SCORING_PARAMS, sort_keys=True).encode())
+
+    source_files = [importlib.import_module(name).__file__ for name in SCORING_MODULES]
+    source_files.append(inspect.getsourcefile(signal_function))
+    for source_file in source_files:
+        with open(source_file, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def analysis_key(ticker, company_name, prices, volumes, fingerprint, highs=None, lows=None):
+    """Return the cache key of a ticker's analysis (highs and lows included when given)"""
+    digest = hashlib.sha256()
+    digest.update(f"{ticker}\0{company_name}\0{fingerprint}\0".encode())
+    digest.update(np.ascontiguousarray(prices, dtype=float).tobytes())
+    digest.update(b'\0')
+    digest.update(np.ascontiguousarray(volumes, dtype=float).tobytes())
+    for column in (highs, lows):
+        if column is not None:
+            digest.update(b'\0')
+            digest.update(np.ascontiguousarray(column, dtype=float).tobytes())
+    return digest.hexdigest()
+
+def new_analysis_cache(fingerprint, entries=None):
+    """Return an in-memory cache (entries in least-recently-used order)"""
+    return {
+        'fingerprint': fingerprint,
+        'entries': entries if entries is not None else {},
+        'hits': 0,
+        'misses': 0,
+    }
+
+def _read_entries(cache_file):
+    """Read the cache entries, or an empty dict when missing or outdated"""
+    if not os.path.exists(cache_file):
+        return {}
+
+    try:
+        with open(cache_file, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"  WARNING: Could not read analysis cache ({e}), starting empty")
+        return {}
+
+    if data.get('version') != CACHE_VERSION:
+        return {}
+
+    return data.get('entries', {})
+
+def _write_entries(cache_file, entries):
+    """Write the cache entries atomically"""
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'entries': entries}, f)
+    os.replace(tmp_file, cache_file)
+
+def load_analysis_cache(cache_file, fingerprint):
+    """Load the analysis cache of `cache_file`"""
+    return new_analysis_cache(fingerprint, _read_entries(cache_file))
+
+def save_analysis_cache(cache_file, cache, max_entries=MAX_ENTRIES):
+    """Evict the least recently used entries beyond `max_entries` and save the cache"""
+    entries = cache['entries']
+    for key in list(entries)[:max(0, len(entries) - max_entries)]:
+        del entries[key]
+    _write_entries(cache_file, entries)
+
+def cache_lookup(cache, key):
+    """Return the cached signal for `key` (marking it recently used), or None"""
+    entry = cache['entries'].pop(key, None)
+    if entry is None:
+        cache['misses'] += 1
+        return None
+
+    cache['entries'][key] = entry
+    cache['hits'] += 1
+    return entry['signal']
+
+def cache_store(cache, key, ticker, signal):
+    """Store the signal of a ticker as the most recently used entry"""
+    cache['entries'].pop(key, None)
+    cache['entries'][key] = {'ticker': ticker, 'signal': signal}
+
+def cache_slice(cache, tickers):
+    """Return a cache holding only the entries of `tickers` (for a worker chunk)"""
+    tickers = set(tickers)
+    return new_analysis_cache(cache['fingerprint'], {
+        key: entry for key, entry in cache['entries'].items() if entry['ticker'] in tickers})
+
+def merge_cache(cache, chunk_cache):
+    """Merge a worker's cache back: its entries become the most recently used"""
+    for key, entry in chunk_cache['entries'].items():
+        cache['entries'].pop(key, None)
+        cache['entries'][key] = entry
+    cache['hits'] += chunk_cache['hits']
+    cache['misses'] += chunk_cache['misses']
+
+def hit_rate(cache):
+    """Return the fraction of lookups served from the cache (0 without lookups)"""
+    lookups = cache['hits'] + cache['misses']
+    return cache['hits'] / lookups if lookups else 0.0
+
+def invalidate(cache_file, tickers=None):
+    """Drop the cached signals of `tickers` (all of them when None)
+
+    Returns the number of entries removed.
+    """
+    entries = _read_entries(cache_file)
+    if tickers is None:
+        kept = {}
+    else:
+        tickers = set(tickers)
+        kept = {key: entry for key, entry in entries.items() if entry['ticker'] not in tickers}
+
+    _write_entries(cache_file, kept)
+    return len(entries) - len(kept)
+
+def main():
+    """Main execution"""
+    if len(sys.argv) < 3 or sys.argv[1] not in ('stats', 'invalidate'):
+        print(__doc__)
+        sys.exit(1)
+
+    command, cache_file = sys.argv[1], sys.argv[2]
+
+    if command == 'stats':
+        entries = _read_entries(cache_file)
+        tickers = {entry['ticker'] for entry in entries.values()}
+        size = os.path.getsize(cache_file) if os.path.exists(cache_file) else 0
+        print(f"{cache_file}: {len(entries)} entries for {len(tickers)} tickers "
+              f"({size / 1024:.1f} KB, max {MAX_ENTRIES} entries)")
+    else:
+        tickers = sys.argv[3:] or None
+        removed = invalidate(cache_file, tickers)
+        print(f"Removed {removed} cached signals "
+              f"({'all tickers' if tickers is None else ', '.join(tickers)})")
+
+if __name__ == "__main__":
+    main()
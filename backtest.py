@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Vectorized Backtesting Engine
+Replays the generate_signal rule set on every historical day of every
+ticker in the price store and measures how its targets played out
+
+For each signal the engine checks, over the following trading days, whether
+the short-term (+/-5%) and medium-term (+/-10%) targets emitted by
+generate_signal were reached before its stop-loss (-/+5%), on closing
+prices. Results are grouped by signal type and confidence bucket.
+
+Usage:
+    python backtest.py [--store DIR] [--horizon DAYS] [--output FILE]
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from batch_indicators import build_price_matrix, compute_indicator_series
+from price_store import open_price_store, read_ticker, store_exists
+from signal_scoring import BUY, SELL, SIGNAL_NAMES, score_signals
+
+HORIZON = 20
+CONFIDENCE_BUCKETS = (0, 40, 60, 80, 101)
+CHUNK_ROWS = 256
+
+SCORE_INPUTS = ('current_price', 'rsi', 'macd', 'macd_signal', 'macd_histogram',
+                'ma20', 'ma50', 'ma200', 'volume_ratio')
+
+def load_store_matrix(store_dir, tickers=None):
+    """Load tickers from the price store into right-aligned price/volume matrices"""
+    store = open_price_store(store_dir)
+    if tickers is None:
+        tickers = sorted(store['index'])
+
+    loaded = []
+    market_data_list = []
+    for ticker in tickers:
+        columns = read_ticker(store, ticker)
+        if columns is None or len(columns[0]) == 0:
+            continue
+        loaded.append(ticker)
+        market_data_list.append({'prices': columns[0], 'volumes': columns[1]})
+
+    prices, volumes, lengths = build_price_matrix(market_data_list)
+    return loaded, prices, volumes, lengths
+
+def first_hit_days(prices, horizon):
+    """Find, for every day, the first day within the horizon each level is hit
+
+    Levels are closes at >= +5%, >= +10%, <= -5% and <= -10% of the day's
+    close. Returns a dict of int16 arrays (horizon + 1 when never hit), the
+    direction-free forward return at the horizon and the mask of days with a
+    complete forward window. Raises ValueError when horizon < 1.
+    """
+    if horizon < 1:
+        raise ValueError(f"Horizon must be at least 1 day (got {horizon})")
+
+    n_rows, n_days = prices.shape
+    never = np.int16(horizon + 1)
+    hits = {level: np.full((n_rows, n_days), never, dtype=np.int16)
+            for level in ('up5', 'up10', 'down5', 'down10')}
+
+    forward_return = np.full((n_rows, n_days), np.nan)
+    complete = np.zeros((n_rows, n_days), dtype=bool)
+    if n_days <= horizon:
+        return hits, forward_return, complete
+
+    base = prices[:, :n_days-horizon]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for k in range(1, horizon + 1):
+            ratio = prices[:, k:n_days-horizon+k] / base
+            for level, reached in (('up5', ratio >= 1.05), ('up10', ratio >= 1.10),
+                                   ('down5', ratio <= 0.95), ('down10', ratio <= 0.90)):
+                first = hits[level][:, :n_days-horizon]
+                first[reached & (first == never)] = k
+        forward_return[:, :n_days-horizon] = ratio - 1
+
+    complete[:, :n_days-horizon] = ~np.isnan(forward_return[:, :n_days-horizon])
+
+    return hits, forward_return, complete
+
+def signal_outcomes(signal_type, hits, forward_return):
+    """Score each signal day against the targets generate_signal emits
+
+    BUY: +5% / +10% targets, -5% stop. SELL: -5% / -10% targets, +5% stop.
+    A target counts as hit when it is reached before the stop; `stopped`
+    means the stop came before the first target. Returns the three masks and
+    the forward return in the signal's direction (raw for watch/neutral).
+    """
+    is_buy = signal_type == BUY
+    is_sell = signal_type == SELL
+
+    directional = is_buy | is_sell
+    short_target = np.where(is_buy, hits['up5'], hits['down5'])
+    medium_target = np.where(is_buy, hits['up10'], hits['down10'])
+    stop = np.where(is_buy, hits['down5'], hits['up5'])
+
+    # Levels never reached hold horizon + 1, so they never compare as earlier
+    hit_short = directional & (short_target < stop)
+    hit_medium = directional & (medium_target < stop)
+    stopped = directional & (stop < short_target)
+    directed_return = np.where(is_sell, -forward_return, forward_return)
+
+    return hit_short, hit_medium, stopped, directed_return
+
+def confidence_bucket(confidence_score):
+    """Map confidence scores to CONFIDENCE_BUCKETS indices"""
+    return np.searchsorted(CONFIDENCE_BUCKETS, confidence_score, side='right') - 1
+
+def new_totals():
+    """Return empty accumulators for (signal type x confidence bucket) groups"""
+    shape = (len(SIGNAL_NAMES), len(CONFIDENCE_BUCKETS) - 1)
+    return {name: np.zeros(shape) for name in ('count', 'hit_short', 'hit_medium', 'stopped', 'return_sum')}
+
+def accumulate(totals, scores, hits, forward_return, mask):
+    """Add one chunk of scored days to the group totals"""
+    hit_short, hit_medium, stopped, directed_return = signal_outcomes(
+        scores['signal_type'], hits, forward_return)
+
+    n_buckets = len(CONFIDENCE_BUCKETS) - 1
+    group = (scores['signal_type'].astype(np.int64) * n_buckets
+             + confidence_bucket(scores['confidence_score']))[mask]
+    size = len(SIGNAL_NAMES) * n_buckets
+
+    shape = totals['count'].shape
+    totals['count'] += np.bincount(group, minlength=size).reshape(shape)
+    totals['hit_short'] += np.bincount(group, hit_short[mask], minlength=size).reshape(shape)
+    totals['hit_medium'] += np.bincount(group, hit_medium[mask], minlength=size).reshape(shape)
+    totals['stopped'] += np.bincount(group, stopped[mask], minlength=size).reshape(shape)
+    totals['return_sum'] += np.bincount(group, directed_return[mask], minlength=size).reshape(shape)
+
+def summarize(totals):
+    """Turn group totals into report rows with rates and average returns"""
+    rows = []
+    for type_code, signal_name in enumerate(SIGNAL_NAMES):
+        for bucket in range(len(CONFIDENCE_BUCKETS) - 1):
+            count = int(totals['count'][type_code, bucket])
+            if count == 0:
+                continue
+            directional = type_code in (BUY, SELL)
+            rows.append({
+                'signal_type': signal_name,
+                'confidence': f"{CONFIDENCE_BUCKETS[bucket]}-{CONFIDENCE_BUCKETS[bucket+1]-1}",
+                'count': count,
+                'hit_rate_short': totals['hit_short'][type_code, bucket] / count if directional else None,
+                'hit_rate_medium': totals['hit_medium'][type_code, bucket] / count if directional else None,
+                'stop_rate': totals['stopped'][type_code, bucket] / count if directional else None,
+                'avg_return': totals['return_sum'][type_code, bucket] / count,
+            })
+    return rows
+
+def score_series(series, rows=slice(None), score_fn=score_signals):
+    """Score every day of the given rows of an indicator series dict"""
+    return score_fn(*(series[name][rows] for name in SCORE_INPUTS))
+
+def run_backtest(prices, volumes, lengths, horizon=HORIZON):
+    """Backtest the generate_signal rules on full indicator series
+
+    Rows are processed in chunks to bound memory; each chunk computes its
+    indicator series once and scores all of its days in one call.
+    """
+    totals = new_totals()
+
+    for first in range(0, prices.shape[0], CHUNK_ROWS):
+        rows = slice(first, first + CHUNK_ROWS)
+        series = compute_indicator_series(prices[rows], volumes[rows], lengths[rows])
+        scores = score_series(series)
+        hits, forward_return, complete = first_hit_days(prices[rows], horizon)
+        accumulate(totals, scores, hits, forward_return, complete & series['valid'])
+
+    return summarize(totals)
+
+def format_rate(value):
+    """Format a rate as a percentage, or '-' when not applicable"""
+    return '-' if value is None else f"{value:.1%}"
+
+def print_report(rows, horizon):
+    """Print the backtest table"""
+    print(f"\n{'Signal':<8} {'Confidence':<11} {'Count':>9} {'Hit +5%':>8} {'Hit +10%':>9} "
+          f"{'Stopped':>8} {f'Ret {horizon}d':>9}")
+    print("-" * 68)
+    for row in rows:
+        print(f"{row['signal_type'].upper():<8} {row['confidence']:<11} {row['count']:>9} "
+              f"{format_rate(row['hit_rate_short']):>8} {format_rate(row['hit_rate_medium']):>9} "
+              f"{format_rate(row['stop_rate']):>8} {row['avg_return']:>9.2%}")
+
+def parse_args():
+    """Parse command line arguments"""
+    from market_watcher_real_data import PRICE_STORE_DIR
+
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Signal backtest")
+    parser.add_argument('--store', default=PRICE_STORE_DIR, help="Price store directory")
+    parser.add_argument('--horizon', type=int, default=HORIZON,
+                        help=f"Trading days to evaluate targets over (default: {HORIZON})")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+    if args.horizon < 1:
+        parser.error("--horizon must be at least 1 trading day")
+    return args
+
+def main():
+    """Main execution"""
+    args = parse_args()
+
+    if not store_exists(args.store):
+        print(f"ERROR: No price store found in {args.store} (run price_store.py migrate first)")
+        sys.exit(1)
+
+    tickers, prices, volumes, lengths = load_store_matrix(args.store)
+    print(f"Backtesting {len(tickers)} tickers over {prices.shape[1]} days "
+          f"(horizon {args.horizon} days)...")
+
+    rows = run_backtest(prices, volumes, lengths, args.horizon)
+    print_report(rows, args.horizon)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'horizon': args.horizon, 'tickers': len(tickers), 'results': rows}, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
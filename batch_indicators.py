@@ -0,0 +1,207 @@
+"""
+Market Watcher PEA - Batch Indicator Engine
+Computes technical indicators for the whole watchlist at once from a
+(tickers x days) price/volume matrix using column-wise NumPy operations
+"""
+
+import numpy as np
+
+from indicator_kernels import ema_rows
+
+RSI_PERIODS = 14
+MA_PERIODS = (20, 50, 200)
+VOLUME_PERIODS = 20
+
+def build_price_matrix(market_data_list):
+    """Right-align per-ticker price/volume arrays into (tickers x days) matrices
+
+    The last column is the most recent bar of every ticker. Tickers with a
+    shorter history are left-padded with NaN. Returns prices, volumes and the
+    number of real bars per ticker.
+    """
+    lengths = np.array([len(d['prices']) for d in market_data_list], dtype=np.int64)
+    n_days = int(lengths.max()) if len(lengths) else 0
+
+    prices = np.full((len(market_data_list), n_days), np.nan)
+    volumes = np.full((len(market_data_list), n_days), np.nan)
+
+    for row, data in enumerate(market_data_list):
+        length = lengths[row]
+        if length == 0:
+            continue
+        prices[row, n_days-length:] = data['prices']
+        volumes[row, n_days-length:] = data['volumes']
+
+    return prices, volumes, lengths
+
+def ema_matrix(values, periods, start):
+    """Calculate EMA series row by row for a right-aligned matrix
+
+    `start` is the first valid column of each row. Each row is seeded with
+    the mean of its first `periods` values; columns before the seed are NaN.
+    """
+    return ema_rows(values, periods, start)
+
+def macd_matrix(prices, start):
+    """Calculate EMA12, EMA26, MACD, signal and histogram series for every row"""
+    ema12 = ema_matrix(prices, 12, start)
+    ema26 = ema_matrix(prices, 26, start)
+    macd_line = ema12 - ema26
+
+    # The MACD line is defined from start + 25; the signal is its EMA9
+    signal_line = ema_matrix(macd_line, 9, np.asarray(start) + 25)
+    histogram = macd_line - signal_line
+
+    return ema12, ema26, macd_line, signal_line, histogram
+
+def compute_batch_indicators(prices, volumes, lengths):
+    """Compute the latest RSI, MACD, MA20/50/200 and volume ratio for every ticker
+
+    Returns a dict of 1-D arrays aligned with the matrix rows. Indicators a
+    ticker does not have enough history for are NaN, and the matching
+    boolean mask in result['masks'] is False.
+    """
+    lengths = np.asarray(lengths)
+    n_rows, n_days = prices.shape
+    start = n_days - lengths
+
+    masks = {
+        'rsi': lengths >= RSI_PERIODS + 1,
+        'macd': lengths >= 26,
+        'macd_signal': lengths >= 26 + 8,
+    }
+    for periods in MA_PERIODS:
+        masks[f'ma{periods}'] = lengths >= periods
+    masks['volume_avg'] = lengths >= VOLUME_PERIODS
+
+    # RSI: simple average of the last 14 gains and losses
+    rsi = np.full(n_rows, np.nan)
+    if n_days > RSI_PERIODS:
+        deltas = np.diff(prices[:, -(RSI_PERIODS + 1):], axis=1)
+        avg_gain = np.where(deltas > 0, deltas, 0).mean(axis=1)
+        avg_loss = np.where(deltas < 0, -deltas, 0).mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+        rsi = np.where(masks['rsi'], rsi, np.nan)
+
+    # MACD: only the last column is needed, the signal falls back to the
+    # MACD line while fewer than 9 MACD values exist
+    ema12_series, ema26_series, macd_series, signal_series, _ = macd_matrix(prices, start)
+    macd_line = macd_series[:, -1] if n_days else np.full(n_rows, np.nan)
+    signal_line = signal_series[:, -1] if n_days else np.full(n_rows, np.nan)
+    signal_line = np.where(masks['macd_signal'], signal_line, macd_line)
+    histogram = macd_line - signal_line
+
+    result = {
+        'current_price': prices[:, -1] if n_days else np.full(n_rows, np.nan),
+        'current_volume': volumes[:, -1] if n_days else np.full(n_rows, np.nan),
+        'rsi': rsi,
+        'ema12': ema12_series[:, -1] if n_days else np.full(n_rows, np.nan),
+        'ema26': ema26_series[:, -1] if n_days else np.full(n_rows, np.nan),
+        'macd': np.where(masks['macd'], macd_line, np.nan),
+        'macd_signal': np.where(masks['macd'], signal_line, np.nan),
+        'macd_histogram': np.where(masks['macd'], histogram, np.nan),
+    }
+
+    for periods in MA_PERIODS:
+        if n_days >= periods:
+            ma = prices[:, -periods:].mean(axis=1)
+        else:
+            ma = np.full(n_rows, np.nan)
+        result[f'ma{periods}'] = np.where(masks[f'ma{periods}'], ma, np.nan)
+
+    # Volume ratio: current volume against its 20-day average, 1.0 when the
+    # history is too short or the average is not positive
+    if n_days >= VOLUME_PERIODS:
+        avg_volume = volumes[:, -VOLUME_PERIODS:].mean(axis=1)
+    else:
+        avg_volume = np.full(n_rows, np.nan)
+    avg_volume = np.where(masks['volume_avg'], avg_volume, result['current_volume'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_ratio = result['current_volume'] / avg_volume
+    result['volume_ratio'] = np.where(avg_volume > 0, volume_ratio, 1.0)
+
+    result['masks'] = masks
+
+    return result
+
+def indicator_value(values, row):
+    """Return one ticker's indicator as a scalar, or None when it is masked out"""
+    value = values[row]
+    if np.isnan(value):
+        return None
+    return value
+
+def rolling_sum_matrix(values, window):
+    """Calculate trailing rolling sums along each row via cumulative sums
+
+    Columns before the first full window are NaN; NaN values are summed as 0,
+    so callers mask out windows that reach before a row's start.
+    """
+    n_rows, n_days = values.shape
+    sums = np.full((n_rows, n_days), np.nan)
+    if n_days < window:
+        return sums
+
+    cumsum = np.zeros((n_rows, n_days + 1))
+    np.cumsum(np.nan_to_num(values), axis=1, out=cumsum[:, 1:])
+    sums[:, window-1:] = cumsum[:, window:] - cumsum[:, :-window]
+
+    return sums
+
+def compute_indicator_series(prices, volumes, lengths):
+    """Compute every indicator on every day for every ticker
+
+    Value [row, day] is what compute_batch_indicators would return for that
+    row if its history ended on that day, so the series can be replayed day
+    by day (backtests, charts) without re-slicing the history. Returns a dict
+    of (tickers x days) arrays, NaN where an indicator is not available, plus
+    'valid', the mask of days inside each ticker's history.
+    """
+    lengths = np.asarray(lengths)
+    n_rows, n_days = prices.shape
+    start = n_days - lengths
+    # Number of bars available up to and including each day
+    bars = np.arange(1, n_days + 1)[None, :] - start[:, None]
+
+    # RSI: rolling 14-delta gain/loss sums; the loss count keeps the
+    # avg_loss == 0 case exact despite cumulative-sum rounding
+    deltas = np.full((n_rows, n_days), np.nan)
+    deltas[:, 1:] = np.diff(prices, axis=1)
+    with np.errstate(invalid='ignore'):
+        gain_sum = rolling_sum_matrix(np.where(deltas > 0, deltas, 0), RSI_PERIODS)
+        loss_sum = rolling_sum_matrix(np.where(deltas < 0, -deltas, 0), RSI_PERIODS)
+        loss_count = rolling_sum_matrix((deltas < 0).astype(float), RSI_PERIODS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(loss_count == 0, 100.0, 100 - (100 / (1 + gain_sum / loss_sum)))
+    rsi[bars < RSI_PERIODS + 1] = np.nan
+
+    ema12, ema26, macd_line, signal_line, _ = macd_matrix(prices, start)
+    signal_line = np.where(bars >= 26 + 8, signal_line, macd_line)
+    histogram = macd_line - signal_line
+
+    series = {
+        'current_price': prices,
+        'current_volume': volumes,
+        'rsi': rsi,
+        'ema12': ema12,
+        'ema26': ema26,
+        'macd': macd_line,
+        'macd_signal': np.where(bars >= 26, signal_line, np.nan),
+        'macd_histogram': np.where(bars >= 26, histogram, np.nan),
+    }
+
+    for periods in MA_PERIODS:
+        ma = rolling_sum_matrix(prices, periods) / periods
+        ma[bars < periods] = np.nan
+        series[f'ma{periods}'] = ma
+
+    avg_volume = rolling_sum_matrix(volumes, VOLUME_PERIODS) / VOLUME_PERIODS
+    avg_volume = np.where(bars >= VOLUME_PERIODS, avg_volume, volumes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_ratio = volumes / avg_volume
+        series['volume_ratio'] = np.where(avg_volume > 0, volume_ratio, 1.0)
+
+    series['valid'] = bars >= 1
+
+    return series
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Indicator Micro-Benchmarks
+Times the indicator, signal and report functions on seeded synthetic
+series and emits machine-readable JSON to compare between commits
+
+Usage:
+    python benchmark_indicators.py [--output FILE] [--lengths 30 250 ...]
+                                   [--compare BASELINE.json]
+"""
+
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import timeit
+import zlib
+
+import numpy as np
+
+import indicator_kernels
+import market_watcher_complete
+import market_watcher_real_data as mw
+
+LENGTHS = (30, 250, 2500, 25000)
+REPEATS = 5
+MIN_TIME = 0.2
+
+def synthetic_series(length, seed):
+    """Build a price/volume series the way analyze_ticker does, with a fixed seed"""
+    rng = np.random.RandomState(seed)
+    base_price = 100 + rng.random_sample() * 200
+
+    trend = np.linspace(0, rng.randn() * 20, length)
+    noise = rng.randn(length) * 5
+    prices = np.maximum(base_price + trend + noise, 1)
+
+    base_volume = 100000 + rng.random_sample() * 500000
+    volumes = np.maximum(base_volume * (1 + rng.randn(length) * 0.3), 1000)
+
+    return prices, volumes
+
+def signal_inputs(prices, volumes):
+    """Compute the generate_signal arguments for a series"""
+    macd_line, macd_signal, macd_histogram = mw.calculate_macd(prices)
+    avg_volume_20 = np.mean(volumes[-20:]) if len(volumes) >= 20 else volumes[-1]
+    return (
+        'BENCH.PA', 'Benchmark Company', prices[-1],
+        mw.calculate_rsi(prices), macd_line, macd_signal, macd_histogram,
+        mw.calculate_moving_average(prices, 20), mw.calculate_moving_average(prices, 50),
+        mw.calculate_moving_average(prices, 200), volumes[-1] / avg_volume_20
+    )
+
+def benchmark_cases(prices, volumes):
+    """Return (name, callable) pairs to time for one series"""
+    args = signal_inputs(prices, volumes)
+    signal = mw.generate_signal(*args)
+
+    return [
+        ('calculate_rsi', lambda: mw.calculate_rsi(prices)),
+        ('calculate_ema', lambda: mw.calculate_ema(prices, 26)),
+        ('calculate_macd', lambda: mw.calculate_macd(prices)),
+        ('calculate_moving_average', lambda: mw.calculate_moving_average(prices, 200)),
+        ('generate_signal', lambda: mw.generate_signal(*args)),
+        ('generate_markdown_report', lambda: market_watcher_complete.generate_markdown_report(signal)),
+    ]
+
+def time_call(func, repeats=REPEATS, min_time=MIN_TIME):
+    """Time a callable: calls per repeat are calibrated to last about min_time"""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10
+
+    per_call = [t / number for t in timer.repeat(repeat=repeats, number=number)]
+    return {
+        'calls_per_repeat': number,
+        'repeats': repeats,
+        'best_s': min(per_call),
+        'median_s': statistics.median(per_call),
+    }
+
+def git_commit():
+    """Return the current git commit, or None outside a checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    """Describe the machine and library versions of a run"""
+    import pandas as pd
+
+    return {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'numba': indicator_kernels.numba.__version__ if indicator_kernels.numba is not None else None,
+        'indicator_backend': indicator_kernels.BACKEND,
+    }
+
+def run_benchmarks(lengths=LENGTHS, repeats=REPEATS, min_time=MIN_TIME):
+    """Run every benchmark case at every history length"""
+    results = []
+    for length in lengths:
+        prices, volumes = synthetic_series(length, zlib.crc32(f"bench-{length}".encode('utf-8')))
+        for name, func in benchmark_cases(prices, volumes):
+            entry = {'function': name, 'length': length}
+            try:
+                entry.update(time_call(func, repeats, min_time))
+            except Exception as e:
+                entry['error'] = f"{type(e).__name__}: {e}"
+            results.append(entry)
+            if 'error' in entry:
+                print(f"  {name:<26} n={length:<6} ERROR {entry['error']}")
+            else:
+                print(f"  {name:<26} n={length:<6} {entry['best_s'] * 1e6:>12.2f} us")
+    return results
+
+def compare(results, baseline):
+    """Print best-time ratios against a baseline run"""
+    previous = {(r['function'], r['length']): r for r in baseline['results']}
+
+    print(f"\nComparison with {baseline.get('git_commit') or 'baseline'}:")
+    for entry in results:
+        old = previous.get((entry['function'], entry['length']))
+        if old is None or 'best_s' not in old or 'best_s' not in entry:
+            continue
+        ratio = entry['best_s'] / old['best_s']
+        print(f"  {entry['function']:<26} n={entry['length']:<6} x{ratio:>7.2f} "
+              f"({old['best_s'] * 1e6:.2f} -> {entry['best_s'] * 1e6:.2f} us)")
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Indicator micro-benchmarks")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON results file")
+    parser.add_argument('--lengths', type=int, nargs='+', default=list(LENGTHS),
+                        help="History lengths in bars")
+    parser.add_argument('--repeats', type=int, default=REPEATS, help="Timing repeats per case")
+    parser.add_argument('--compare', help="Baseline JSON results to compare against")
+    return parser.parse_args()
+
+def main():
+    """Main execution"""
+    args = parse_args()
+
+    print("="*80)
+    print("MARKET WATCHER PEA - Indicator Benchmarks")
+    print(f"Execution Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*80)
+
+    output = {
+        'execution_time': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'environment': environment(),
+        'results': run_benchmarks(args.lengths, args.repeats),
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(output['results'], json.load(f))
+
+if __name__ == "__main__":
+    main()
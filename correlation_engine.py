@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Rolling Correlation Engine
+Rolling covariance and correlation matrices of daily returns across the
+whole watchlist, updated incrementally as each new day arrives, and the
+clusters of strongly correlated tickers
+
+For a window of W days the state keeps the last W returns of every ticker
+in a ring, their sums and the (tickers x tickers) matrix of cross products.
+A new day adds its outer product and removes the one of the day leaving
+the window: O(tickers^2) per day, and only the current window's matrix is
+ever held in memory. Tickers with a missing return in the window are left
+out (NaN rows) until the window is complete again.
+
+Closes are aligned on the union of the tickers' trading days and filled
+forward (see portfolio_performance.price_history), so every column of
+returns compares the same two days for all tickers.
+
+Usage:
+    python correlation_engine.py [--store DIR] [--windows 20 60 250]
+        [--threshold 0.8] [--state-dir DIR] [--output FILE]
+    python correlation_engine.py check    # offset calendars and incremental updates
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from portfolio_performance import price_history
+from price_store import open_price_store, store_exists, write_price_store
+
+WINDOWS = (20, 60, 250)
+CLUSTER_THRESHOLD = 0.8
+TOP_PAIRS = 20
+# Rebuild the cross products from the ring every RESYNC_DAYS to bound drift
+RESYNC_DAYS = 500
+STATE_VERSION = 2
+CHECK_TOLERANCE = 1e-9
+
+def load_aligned_closes(store_dir):
+    """Return (tickers, days, closes) of every ticker in the store on a shared date axis"""
+    store = open_price_store(store_dir)
+    tickers = sorted(ticker for ticker, (_, length) in store['index'].items() if length)
+    days, prices = price_history(store_dir, tickers)
+    return tickers, days, prices
+
+def daily_returns(prices):
+    """Simple daily returns of a (tickers x days) close matrix; the first day is NaN"""
+    returns = np.full(prices.shape, np.nan)
+    returns[:, 1:] = prices[:, 1:] / prices[:, :-1] - 1
+    return returns
+
+def new_correlation_state(tickers, window):
+    """Return an empty rolling state for `tickers` over `window` days"""
+    n = len(tickers)
+    return {
+        'tickers': list(tickers),
+        'window': window,
+        'ring': np.zeros((window, n)),
+        'missing_ring': np.ones((window, n), dtype=bool),
+        'pos': 0,
+        'count': 0,
+        'sums': np.zeros(n),
+        'cross': np.zeros((n, n)),
+        'missing': np.full(n, window, dtype=np.int64),
+        # Last days of the date axis (the window and the day before it) and
+        # the closes of the last one, to match the next update by date
+        'days': np.zeros(0, dtype=np.int64),
+        'closes': np.full(n, np.nan),
+    }
+
+def _resync(state):
+    """Recompute the sums and cross products from the ring contents"""
+    state['sums'] = state['ring'].sum(axis=0)
+    state['cross'] = state['ring'].T @ state['ring']
+    state['missing'] = state['missing_ring'].sum(axis=0)
+
+def push_returns(state, returns):
+    """Add one day of returns (NaN when missing) to the window"""
+    returns = np.asarray(returns, dtype=float)
+    missing = np.isnan(returns)
+    values = np.where(missing, 0.0, returns)
+
+    pos = state['pos']
+    leaving = state['ring'][pos]
+    state['sums'] += values - leaving
+    cross = state['cross']
+    cross += np.outer(values, values)
+    cross -= np.outer(leaving, leaving)
+    state['missing'] += missing.astype(np.int64) - state['missing_ring'][pos]
+
+    state['ring'][pos] = values
+    state['missing_ring'][pos] = missing
+    state['pos'] = (pos + 1) % state['window']
+    state['count'] += 1
+
+    if state['count'] % RESYNC_DAYS == 0:
+        _resync(state)
+
+def load_window(state, returns):
+    """Fill the window with the last `window` columns of a returns matrix at once"""
+    window = state['window']
+    tail = returns[:, -window:].T
+    n_days = tail.shape[0]
+
+    state['ring'][:] = 0.0
+    state['missing_ring'][:] = True
+    state['ring'][window-n_days:] = np.where(np.isnan(tail), 0.0, tail)
+    state['missing_ring'][window-n_days:] = np.isnan(tail)
+    state['pos'] = 0
+    state['count'] = returns.shape[1]
+    _resync(state)
+
+def complete_tickers(state):
+    """Mask of the tickers with a full window of returns"""
+    return state['missing'] == 0
+
+def state_covariance(state):
+    """Sample covariance matrix of the window (NaN for incomplete tickers)"""
+    window = state['window']
+    cov = (state['cross'] - np.outer(state['sums'], state['sums']) / window) / (window - 1)
+    incomplete = ~complete_tickers(state)
+    cov[incomplete, :] = np.nan
+    cov[:, incomplete] = np.nan
+    return cov
+
+def state_correlation(state):
+    """Correlation matrix of the window (NaN for incomplete or constant tickers)"""
+    cov = state_covariance(state)
+    std = np.sqrt(np.diag(cov))
+    std[std == 0] = np.nan
+    corr = cov / np.outer(std, std)
+    np.clip(corr, -1.0, 1.0, out=corr)
+    return corr
+
+def _mark_end(state, days, prices):
+    """Remember the last days of the date axis and the closes of the last one"""
+    state['days'] = np.asarray(days[-(state['window'] + 1):], dtype=np.int64).copy()
+    state['closes'] = prices[:, -1].copy() if len(days) else np.full(len(state['tickers']), np.nan)
+
+def build_correlation_state(tickers, days, prices, window):
+    """Build the state of the latest window from date-aligned (tickers x days) closes"""
+    state = new_correlation_state(tickers, window)
+    load_window(state, daily_returns(prices))
+    _mark_end(state, days, prices)
+    return state
+
+def update_correlation_state(state, tickers, days, prices):
+    """Roll a state forward to the end of date-aligned closes
+
+    The state is reused when the tickers are the same, the days it was
+    saved with are found unchanged on the date axis and the closes of its
+    last day are the same (a late ticker's filled-forward close may since
+    have been replaced by the real one); only the days after it are pushed.
+    Otherwise the window is rebuilt. `state` comes from
+    load_correlation_state or new_correlation_state. Returns (state, days
+    pushed or None when rebuilt).
+    """
+    if state['tickers'] == list(tickers) and len(state['days']):
+        saved_days = state['days']
+        end = int(np.searchsorted(days, saved_days[-1])) + 1
+        start = end - len(saved_days)
+        new_days = len(days) - end
+        if (start >= 0 and np.array_equal(days[start:end], saved_days)
+                and np.array_equal(prices[:, end-1], state['closes'], equal_nan=True)
+                and 0 <= new_days <= state['window']):
+            returns = daily_returns(prices[:, end-1:])
+            for column in range(1, returns.shape[1]):
+                push_returns(state, returns[:, column])
+            _mark_end(state, days, prices)
+            return state, new_days
+
+    return build_correlation_state(tickers, days, prices, state['window']), None
+
+def iter_rolling_correlations(returns, window, start=None):
+    """Yield (day, state) for every day from `start`, one incremental push per day
+
+    Only the current window is held in memory; call state_correlation or
+    state_covariance on the yielded state to read a day's matrix.
+    """
+    n_days = returns.shape[1]
+    start = window if start is None else max(start, window)
+    state = new_correlation_state(range(returns.shape[0]), window)
+    if start > n_days:
+        return
+    load_window(state, returns[:, :start])
+    yield start - 1, state
+    for day in range(start, n_days):
+        push_returns(state, returns[:, day])
+        yield day, state
+
+def save_correlation_state(path, state):
+    """Write a rolling state to an .npz file atomically"""
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, version=STATE_VERSION, tickers=np.array(state['tickers'], dtype=str),
+             window=state['window'], ring=state['ring'], missing_ring=state['missing_ring'],
+             pos=state['pos'], count=state['count'], sums=state['sums'], cross=state['cross'],
+             missing=state['missing'], days=state['days'], closes=state['closes'])
+    os.replace(tmp_path, path)
+
+def load_correlation_state(path):
+    """Read a rolling state, or None when missing or outdated"""
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path) as data:
+            if int(data['version']) != STATE_VERSION:
+                return None
+            state = {name: data[name] for name in data.files if name != 'version'}
+    except Exception as e:
+        print(f"  WARNING: Could not read correlation state ({e}), rebuilding")
+        return None
+
+    state['tickers'] = state['tickers'].tolist()
+    for name in ('window', 'pos', 'count'):
+        state[name] = int(state[name])
+    return state
+
+def top_pairs(corr, tickers, count=TOP_PAIRS):
+    """The `count` most correlated pairs of tickers, strongest first"""
+    upper = np.triu_indices(len(tickers), k=1)
+    values = corr[upper]
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0:
+        return []
+    if len(valid) > count:
+        valid = valid[np.argpartition(-values[valid], count - 1)[:count]]
+    best = valid[np.argsort(-values[valid], kind='stable')]
+    return [{'tickers': [tickers[upper[0][i]], tickers[upper[1][i]]], 'correlation': round(float(values[i]), 4)}
+            for i in best]
+
+def correlated_clusters(corr, tickers, threshold=CLUSTER_THRESHOLD):
+    """Groups of tickers linked by correlations >= threshold, most correlated first
+
+    Clusters are the connected components of the graph of pairs above the
+    threshold; each comes with its mean pairwise correlation.
+    """
+    adjacency = np.nan_to_num(corr, nan=-1.0) >= threshold
+    np.fill_diagonal(adjacency, False)
+
+    seen = np.zeros(len(tickers), dtype=bool)
+    clusters = []
+    for root in np.flatnonzero(adjacency.any(axis=1)):
+        if seen[root]:
+            continue
+        members = [root]
+        seen[root] = True
+        for member in members:
+            for neighbour in np.flatnonzero(adjacency[member] & ~seen):
+                seen[neighbour] = True
+                members.append(neighbour)
+
+        members = np.sort(members)
+        block = corr[np.ix_(members, members)]
+        mean = block[np.triu_indices(len(members), k=1)].mean()
+        clusters.append({'tickers': [tickers[i] for i in members], 'size': len(members),
+                         'mean_correlation': round(float(mean), 4)})
+
+    clusters.sort(key=lambda c: (-c['mean_correlation'], -c['size']))
+    return clusters
+
+def correlation_summary(state, threshold=CLUSTER_THRESHOLD, pairs=TOP_PAIRS):
+    """Summarize a window: coverage, mean correlation, top pairs and clusters"""
+    corr = state_correlation(state)
+    tickers = state['tickers']
+    upper = corr[np.triu_indices(len(tickers), k=1)]
+    upper = upper[~np.isnan(upper)]
+    return {
+        'window': state['window'],
+        'tickers': int(complete_tickers(state).sum()),
+        'mean_correlation': round(float(upper.mean()), 4) if len(upper) else None,
+        'top_pairs': top_pairs(corr, tickers, pairs),
+        'clusters': correlated_clusters(corr, tickers, threshold),
+    }
+
+def state_path(state_dir, window):
+    """Return the state file of a window"""
+    return os.path.join(state_dir, f"correlation_{window}.npz")
+
+def _check_case(name, passed, detail):
+    """Print one check line and return whether it passed"""
+    print(f"  {name:<42} {detail:<28} {'OK' if passed else 'FAILED'}")
+    return passed
+
+def _same_correlation(a, b):
+    """True when two correlation matrices agree within CHECK_TOLERANCE (NaN included)"""
+    return np.array_equal(np.isnan(a), np.isnan(b)) and np.nanmax(np.abs(a - b), initial=0) <= CHECK_TOLERANCE
+
+def check_alignment(window=20):
+    """Check correlations on offset calendars and incremental updates against rebuilds
+
+    B is twice A on the same days, but the two tickers trade on different
+    calendars (each with its own holidays): their correlation must stay
+    close to 1. Updating a saved
+    state by date must give the same matrix as rebuilding it, and must
+    rebuild when the saved days move. Returns True when every case passes.
+    """
+    rng = np.random.RandomState(0)
+    n_days = 120
+    calendar = np.arange(20000, 20000 + n_days)
+    closes = 100 * np.cumprod(1 + rng.randn(n_days) * 0.01)
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        def aligned(name, series):
+            store_dir = os.path.join(tmp_dir, name)
+            write_price_store(store_dir, {ticker: (closes[mask], np.ones(mask.sum()), days[mask])
+                                          for ticker, (closes, days, mask) in series.items()})
+            return load_aligned_closes(store_dir)
+
+        def pair_correlation(days, prices):
+            corr = state_correlation(build_correlation_state(['A', 'B'], days, prices, window))
+            return corr[0, 1]
+
+        everyday = np.ones(n_days, dtype=bool)
+        all_but_last = everyday.copy()
+        all_but_last[-1] = False
+        _, days, prices = aligned('last', {'A': (closes, calendar, everyday),
+                                           'B': (2 * closes, calendar, all_but_last)})
+        corr = pair_correlation(days, prices)
+        ok &= _check_case("B missing the last day", corr > 0.9, f"correlation {corr:+.3f}")
+
+        a_days = np.arange(n_days) % 30 != 3
+        b_days = np.arange(n_days) % 25 != 11
+        _, days, prices = aligned('offset', {'A': (closes, calendar, a_days),
+                                             'B': (2 * closes, calendar, b_days)})
+        corr = pair_correlation(days, prices)
+        ok &= _check_case("offset calendars", corr > 0.9, f"correlation {corr:+.3f}")
+
+        def until(mask, cut):
+            """`mask` without its last `cut` days"""
+            return np.concatenate([mask[:n_days-cut], np.zeros(cut, dtype=bool)])
+
+        # (case, A and B days when saved, B days on update, whether it must rebuild)
+        for name, saved, b_after, expect_rebuild in (
+                ("update by 5 days", (until(a_days, 5), until(b_days, 5)), b_days, False),
+                ("late ticker catching up", (until(a_days, 5), until(b_days, 6)), b_days, True),
+                ("update with B still late", (until(a_days, 5), until(b_days, 8)), until(b_days, 8), False)):
+            tickers, days, prices = aligned(f"{name}-before", {'A': (closes, calendar, saved[0]),
+                                                               'B': (2 * closes, calendar, saved[1])})
+            state = build_correlation_state(tickers, days, prices, window)
+            tickers, days, prices = aligned(f"{name}-after", {'A': (closes, calendar, a_days),
+                                                              'B': (2 * closes, calendar, b_after)})
+            state, pushed = update_correlation_state(state, tickers, days, prices)
+            rebuilt = build_correlation_state(tickers, days, prices, window)
+            passed = (pushed is None) == expect_rebuild and _same_correlation(
+                state_correlation(state), state_correlation(rebuilt))
+            ok &= _check_case(name, passed, "rebuilt" if pushed is None else f"{pushed} days pushed")
+
+        _, days, prices = aligned('shift-before', {'A': (closes, calendar, everyday),
+                                                   'B': (2 * closes, calendar, everyday)})
+        state = build_correlation_state(['A', 'B'], days, prices, window)
+        _, days, prices = aligned('shift-after', {'A': (closes, calendar + 1, everyday),
+                                                  'B': (2 * closes, calendar + 1, everyday)})
+        state, pushed = update_correlation_state(state, ['A', 'B'], days, prices)
+        ok &= _check_case("same bar count, calendar shifted", pushed is None,
+                          "rebuilt" if pushed is None else f"{pushed} days pushed")
+
+    return ok
+
+def parse_args():
+    """Parse command line arguments"""
+    from market_watcher_real_data import PRICE_STORE_DIR
+
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Rolling correlations")
+    parser.add_argument('--store', default=PRICE_STORE_DIR, help="Price store directory")
+    parser.add_argument('--windows', type=int, nargs='+', default=list(WINDOWS),
+                        help=f"Rolling windows in days (default: {' '.join(map(str, WINDOWS))})")
+    parser.add_argument('--threshold', type=float, default=CLUSTER_THRESHOLD,
+                        help=f"Correlation linking two tickers of a cluster (default: {CLUSTER_THRESHOLD})")
+    parser.add_argument('--state-dir', help="Keep the rolling states here to update them incrementally")
+    parser.add_argument('--output', help="Write the summaries as JSON to this file")
+    return parser.parse_args()
+
+def main():
+    """Main execution"""
+    if sys.argv[1:] == ['check']:
+        if not check_alignment():
+            sys.exit(1)
+        return
+
+    args = parse_args()
+
+    if not store_exists(args.store):
+        print(f"ERROR: No price store found in {args.store} (run price_store.py migrate first)")
+        sys.exit(1)
+
+    tickers, days, prices = load_aligned_closes(args.store)
+    print(f"Correlations of {len(tickers)} tickers over {len(days)} days")
+
+    summaries = []
+    for window in args.windows:
+        state = None
+        if args.state_dir:
+            state = load_correlation_state(state_path(args.state_dir, window))
+        if state is None:
+            state = new_correlation_state(tickers, window)
+
+        state, pushed = update_correlation_state(state, tickers, days, prices)
+        if args.state_dir:
+            os.makedirs(args.state_dir, exist_ok=True)
+            save_correlation_state(state_path(args.state_dir, window), state)
+
+        summary = correlation_summary(state, args.threshold)
+        summaries.append(summary)
+
+        update = "rebuilt" if pushed is None else f"{pushed} new days"
+        print(f"\nWindow {window} days ({update}): {summary['tickers']} tickers, "
+              f"mean correlation {summary['mean_correlation']}")
+        for pair in summary['top_pairs'][:5]:
+            print(f"  {pair['tickers'][0]:<10} {pair['tickers'][1]:<10} {pair['correlation']:+.3f}")
+        print(f"  {len(summary['clusters'])} clusters with correlation >= {args.threshold}")
+        for cluster in summary['clusters'][:5]:
+            print(f"    {cluster['size']} tickers, mean {cluster['mean_correlation']:+.3f}: "
+                  f"{', '.join(cluster['tickers'][:8])}{' ...' if cluster['size'] > 8 else ''}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'threshold': args.threshold, 'windows': summaries}, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
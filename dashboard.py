@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - HTML Dashboard
+Renders the daily summary HTML page from the latest analysis results, with
+sparklines of each ticker's closes and moving averages, RSI and volume ratio
+
+The indicator series of a ticker are computed once over its whole history
+with the full-series functions of indicator_kernels; only their last
+SPARKLINE_DAYS points are embedded, as inline SVG, so no point is
+recomputed on its own.
+
+Usage:
+    python dashboard.py [--results FILE] [--days 90] [--output daily_summary.html]
+"""
+
+from datetime import datetime
+from string import Template
+import argparse
+import html
+import json
+import os
+import sys
+
+import numpy as np
+
+from indicator_graph import new_graph, output_series
+
+SPARKLINE_DAYS = 90
+SPARKLINE_WIDTH = 240
+SPARKLINE_HEIGHT = 40
+
+SIGNAL_EMOJIS = {'buy': "🟢", 'sell': "🔴", 'watch': "🟠", 'neutral': "🟡"}
+SIGNAL_ORDER = {'buy': 0, 'sell': 1, 'watch': 2, 'neutral': 3}
+
+COLORS = {'close': '#2c3e50', 'ma20': '#3498db', 'ma50': '#f39c12', 'rsi': '#8e44ad',
+          'volume_ratio': '#16a085', 'guide': '#bdc3c7'}
+
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 900px; margin: 0 auto; padding: 20px; }
+        h1 { color: #2c3e50; border-bottom: 3px solid #3498db; padding-bottom: 10px; }
+        h2 { color: #34495e; margin-top: 30px; }
+        .summary-box { background-color: #ecf0f1; padding: 15px; border-left: 4px solid #3498db; margin: 20px 0; }
+        .signal-card { border: 1px solid #ddd; padding: 15px; margin: 15px 0; border-radius: 5px; }
+        .buy-signal { border-left: 4px solid #27ae60; background-color: #f0fff4; }
+        .sell-signal { border-left: 4px solid #e74c3c; background-color: #fff5f5; }
+        .watch-signal { border-left: 4px solid #f39c12; background-color: #fffbf0; }
+        .neutral-signal { border-left: 4px solid #95a5a6; background-color: #f8f9fa; }
+        .confidence-high { color: #27ae60; font-weight: bold; }
+        .confidence-medium { color: #f39c12; font-weight: bold; }
+        .confidence-low { color: #e74c3c; font-weight: bold; }
+        table { width: 100%; border-collapse: collapse; margin: 15px 0; }
+        th, td { padding: 10px; text-align: left; border-bottom: 1px solid #ddd; vertical-align: middle; }
+        th { background-color: #3498db; color: white; }
+        .indicator-value { font-family: 'Courier New', monospace; font-weight: bold; }
+        .sparkline { display: block; }
+        .footer { margin-top: 40px; padding-top: 20px; border-top: 2px solid #ddd; font-size: 0.9em; color: #7f8c8d; }
+        .disclaimer { background-color: #fff3cd; border: 1px solid #ffc107; padding: 15px; border-radius: 5px; margin: 20px 0; }
+    </style>
+</head>
+<body>
+    <h1>📊 Market Watcher PEA - Daily Analysis Report</h1>
+    <p><strong>Analysis Date:</strong> $analysis_date</p>
+
+    <div class="summary-box">
+        <h2>📈 Executive Summary</h2>
+        <ul>
+            <li><strong>Tickers Analyzed:</strong> $total_tickers</li>
+            <li><strong>Signals:</strong> $signal_counts</li>
+            <li><strong>High-Confidence Signals (≥60):</strong> $high_confidence</li>
+        </ul>
+    </div>
+
+    <h2>🔍 Detailed Analysis</h2>
+$cards
+    <h2>📊 Watchlist Status</h2>
+    <p>Last $days trading days: close with MA20 (blue) and MA50 (orange), RSI (30 / 70 guides).</p>
+    <table>
+        <tr>
+            <th>Ticker</th>
+            <th>Signal</th>
+            <th>Price</th>
+            <th>RSI</th>
+        </tr>
+$rows
+    </table>
+
+    <div class="disclaimer">
+        <h3>⚠️ DISCLAIMER</h3>
+        <p><strong>This analysis is provided for informational purposes only and does not constitute investment advice.</strong> All investment decisions remain your sole responsibility. Past performance does not guarantee future results.</p>
+    </div>
+
+    <div class="footer">
+        <p><strong>Market Watcher PEA</strong></p>
+        <p>Analysis Engine: Technical Indicators (RSI, MACD, Moving Averages)</p>
+        <p>This report was automatically generated by Market Watcher PEA on $generated_at.</p>
+    </div>
+</body>
+</html>
+""")
+
+CARD_TEMPLATE = Template("""
+    <div class="signal-card $signal_type-signal">
+        <h3>$emoji $ticker - $company_name</h3>
+        <p><strong>Signal:</strong> $signal_label | <span class="$confidence_class">Confidence: $confidence_score/100</span></p>
+        <p><strong>Current Price:</strong> $current_price EUR</p>
+
+        <h4>Technical Indicators</h4>
+        <table>
+            <tr>
+                <th>Indicator</th>
+                <th>Value</th>
+                <th>Last $days days</th>
+            </tr>
+            <tr>
+                <td>Price / MA20 / MA50</td>
+                <td class="indicator-value">$current_price / $ma20 / $ma50</td>
+                <td>$price_sparkline</td>
+            </tr>
+            <tr>
+                <td>RSI (14)</td>
+                <td class="indicator-value">$rsi</td>
+                <td>$rsi_sparkline</td>
+            </tr>
+            <tr>
+                <td>Volume Ratio</td>
+                <td class="indicator-value">$volume_ratio</td>
+                <td>$volume_sparkline</td>
+            </tr>
+        </table>
+
+        <h4>Key Points</h4>
+        <ul>
+$key_points
+        </ul>
+
+        <h4>Risk Factors</h4>
+        <ul>
+$risks
+        </ul>
+
+        <h4>Recommendation</h4>
+        <p><strong>Action:</strong> $action_suggestion</p>
+    </div>
+""")
+
+ROW_TEMPLATE = Template("""        <tr>
+            <td><strong>$ticker</strong><br>$company_name</td>
+            <td>$emoji $signal_label ($confidence_score)</td>
+            <td>$price_sparkline</td>
+            <td>$rsi_sparkline</td>
+        </tr>""")
+
+def ticker_series(prices, volumes, days=SPARKLINE_DAYS):
+    """Compute the chart series of a ticker over its whole history, keep the last `days`"""
+    graph = new_graph({'prices': prices, 'volumes': volumes})
+    series = output_series(graph, ('close', 'ma20', 'ma50', 'rsi', 'volume_ratio'))
+    return {name: values[-days:] for name, values in series.items()}
+
+def sparkline_points(values, low, high, width=SPARKLINE_WIDTH, height=SPARKLINE_HEIGHT):
+    """Return the SVG polyline points of a series on a [low, high] scale (NaN points skipped)"""
+    values = np.asarray(values, dtype=float)
+    x = np.linspace(0, width, len(values)) if len(values) > 1 else np.zeros(len(values))
+    y = height - (values - low) / ((high - low) or 1.0) * height
+    valid = ~np.isnan(values)
+    return ' '.join(f"{a:.1f},{b:.1f}" for a, b in zip(x[valid], y[valid]))
+
+def sparkline(lines, low=None, high=None, guides=(), width=SPARKLINE_WIDTH, height=SPARKLINE_HEIGHT):
+    """Render series sharing one vertical scale as an inline SVG
+
+    `lines` is a list of (values, color); `guides` are horizontal reference
+    levels. The scale defaults to the range of the values.
+    """
+    finite = np.concatenate([np.asarray(values, dtype=float) for values, _ in lines])
+    finite = finite[~np.isnan(finite)]
+    if len(finite) == 0:
+        return "N/A"
+
+    low = float(finite.min()) if low is None else low
+    high = float(finite.max()) if high is None else high
+
+    shapes = []
+    for level in guides:
+        y = height - (level - low) / ((high - low) or 1.0) * height
+        shapes.append(f'<line x1="0" y1="{y:.1f}" x2="{width}" y2="{y:.1f}" '
+                      f'stroke="{COLORS["guide"]}" stroke-dasharray="2,2"/>')
+    for values, color in lines:
+        points = sparkline_points(values, low, high, width, height)
+        if points:
+            shapes.append(f'<polyline fill="none" stroke="{color}" stroke-width="1.2" points="{points}"/>')
+
+    return (f'<svg class="sparkline" width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+            f'{"".join(shapes)}</svg>')
+
+def price_sparkline(series):
+    """Closes with their MA20 and MA50"""
+    return sparkline([(series['close'], COLORS['close']), (series['ma20'], COLORS['ma20']),
+                      (series['ma50'], COLORS['ma50'])])
+
+def rsi_sparkline(series):
+    """RSI on its 0-100 scale with the 30 / 70 levels"""
+    return sparkline([(series['rsi'], COLORS['rsi'])], 0, 100, guides=(30, 70))
+
+def volume_sparkline(series):
+    """Volume ratio with the 1.0 (average volume) level"""
+    return sparkline([(series['volume_ratio'], COLORS['volume_ratio'])], 0, None, guides=(1.0,))
+
+def format_value(value, spec):
+    """Format an indicator value, or N/A"""
+    return "N/A" if value is None else format(value, spec)
+
+def confidence_class(confidence_score):
+    """CSS class of a confidence score"""
+    if confidence_score >= 60:
+        return 'confidence-high'
+    if confidence_score >= 40:
+        return 'confidence-medium'
+    return 'confidence-low'
+
+def html_list(items):
+    """Render items as <li> lines"""
+    return '\n'.join(f"            <li>{html.escape(item)}</li>" for item in items)
+
+def signal_fields(signal, series, days):
+    """Template fields shared by the cards and the table rows"""
+    details = signal.get('technical_details', {})
+    fields = {
+        'ticker': html.escape(signal['ticker']),
+        'company_name': html.escape(signal.get('company_name') or ''),
+        'signal_type': signal['signal_type'],
+        'signal_label': signal['signal_type'].upper(),
+        'emoji': SIGNAL_EMOJIS.get(signal['signal_type'], ''),
+        'confidence_score': signal['confidence_score'],
+        'confidence_class': confidence_class(signal['confidence_score']),
+        'current_price': format_value(details.get('current_price'), '.2f'),
+        'rsi': format_value(details.get('rsi'), '.2f'),
+        'ma20': format_value(details.get('ma20'), '.2f'),
+        'ma50': format_value(details.get('ma50'), '.2f'),
+        'volume_ratio': format_value(details.get('volume_ratio'), '.2f'),
+        'days': days,
+        'price_sparkline': "N/A",
+        'rsi_sparkline': "N/A",
+        'volume_sparkline': "N/A",
+    }
+    if series is not None:
+        fields['price_sparkline'] = price_sparkline(series)
+        fields['rsi_sparkline'] = rsi_sparkline(series)
+        fields['volume_sparkline'] = volume_sparkline(series)
+    return fields
+
+def render_dashboard(results, series_by_ticker, days=SPARKLINE_DAYS, generated_at=None):
+    """Render the dashboard page of a results dict
+
+    `series_by_ticker` maps tickers to ticker_series() dicts; tickers without
+    history get no sparkline. Non-neutral signals get a detailed card.
+    """
+    generated_at = generated_at or datetime.now()
+    signals = sorted(results.get('signals', []),
+                     key=lambda s: (SIGNAL_ORDER.get(s['signal_type'], 4), -s['confidence_score'], s['ticker']))
+
+    cards = []
+    rows = []
+    counts = {}
+    for signal in signals:
+        fields = signal_fields(signal, series_by_ticker.get(signal['ticker']), days)
+        counts[signal['signal_type']] = counts.get(signal['signal_type'], 0) + 1
+        rows.append(ROW_TEMPLATE.substitute(fields))
+        if signal['signal_type'] != 'neutral':
+            cards.append(CARD_TEMPLATE.substitute(
+                fields,
+                key_points=html_list(signal.get('key_points', [])),
+                risks=html_list(signal.get('risks', [])),
+                action_suggestion=html.escape(signal.get('action_suggestion', ''))))
+
+    execution_time = results.get('execution_time')
+    analysis_date = (datetime.fromisoformat(execution_time).strftime('%A, %B %d, %Y at %H:%M')
+                     if execution_time else "N/A")
+    return PAGE_TEMPLATE.substitute(
+        analysis_date=analysis_date,
+        total_tickers=results.get('total_tickers_analyzed', len(signals)),
+        signal_counts=', '.join(f"{count} {signal_type.upper()}" for signal_type, count in
+                                sorted(counts.items(), key=lambda item: SIGNAL_ORDER.get(item[0], 4))) or "none",
+        high_confidence=results.get('high_confidence_signals', 0),
+        cards=''.join(cards) or "\n    <p>No actionable signals today.</p>\n",
+        rows='\n'.join(rows),
+        days=days,
+        generated_at=generated_at.strftime('%B %d, %Y at %H:%M'))
+
+def load_ticker_series(tickers, days=SPARKLINE_DAYS):
+    """Load each ticker's history (price store or JSON files) and compute its chart series"""
+    from market_watcher_real_data import load_yahoo_finance_data
+
+    series_by_ticker = {}
+    for ticker in tickers:
+        market_data = load_yahoo_finance_data(ticker)
+        if market_data is None or len(market_data['prices']) == 0:
+            continue
+        series_by_ticker[ticker] = ticker_series(market_data['prices'], market_data['volumes'], days)
+    return series_by_ticker
+
+def parse_args():
+    """Parse command line arguments"""
+    from market_watcher_real_data import OUTPUT_JSON
+
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - HTML dashboard")
+    parser.add_argument('--results', default=OUTPUT_JSON, help="Analysis results JSON")
+    parser.add_argument('--days', type=int, default=SPARKLINE_DAYS,
+                        help=f"Days shown in the sparklines (default: {SPARKLINE_DAYS})")
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(OUTPUT_JSON), 'daily_summary.html'),
+                        help="HTML file to write")
+    return parser.parse_args()
+
+def main():
+    """Main execution"""
+    args = parse_args()
+
+    if not os.path.exists(args.results):
+        print(f"ERROR: Results file not found: {args.results}")
+        sys.exit(1)
+
+    with open(args.results, 'r') as f:
+        results = json.load(f)
+
+    tickers = [signal['ticker'] for signal in results.get('signals', [])]
+    series_by_ticker = load_ticker_series(tickers, args.days)
+    print(f"Series computed for {len(series_by_ticker)}/{len(tickers)} tickers")
+
+    with open(args.output, 'w') as f:
+        f.write(render_dashboard(results, series_by_ticker, args.days))
+    print(f"Dashboard saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
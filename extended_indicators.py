@@ -0,0 +1,193 @@
+"""
+Market Watcher PEA - Extended Indicators
+Bollinger Bands, ATR, stochastic %K/%D, OBV and ADX of a single ticker, as
+full-series kernels and as one pass returning only the latest values (and
+the smoothed values indicator_state rolls forward bar by bar)
+
+The kernels take the arrays load_yahoo_finance_data returns. Without daily
+highs and lows (stores and files holding closes only), the closes stand in
+for them: the true range is then the close-to-close move.
+
+These indicators are informational only: generate_signal reports them in
+the technical details (and the screener can filter on them), but they do
+not change a signal's type or confidence, so the vectorized scorer of
+signal_scoring and the backtest replay the same rules without them.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicator_kernels import sma_series, wilder_series
+
+BOLLINGER_PERIODS = 20
+BOLLINGER_WIDTH = 2
+ATR_PERIODS = 14
+# ADX smooths with the ATR's period so that both share one Wilder pass
+ADX_PERIODS = ATR_PERIODS
+STOCHASTIC_PERIODS = 14
+STOCHASTIC_SMOOTHING = 3
+# Bars of highs and lows the latest %K and %D read
+RANGE_TAIL = STOCHASTIC_PERIODS + STOCHASTIC_SMOOTHING - 1
+
+EXTENDED_NAMES = ('bollinger_upper', 'bollinger_middle', 'bollinger_lower', 'atr',
+                  'stochastic_k', 'stochastic_d', 'obv', 'adx', 'plus_di', 'minus_di')
+
+def price_range(prices, highs=None, lows=None):
+    """Return closes, highs and lows as float arrays (closes when highs/lows are missing)"""
+    closes = np.asarray(prices, dtype=float)
+    highs = closes if highs is None else np.asarray(highs, dtype=float)
+    lows = closes if lows is None else np.asarray(lows, dtype=float)
+    return closes, highs, lows
+
+def directional_movement(highs, lows, closes):
+    """True range, +DM and -DM of every bar after the first (length n - 1)"""
+    up = highs[1:] - highs[:-1]
+    down = lows[:-1] - lows[1:]
+    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    previous = closes[:-1]
+    true_range = np.maximum(highs[1:], previous) - np.minimum(lows[1:], previous)
+    return true_range, plus_dm, minus_dm
+
+def directional_values(atr, plus_dm, minus_dm):
+    """DX, +DI and -DI of one bar from its smoothed true range and directional movements"""
+    if not atr > 0:
+        return 0.0, 0.0, 0.0
+    plus_di = 100 * plus_dm / atr
+    minus_di = 100 * minus_dm / atr
+    total = plus_di + minus_di
+    dx = 100 * abs(plus_di - minus_di) / total if total > 0 else 0.0
+    return dx, plus_di, minus_di
+
+def directional_index(smoothed):
+    """ADX, +DI and -DI from the Wilder-smoothed (TR, +DM, -DM) rows"""
+    atr, plus_dm, minus_dm = smoothed
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = np.where(atr == 0, 0.0, 100 * plus_dm / atr)
+        minus_di = np.where(atr == 0, 0.0, 100 * minus_dm / atr)
+        total = plus_di + minus_di
+        dx = np.where(total > 0, 100 * np.abs(plus_di - minus_di) / total, 0.0)
+
+    adx = np.full(len(dx), np.nan)
+    adx[ADX_PERIODS-1:] = wilder_series(dx[ADX_PERIODS-1:], ADX_PERIODS)
+    return adx, plus_di, minus_di
+
+def percent_k(closes, highest, lowest):
+    """Stochastic %K of closes within their [lowest, highest] range (50 on a flat range)"""
+    spread = highest - lowest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(spread > 0, 100 * (closes - lowest) / spread, 50.0)
+
+def bollinger_series(prices, periods=BOLLINGER_PERIODS, width=BOLLINGER_WIDTH):
+    """Calculate the middle, upper and lower Bollinger Band series (NaN before `periods` bars)"""
+    prices = np.asarray(prices, dtype=float)
+    middle = sma_series(prices, periods)
+    deviation = np.full(len(prices), np.nan)
+    if len(prices) >= periods:
+        deviation[periods-1:] = sliding_window_view(prices, periods).std(axis=1)
+    return middle, middle + width * deviation, middle - width * deviation
+
+def atr_series(prices, highs=None, lows=None, periods=ATR_PERIODS):
+    """Calculate the Average True Range series (Wilder smoothing, NaN before `periods` + 1 bars)"""
+    closes, highs, lows = price_range(prices, highs, lows)
+    atr = np.full(len(closes), np.nan)
+    if len(closes) > 1:
+        atr[1:] = wilder_series(directional_movement(highs, lows, closes)[0], periods)
+    return atr
+
+def stochastic_series(prices, highs=None, lows=None, periods=STOCHASTIC_PERIODS,
+                      smoothing=STOCHASTIC_SMOOTHING):
+    """Calculate the stochastic %K and %D (`smoothing`-bar mean of %K) series"""
+    closes, highs, lows = price_range(prices, highs, lows)
+    k = np.full(len(closes), np.nan)
+    d = np.full(len(closes), np.nan)
+    if len(closes) < periods:
+        return k, d
+
+    k[periods-1:] = percent_k(closes[periods-1:], sliding_window_view(highs, periods).max(axis=1),
+                              sliding_window_view(lows, periods).min(axis=1))
+    d[periods-1:] = sma_series(k[periods-1:], smoothing)
+    return k, d
+
+def obv_series(prices, volumes):
+    """Calculate the On-Balance Volume series (0 on the first bar)"""
+    closes = np.asarray(prices, dtype=float)
+    obv = np.zeros(len(closes))
+    obv[1:] = np.cumsum(np.sign(np.diff(closes)) * np.asarray(volumes, dtype=float)[1:])
+    return obv
+
+def adx_series(prices, highs=None, lows=None, periods=ADX_PERIODS):
+    """Calculate the ADX, +DI and -DI series (ADX needs 2 * `periods` bars)"""
+    closes, highs, lows = price_range(prices, highs, lows)
+    adx, plus_di, minus_di = (np.full(len(closes), np.nan) for _ in range(3))
+    if len(closes) > periods:
+        smoothed = wilder_series(np.vstack(directional_movement(highs, lows, closes)), periods)
+        adx[1:], plus_di[1:], minus_di[1:] = directional_index(smoothed)
+    return adx, plus_di, minus_di
+
+def latest_bands(closes):
+    """Latest Bollinger Bands from the trailing closes (None when too short)"""
+    if len(closes) < BOLLINGER_PERIODS:
+        return dict.fromkeys(('bollinger_upper', 'bollinger_middle', 'bollinger_lower'))
+
+    # Plain arithmetic: on 20 values it is several times faster than NumPy's mean/std
+    window = closes[-BOLLINGER_PERIODS:]
+    middle = float(sum(window)) / BOLLINGER_PERIODS
+    spread = BOLLINGER_WIDTH * float(sum((close - middle) ** 2 for close in window) / BOLLINGER_PERIODS) ** 0.5
+    return {'bollinger_upper': middle + spread, 'bollinger_middle': middle,
+            'bollinger_lower': middle - spread}
+
+def latest_stochastic(closes, highs, lows):
+    """Latest %K and %D from the trailing bars (None when too short)"""
+    n_bars = len(closes)
+    k = []
+    for end in range(max(STOCHASTIC_PERIODS, n_bars - STOCHASTIC_SMOOTHING + 1), n_bars + 1):
+        highest = max(highs[end-STOCHASTIC_PERIODS:end])
+        lowest = min(lows[end-STOCHASTIC_PERIODS:end])
+        k.append(float(100 * (closes[end-1] - lowest) / (highest - lowest)) if highest > lowest else 50.0)
+
+    if not k:
+        return None, None
+    return k[-1], (sum(k) / STOCHASTIC_SMOOTHING if len(k) == STOCHASTIC_SMOOTHING else None)
+
+def _latest(value):
+    """Convert a NaN-able scalar to a float or None"""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+def extended_pass(prices, volumes, highs=None, lows=None):
+    """Compute the latest extended indicators of a ticker in one pass
+
+    The true range and directional movements are derived once and smoothed
+    together (one Wilder kernel call feeds both ATR and ADX); Bollinger and
+    the stochastic only read their trailing windows. Returns the indicators,
+    keyed by EXTENDED_NAMES (None where the history is too short), and the
+    smoothed values ('atr', 'plus_dm', 'minus_dm', 'adx', 'obv') a state
+    continues from.
+    """
+    closes, highs, lows = price_range(prices, highs, lows)
+    n_bars = len(closes)
+    indicators = dict.fromkeys(EXTENDED_NAMES)
+    smoothed_values = dict.fromkeys(('atr', 'plus_dm', 'minus_dm', 'adx', 'obv'))
+
+    indicators.update(latest_bands(closes))
+    indicators['stochastic_k'], indicators['stochastic_d'] = latest_stochastic(
+        closes[-RANGE_TAIL:], highs[-RANGE_TAIL:], lows[-RANGE_TAIL:])
+
+    if n_bars >= 2:
+        obv = float(np.dot(np.sign(np.diff(closes)), np.asarray(volumes, dtype=float)[1:]))
+        indicators['obv'] = smoothed_values['obv'] = obv
+
+    if n_bars > ATR_PERIODS:
+        smoothed = wilder_series(np.vstack(directional_movement(highs, lows, closes)), ATR_PERIODS)
+        adx, plus_di, minus_di = directional_index(smoothed)
+        smoothed_values.update(atr=_latest(smoothed[0, -1]), plus_dm=_latest(smoothed[1, -1]),
+                               minus_dm=_latest(smoothed[2, -1]), adx=_latest(adx[-1]))
+        indicators.update(atr=smoothed_values['atr'], adx=smoothed_values['adx'],
+                          plus_di=_latest(plus_di[-1]), minus_di=_latest(minus_di[-1]))
+
+    return indicators, smoothed_values
+
+def compute_extended_indicators(prices, volumes, highs=None, lows=None):
+    """Compute the latest extended indicators of a ticker (see extended_pass)"""
+    return extended_pass(prices, volumes, highs, lows)[0]
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Indicator Kernels
+Shared EMA / MACD kernels used by the market watcher scripts, process_ese_data.py
+and the batch engine, with a pure-NumPy backend and an optional Numba JIT one,
+and the full-series SMA / RSI / volume ratio of a single ticker
+
+Every *_series function returns an array aligned with its input (NaN where
+the indicator is not defined yet) in O(n), so charts read whole histories
+without recomputing one point at a time.
+
+The backend is chosen with the PEA_INDICATOR_BACKEND environment variable:
+"numpy", "numba", or "auto" (default: Numba when it is installed, else NumPy).
+
+Usage:
+    python indicator_kernels.py check    # compare every backend and calculate_macd to the reference loops
+"""
+
+from functools import lru_cache
+import os
+import sys
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Optional JIT backend
+    numba = None
+
+BACKEND_ENV = 'PEA_INDICATOR_BACKEND'
+BLOCK = 128
+CHECK_LENGTHS = (30, 250, 2500, 25000)
+# The per-prefix reference MACD is O(n^2): keep its histories short
+MACD_CHECK_LENGTHS = (26, 30, 34, 35, 60, 250, 600)
+CHECK_TOLERANCE = 1e-9
+
+@lru_cache(maxsize=None)
+def _block_weights(alpha, block):
+    """Return the (block x block) EMA weight matrix and the seed carry factors
+
+    Within a block, ema[k] = carry[k] * ema_before_block + sum_j weights[k, j] * x[j]
+    with weights[k, j] = alpha * (1 - alpha) ** (k - j) for j <= k.
+    """
+    decay = 1 - alpha
+    k = np.arange(block)
+    lags = k[:, None] - k[None, :]
+    weights = np.where(lags >= 0, alpha * decay ** np.maximum(lags, 0), 0.0)
+    carry = decay ** (k + 1)
+    return weights, carry
+
+def _ema_numpy(values, seed, alpha):
+    """EMA recurrence in blocks of BLOCK columns, each one matrix product
+
+    Python only loops over the blocks. A NaN makes the rest of its row NaN,
+    as in the sequential recurrence.
+    """
+    missing = np.isnan(values)
+    poisoned = np.logical_or.accumulate(missing, axis=1)
+    values = np.where(missing, 0.0, values)
+
+    out = np.empty_like(values)
+    weights, carry = _block_weights(alpha, BLOCK)
+    prev = seed
+    for start in range(0, values.shape[1], BLOCK):
+        block = values[:, start:start+BLOCK]
+        size = block.shape[1]
+        out[:, start:start+size] = block @ weights[:size, :size].T + prev[:, None] * carry[:size]
+        prev = out[:, start+size-1]
+
+    out[poisoned] = np.nan
+    return out
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _ema_numba_kernel(values, seed, alpha, out):
+        """Compiled EMA loop (compiled lazily, on first call)"""
+        for row in range(values.shape[0]):
+            prev = seed[row]
+            for i in range(values.shape[1]):
+                prev = (values[row, i] - prev) * alpha + prev
+                out[row, i] = prev
+
+def _ema_numba(values, seed, alpha):
+    """EMA recurrence compiled with Numba (same operations as the reference loop)"""
+    out = np.empty_like(values)
+    _ema_numba_kernel(values, seed, alpha, out)
+    return out
+
+BACKENDS = {'numpy': _ema_numpy, 'numba': _ema_numba}
+
+def available_backends():
+    """Return the names of the backends usable in this environment"""
+    return [name for name in BACKENDS if name != 'numba' or numba is not None]
+
+def select_backend(name):
+    """Resolve a backend name ("auto" picks Numba when installed)"""
+    if name == 'auto':
+        return 'numba' if numba is not None else 'numpy'
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown indicator backend: {name} (expected auto, numpy or numba)")
+    if name not in available_backends():
+        raise ValueError(f"Indicator backend {name} is not installed")
+    return name
+
+BACKEND = select_backend(os.environ.get(BACKEND_ENV, 'auto'))
+
+def set_backend(name):
+    """Switch the backend used by the kernels of this process"""
+    global BACKEND
+    BACKEND = select_backend(name)
+    return BACKEND
+
+def ema_continue(values, seed, periods, backend=None):
+    """Run the EMA recurrence over `values`, starting from `seed`
+
+    `values` is 1-D (with a scalar seed) or 2-D (one seed per row). Returns
+    ema[i] = (values[i] - ema[i-1]) * 2 / (periods + 1) + ema[i-1], with
+    ema[-1] = seed.
+    """
+    values = np.asarray(values, dtype=float)
+    vector = values.ndim == 1
+    values = np.atleast_2d(values)
+    seed = np.broadcast_to(np.asarray(seed, dtype=float), values.shape[:1]).copy()
+
+    if values.shape[1] == 0:
+        out = np.empty_like(values)
+    else:
+        out = BACKENDS[backend or BACKEND](values, seed, 2 / (periods + 1))
+    return out[0] if vector else out
+
+def ema_series(prices, periods, backend=None):
+    """Calculate the full EMA series, seeded with the mean of the first `periods` prices
+
+    Points before the seed are NaN.
+    """
+    prices = np.asarray(prices, dtype=float)
+    ema = np.full(len(prices), np.nan)
+    if len(prices) < periods:
+        return ema
+
+    ema[periods-1] = np.mean(prices[:periods])
+    ema[periods:] = ema_continue(prices[periods:], ema[periods-1], periods, backend)
+    return ema
+
+def ema_rows(values, periods, start, backend=None):
+    """Calculate EMA series for every row of a right-aligned matrix
+
+    `start` is the first valid column of each row. Each row is seeded with
+    the mean of its first `periods` values; columns before the seed are NaN.
+    Rows are shifted to start together so one kernel call covers all of them.
+    """
+    n_rows, n_days = values.shape
+    ema = np.full((n_rows, n_days), np.nan)
+    seed_col = np.asarray(start) + periods - 1
+    seeded = np.flatnonzero(seed_col < n_days)
+    if len(seeded) == 0:
+        return ema
+
+    window = seed_col[seeded, None] - np.arange(periods - 1, -1, -1)
+    seed_values = values[seeded[:, None], window].mean(axis=1)
+    ema[seeded, seed_col[seeded]] = seed_values
+
+    # Left-align the values after each seed; the NaN tail never feeds back
+    length = n_days - 1 - int(seed_col[seeded].min())
+    if length == 0:
+        return ema
+    cols = seed_col[seeded, None] + 1 + np.arange(length)
+    inside = cols < n_days
+    rows = np.broadcast_to(seeded[:, None], cols.shape)
+    aligned = np.where(inside, values[rows, np.minimum(cols, n_days - 1)], np.nan)
+
+    ema[rows[inside], cols[inside]] = ema_continue(aligned, seed_values, periods, backend)[inside]
+    return ema
+
+def macd_series(prices, backend=None):
+    """Calculate EMA12, EMA26, MACD, signal and histogram series in one forward pass
+
+    The MACD line is defined from index 25; the signal line is the EMA9 of the
+    MACD line, seeded on its first 9 values. Undefined points are NaN.
+    """
+    prices = np.asarray(prices, dtype=float)
+    ema12 = ema_series(prices, 12, backend)
+    ema26 = ema_series(prices, 26, backend)
+    macd_line = ema12 - ema26
+
+    signal_line = np.full(len(prices), np.nan)
+    if len(prices) >= 26:
+        signal_line[25:] = ema_series(macd_line[25:], 9, backend)
+
+    histogram = macd_line - signal_line
+
+    return ema12, ema26, macd_line, signal_line, histogram
+
+def sma_series(prices, periods):
+    """Calculate the full Simple Moving Average series from cumulative sums
+
+    Points before the first full window are NaN.
+    """
+    prices = np.asarray(prices, dtype=float)
+    sma = np.full(len(prices), np.nan)
+    if len(prices) < periods:
+        return sma
+
+    cumsum = np.concatenate([[0.0], np.cumsum(prices)])
+    sma[periods-1:] = (cumsum[periods:] - cumsum[:-periods]) / periods
+    return sma
+
+def wilder_series(values, periods):
+    """Wilder smoothing of `values`, seeded with the mean of the first `periods`
+
+    avg[i] = avg[i-1] + (values[i] - avg[i-1]) / periods, i.e. the EMA
+    recurrence of period 2 * periods - 1. `values` is 1-D or 2-D (one series
+    per row, smoothed in one kernel call). Points before the seed are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    average = np.full(values.shape, np.nan)
+    if values.shape[-1] < periods:
+        return average
+
+    average[..., periods-1] = values[..., :periods].mean(axis=-1)
+    average[..., periods:] = ema_continue(values[..., periods:], average[..., periods-1], 2 * periods - 1)
+    return average
+
+def rsi_series(prices, periods=14, smoothing='simple'):
+    """Calculate the full Relative Strength Index series
+
+    With smoothing='simple' (the watcher's definition) each point averages the
+    gains and losses of the last `periods` deltas; 'wilder' uses Wilder's
+    recursive smoothing instead. The first `periods` points are NaN, and a
+    window without losses reads 100.
+    """
+    prices = np.asarray(prices, dtype=float)
+    if len(prices) < periods + 1:
+        return np.full(len(prices), np.nan)
+    return rsi_from_deltas(np.diff(prices), periods, smoothing)
+
+def rsi_from_deltas(deltas, periods=14, smoothing='simple'):
+    """Calculate the RSI series of the prices whose bar-to-bar `deltas` are given (see rsi_series)"""
+    rsi = np.full(len(deltas) + 1, np.nan)
+    if len(deltas) < periods:
+        return rsi
+
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas < 0, -deltas, 0.0)
+
+    if smoothing == 'simple':
+        avg_gain = sma_series(gains, periods)
+        avg_loss = sma_series(losses, periods)
+        # Count the losses so that a loss-free window stays exact despite cumulative-sum rounding
+        no_loss = sma_series((deltas < 0).astype(float), periods) == 0
+    elif smoothing == 'wilder':
+        avg_gain = wilder_series(gains, periods)
+        avg_loss = wilder_series(losses, periods)
+        no_loss = avg_loss == 0
+    else:
+        raise ValueError(f"Unknown RSI smoothing: {smoothing} (expected simple or wilder)")
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(no_loss, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+    rsi[periods:] = values[periods-1:]
+    return rsi
+
+def volume_ratio_series(volumes, periods=20):
+    """Calculate the full series of volume / average volume of the last `periods` bars
+
+    Before `periods` bars the average is the bar's own volume (ratio 1); a
+    zero average also reads 1.
+    """
+    volumes = np.asarray(volumes, dtype=float)
+    average = sma_series(volumes, periods)
+    average[:periods-1] = volumes[:periods-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(average > 0, volumes / average, 1.0)
+
+def reference_ema_series(prices, periods):
+    """The original element-by-element EMA loop, kept as the reference"""
+    prices = np.asarray(prices, dtype=float)
+    ema = np.full(len(prices), np.nan)
+    if len(prices) < periods:
+        return ema
+
+    multiplier = 2 / (periods + 1)
+    ema[periods-1] = np.mean(prices[:periods])
+
+    for i in range(periods, len(prices)):
+        ema[i] = (prices[i] - ema[i-1]) * multiplier + ema[i-1]
+
+    return ema
+
+def reference_macd(prices):
+    """The original MACD (12, 26, 9), recomputing both EMAs on every prefix, kept as the reference"""
+    if len(prices) < 26:
+        return None, None, None
+
+    prices = np.asarray(prices, dtype=float)
+    macd_line = reference_ema_series(prices, 12)[-1] - reference_ema_series(prices, 26)[-1]
+
+    macd_values = []
+    for i in range(26, len(prices) + 1):
+        e12 = reference_ema_series(prices[:i], 12)[-1]
+        e26 = reference_ema_series(prices[:i], 26)[-1]
+        if e12 and e26:
+            macd_values.append(e12 - e26)
+
+    signal_line = macd_line
+    if len(macd_values) >= 9:
+        signal_line = reference_ema_series(macd_values, 9)[-1]
+
+    return macd_line, signal_line, macd_line - signal_line
+
+def reference_last9_macd(prices):
+    """market_watcher_analysis's original per-prefix MACD, kept as its reference
+
+    Its signal line is the EMA9 of the last 9 MACD values from index 26,
+    i.e. their mean.
+    """
+    if len(prices) < 26:
+        return None, None, None
+
+    prices = np.asarray(prices, dtype=float)
+    macd_line = reference_ema_series(prices, 12)[-1] - reference_ema_series(prices, 26)[-1]
+
+    macd_values = []
+    for i in range(len(prices) - 26):
+        e12 = reference_ema_series(prices[:26+i+1], 12)[-1]
+        e26 = reference_ema_series(prices[:26+i+1], 26)[-1]
+        if e12 and e26:
+            macd_values.append(e12 - e26)
+
+    signal_line = macd_line
+    if len(macd_values) >= 9:
+        signal_line = reference_ema_series(macd_values[-9:], 9)[-1]
+
+    return macd_line, signal_line, macd_line - signal_line
+
+# Scripts whose calculate_macd is checked, with the implementation it replaced
+MACD_REFERENCES = {
+    'market_watcher_real_data': reference_macd,
+    'market_watcher_complete': reference_macd,
+    'market_watcher_analysis': reference_last9_macd,
+}
+
+def max_relative_error(values, reference):
+    """Largest relative difference between two series (NaN positions must match)"""
+    if not np.array_equal(np.isnan(values), np.isnan(reference)):
+        return np.inf
+    valid = ~np.isnan(reference)
+    if not valid.any():
+        return 0.0
+    scale = np.maximum(np.abs(reference[valid]), 1.0)
+    return float(np.max(np.abs(values[valid] - reference[valid]) / scale))
+
+def check_backends(lengths=CHECK_LENGTHS, tolerance=CHECK_TOLERANCE):
+    """Compare every available backend with the reference loop on seeded series
+
+    Covers 1-D series (EMA 9/12/26/200 and the MACD signal line, which runs on
+    signed values) and a right-aligned matrix with rows of different lengths.
+    Returns True when all differences are within `tolerance`.
+    """
+    rng = np.random.RandomState(0)
+    ok = True
+
+    for backend in available_backends():
+        worst = 0.0
+        for length in lengths:
+            prices = np.maximum(100 + np.cumsum(rng.randn(length)), 1)
+            for periods in (9, 12, 26, 200):
+                worst = max(worst, max_relative_error(ema_series(prices, periods, backend),
+                                                      reference_ema_series(prices, periods)))
+
+            macd_line = reference_ema_series(prices, 12) - reference_ema_series(prices, 26)
+            if length >= 26:
+                worst = max(worst, max_relative_error(
+                    ema_series(macd_line[25:], 9, backend), reference_ema_series(macd_line[25:], 9)))
+
+        lengths_2d = rng.randint(1, 600, size=50)
+        matrix = np.full((50, 600), np.nan)
+        for row, length in enumerate(lengths_2d):
+            matrix[row, 600-length:] = np.maximum(100 + np.cumsum(rng.randn(length)), 1)
+        for periods in (12, 26, 200):
+            rows = ema_rows(matrix, periods, 600 - lengths_2d, backend)
+            for row, length in enumerate(lengths_2d):
+                reference = np.full(600, np.nan)
+                reference[600-length:] = reference_ema_series(matrix[row, 600-length:], periods)
+                worst = max(worst, max_relative_error(rows[row], reference))
+
+        passed = worst <= tolerance
+        ok = ok and passed
+        print(f"  {backend:<6} max relative error {worst:.2e}  {'OK' if passed else 'FAILED'}")
+
+    return ok
+
+def check_macd(lengths=MACD_CHECK_LENGTHS, tolerance=CHECK_TOLERANCE):
+    """Compare the scripts' calculate_macd with the per-prefix reference on seeded series
+
+    The lengths cover the signal line's fallback to the MACD line (fewer than
+    9 MACD values) and its seeding. Returns True when all differences are
+    within `tolerance`.
+    """
+    from importlib import import_module
+
+    rng = np.random.RandomState(1)
+    series = [np.maximum(100 + np.cumsum(rng.randn(length)), 1) for length in lengths]
+    ok = True
+
+    for module_name, reference_function in MACD_REFERENCES.items():
+        calculate_macd = import_module(module_name).calculate_macd
+        worst = max(max_relative_error(np.array(calculate_macd(prices), dtype=float),
+                                       np.array(reference_function(prices), dtype=float))
+                    for prices in series)
+        passed = worst <= tolerance
+        ok = ok and passed
+        print(f"  {module_name + '.calculate_macd':<40} max relative error {worst:.2e}  "
+              f"{'OK' if passed else 'FAILED'}")
+
+    return ok
+
+def main():
+    """Main execution"""
+    if len(sys.argv) != 2 or sys.argv[1] != 'check':
+        print(__doc__)
+        sys.exit(1)
+
+    print(f"Indicator backends: {', '.join(available_backends())} (active: {BACKEND})")
+    backends_ok = check_backends()
+    if not (check_macd() and backends_ok):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
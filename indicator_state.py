@@ -0,0 +1,193 @@
+"""
+Market Watcher PEA - Incremental Indicator State
+Persists per-ticker indicator state between daily runs so that a new bar
+updates RSI, EMA/MACD, moving averages, the volume ratio and the extended
+indicators (ATR, ADX and OBV recurrences, Bollinger and stochastic tails) in O(1)
+"""
+
+import json
+import os
+
+import numpy as np
+
+from batch_indicators import MA_PERIODS, RSI_PERIODS, VOLUME_PERIODS
+from extended_indicators import (ADX_PERIODS, ATR_PERIODS, RANGE_TAIL, directional_values, extended_pass,
+                                 latest_bands, latest_stochastic)
+
+STATE_VERSION = 2
+
+# The state only covers the steady regime: every window (up to MA200) is
+# full and the MACD signal line is seeded. Shorter histories are recomputed.
+MIN_STATE_BARS = max(MA_PERIODS)
+TAIL_LENGTH = max(MA_PERIODS)
+
+def load_indicator_states(state_file):
+    """Load the per-ticker indicator states, or an empty store"""
+    if not os.path.exists(state_file):
+        return {}
+
+    try:
+        with open(state_file, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"  WARNING: Could not read indicator state ({e}), recomputing")
+        return {}
+
+    if data.get('version') != STATE_VERSION:
+        return {}
+
+    return data.get('tickers', {})
+
+def save_indicator_states(state_file, states):
+    """Write the per-ticker indicator states atomically"""
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump({'version': STATE_VERSION, 'tickers': states}, f)
+    os.replace(tmp_file, state_file)
+
+def build_indicator_state(prices, volumes, ema12, ema26, macd_signal, highs=None, lows=None,
+                          smoothed=None):
+    """Build the state of a ticker from its full history and final EMA values
+
+    `smoothed` holds the final ATR/ADX/OBV values of extended_pass (computed
+    here when not given). Returns None when the history is too short for the
+    steady regime.
+    """
+    if len(prices) < MIN_STATE_BARS:
+        return None
+
+    prices = np.asarray(prices, dtype=float)
+    volumes = np.asarray(volumes, dtype=float)
+    highs = prices if highs is None else np.asarray(highs, dtype=float)
+    lows = prices if lows is None else np.asarray(lows, dtype=float)
+    if smoothed is None:
+        smoothed = extended_pass(prices, volumes, highs, lows)[1]
+
+    deltas = np.diff(prices[-(RSI_PERIODS + 1):])
+
+    state = {
+        'n_bars': len(prices),
+        'closes': prices[-TAIL_LENGTH:].tolist(),
+        'volumes': volumes[-VOLUME_PERIODS:].tolist(),
+        'ema12': float(ema12),
+        'ema26': float(ema26),
+        'ema9': float(macd_signal),
+        'gain_sum': float(np.where(deltas > 0, deltas, 0).sum()),
+        'loss_sum': float(np.where(deltas < 0, -deltas, 0).sum()),
+        'volume_sum': float(volumes[-VOLUME_PERIODS:].sum()),
+        'highs': highs[-RANGE_TAIL:].tolist(),
+        'lows': lows[-RANGE_TAIL:].tolist(),
+    }
+    state.update(smoothed)
+    for periods in MA_PERIODS:
+        state[f'sum{periods}'] = float(prices[-periods:].sum())
+
+    return state
+
+def _apply_bar(state, close, volume, high, low):
+    """Roll the state forward by one bar"""
+    closes = state['closes']
+    volumes = state['volumes']
+    highs = state['highs']
+    lows = state['lows']
+
+    # RSI: add the new delta, drop the one leaving the 14-delta window
+    delta = close - closes[-1]
+    leaving = closes[-RSI_PERIODS] - closes[-RSI_PERIODS - 1]
+    state['gain_sum'] += max(delta, 0) - max(leaving, 0)
+    state['loss_sum'] += max(-delta, 0) - max(-leaving, 0)
+
+    for periods in MA_PERIODS:
+        state[f'sum{periods}'] += close - closes[-periods]
+    state['volume_sum'] += volume - volumes[-VOLUME_PERIODS]
+
+    state['ema12'] += (close - state['ema12']) * (2 / 13)
+    state['ema26'] += (close - state['ema26']) * (2 / 27)
+    state['ema9'] += ((state['ema12'] - state['ema26']) - state['ema9']) * (2 / 10)
+
+    # ATR / ADX: Wilder smoothing of the true range and directional movements
+    up = high - highs[-1]
+    down = lows[-1] - low
+    true_range = max(high, closes[-1]) - min(low, closes[-1])
+    state['atr'] += (true_range - state['atr']) * (1 / ATR_PERIODS)
+    state['plus_dm'] += ((up if up > down and up > 0 else 0.0) - state['plus_dm']) * (1 / ATR_PERIODS)
+    state['minus_dm'] += ((down if down > up and down > 0 else 0.0) - state['minus_dm']) * (1 / ATR_PERIODS)
+    dx = directional_values(state['atr'], state['plus_dm'], state['minus_dm'])[0]
+    state['adx'] += (dx - state['adx']) * (1 / ADX_PERIODS)
+    state['obv'] += volume if delta > 0 else -volume if delta < 0 else 0.0
+
+    closes.append(close)
+    volumes.append(volume)
+    highs.append(high)
+    lows.append(low)
+    del closes[:-TAIL_LENGTH]
+    del volumes[:-VOLUME_PERIODS]
+    del highs[:-RANGE_TAIL]
+    del lows[:-RANGE_TAIL]
+    state['n_bars'] += 1
+
+def update_indicator_state(state, prices, volumes, highs=None, lows=None):
+    """Bring a stored state up to date with the ticker's history
+
+    Without highs and lows, the closes stand in for them.
+    Only the bars appended since the last run are applied. Returns the
+    updated state, or None when the history was rewritten (or the state is
+    missing) and a full recompute is required.
+    """
+    if not state or state.get('n_bars', 0) < MIN_STATE_BARS:
+        return None
+
+    n_bars = state['n_bars']
+    if len(prices) < n_bars:
+        return None
+
+    # Stored tail must still match the history, otherwise it was rewritten
+    tail = prices[n_bars-TAIL_LENGTH:n_bars]
+    volume_tail = volumes[n_bars-VOLUME_PERIODS:n_bars]
+    # Plain array views: slicing memory-mapped columns is comparatively slow
+    highs = np.asarray(prices if highs is None else highs, dtype=float)
+    lows = np.asarray(prices if lows is None else lows, dtype=float)
+    if not (np.array_equal(tail, state['closes'])
+            and np.array_equal(volume_tail, state['volumes'])
+            and highs[n_bars-RANGE_TAIL:n_bars].tolist() == state['highs']
+            and lows[n_bars-RANGE_TAIL:n_bars].tolist() == state['lows']):
+        return None
+
+    for close, volume, high, low in zip(prices[n_bars:], volumes[n_bars:], highs[n_bars:], lows[n_bars:]):
+        _apply_bar(state, float(close), float(volume), float(high), float(low))
+
+    return state
+
+def state_indicators(state):
+    """Return the latest indicator values held by a state"""
+    current_volume = state['volumes'][-1]
+
+    # Rolling sums can drift by rounding noise around zero
+    avg_gain = max(state['gain_sum'], 0) / RSI_PERIODS
+    avg_loss = state['loss_sum'] / RSI_PERIODS
+    if avg_loss <= 1e-12:
+        rsi = 100.0
+    else:
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    macd_line = state['ema12'] - state['ema26']
+    avg_volume = state['volume_sum'] / VOLUME_PERIODS
+
+    indicators = {
+        'rsi': rsi,
+        'macd': macd_line,
+        'macd_signal': state['ema9'],
+        'macd_histogram': macd_line - state['ema9'],
+        'volume_ratio': current_volume / avg_volume if avg_volume > 0 else 1.0,
+    }
+    for periods in MA_PERIODS:
+        indicators[f'ma{periods}'] = state[f'sum{periods}'] / periods
+
+    _, plus_di, minus_di = directional_values(state['atr'], state['plus_dm'], state['minus_dm'])
+    indicators.update(latest_bands(state['closes']))
+    indicators['stochastic_k'], indicators['stochastic_d'] = latest_stochastic(
+        state['closes'][-RANGE_TAIL:], state['highs'], state['lows'])
+    indicators.update(atr=state['atr'], obv=state['obv'], adx=state['adx'],
+                      plus_di=plus_di, minus_di=minus_di)
+
+    return indicators
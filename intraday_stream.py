@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Intraday Streaming Mode
+Replays (or follows) a local intraday bar feed, keeps a fixed-size ring
+buffer of closes and volumes per ticker and updates RSI, EMA/MACD, moving
+averages and the volume ratio in O(1) as each bar arrives
+
+generate_signal is only called for a ticker when one of the conditions it
+tests (RSI 30/40/60/65/70, MACD sign and crossover, price vs MA20/MA200,
+volume ratio 1.2/1.3, or an indicator becoming available) changes.
+
+Feed format: NDJSON lines {"ticker": ..., "time": ..., "close": ..., "volume": ...}
+or a CSV file with the same columns.
+
+Usage:
+    python intraday_stream.py FEED [--output signals.ndjson] [--follow] [--delay SECONDS]
+"""
+
+from datetime import datetime
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from batch_indicators import MA_PERIODS, RSI_PERIODS, VOLUME_PERIODS
+from result_stream import close_result_stream, open_result_stream, write_signal
+
+# Enough bars for MA200 and the bar leaving its window
+RING_CAPACITY = max(MA_PERIODS) + 1
+# Rolling sums are recomputed from the ring every RESYNC_BARS bars so that
+# rounding drift stays bounded however long the session runs
+RESYNC_BARS = 1000
+FOLLOW_POLL_SECONDS = 0.5
+
+def new_ring_buffer(capacity=RING_CAPACITY):
+    """Return an empty per-ticker ring buffer with its running indicator sums"""
+    return {
+        'closes': np.zeros(capacity),
+        'volumes': np.zeros(capacity),
+        'pos': 0,
+        'count': 0,
+        'close_total': 0.0,
+        'gain_sum': 0.0,
+        'loss_sum': 0.0,
+        'loss_count': 0,
+        'sums': {periods: 0.0 for periods in MA_PERIODS},
+        'volume_sum': 0.0,
+        'ema12': None,
+        'ema26': None,
+        'ema9': None,
+        'macd_sum': 0.0,
+    }
+
+def _back(buffer, key, k):
+    """Return the value pushed k bars ago (k=0 is the latest bar)"""
+    return buffer[key][(buffer['pos'] - 1 - k) % len(buffer[key])]
+
+def _resync(buffer):
+    """Recompute the rolling sums from the ring contents"""
+    n = buffer['count']
+    closes = np.array([_back(buffer, 'closes', k) for k in range(min(n, len(buffer['closes'])))][::-1])
+    volumes = np.array([_back(buffer, 'volumes', k) for k in range(min(n, len(buffer['volumes'])))][::-1])
+
+    for periods in MA_PERIODS:
+        buffer['sums'][periods] = float(closes[-periods:].sum())
+    buffer['volume_sum'] = float(volumes[-VOLUME_PERIODS:].sum())
+
+    deltas = np.diff(closes[-(RSI_PERIODS + 1):])
+    buffer['gain_sum'] = float(deltas[deltas > 0].sum())
+    buffer['loss_sum'] = float(-deltas[deltas < 0].sum())
+    buffer['loss_count'] = int((deltas < 0).sum())
+
+def push_bar(buffer, close, volume):
+    """Add one bar to a ticker's ring buffer and update its indicators in O(1)"""
+    count = buffer['count']
+
+    # RSI: add the new delta, drop the one leaving the 14-delta window
+    if count >= 1:
+        delta = close - _back(buffer, 'closes', 0)
+        if delta > 0:
+            buffer['gain_sum'] += delta
+        elif delta < 0:
+            buffer['loss_sum'] -= delta
+            buffer['loss_count'] += 1
+    if count >= RSI_PERIODS + 1:
+        leaving = _back(buffer, 'closes', RSI_PERIODS - 1) - _back(buffer, 'closes', RSI_PERIODS)
+        if leaving > 0:
+            buffer['gain_sum'] -= leaving
+        elif leaving < 0:
+            buffer['loss_sum'] += leaving
+            buffer['loss_count'] -= 1
+
+    for periods in MA_PERIODS:
+        buffer['sums'][periods] += close
+        if count >= periods:
+            buffer['sums'][periods] -= _back(buffer, 'closes', periods - 1)
+    buffer['volume_sum'] += volume
+    if count >= VOLUME_PERIODS:
+        buffer['volume_sum'] -= _back(buffer, 'volumes', VOLUME_PERIODS - 1)
+
+    buffer['closes'][buffer['pos']] = close
+    buffer['volumes'][buffer['pos']] = volume
+    buffer['pos'] = (buffer['pos'] + 1) % len(buffer['closes'])
+    buffer['count'] = count = count + 1
+
+    # EMAs are seeded with the mean of their first bars, as calculate_ema_series
+    if count <= 26:
+        buffer['close_total'] += close
+    for periods, key in ((12, 'ema12'), (26, 'ema26')):
+        if count == periods:
+            buffer[key] = buffer['close_total'] / periods
+        elif count > periods:
+            buffer[key] += (close - buffer[key]) * (2 / (periods + 1))
+
+    # Signal line: EMA9 of the MACD line, seeded on its first 9 values
+    if count >= 26:
+        macd_line = buffer['ema12'] - buffer['ema26']
+        if count < 26 + 8:
+            buffer['macd_sum'] += macd_line
+        elif count == 26 + 8:
+            buffer['ema9'] = (buffer['macd_sum'] + macd_line) / 9
+        else:
+            buffer['ema9'] += (macd_line - buffer['ema9']) * (2 / 10)
+
+    if count % RESYNC_BARS == 0:
+        _resync(buffer)
+
+def buffer_indicators(buffer):
+    """Return the latest indicators of a ring buffer, None where history is too short
+
+    Matches calculate_rsi / calculate_macd / calculate_moving_average and the
+    batch engine's volume ratio on the same bars.
+    """
+    count = buffer['count']
+    indicators = {'rsi': None, 'macd': None, 'macd_signal': None, 'macd_histogram': None}
+
+    if count >= RSI_PERIODS + 1:
+        if buffer['loss_count'] == 0:
+            indicators['rsi'] = 100.0
+        else:
+            rs = max(buffer['gain_sum'], 0) / buffer['loss_sum']
+            indicators['rsi'] = 100 - (100 / (1 + rs))
+
+    if count >= 26:
+        macd_line = buffer['ema12'] - buffer['ema26']
+        # Until 9 MACD values exist the signal line falls back to the MACD line
+        signal_line = buffer['ema9'] if buffer['ema9'] is not None else macd_line
+        indicators['macd'] = macd_line
+        indicators['macd_signal'] = signal_line
+        indicators['macd_histogram'] = macd_line - signal_line
+
+    for periods in MA_PERIODS:
+        indicators[f'ma{periods}'] = buffer['sums'][periods] / periods if count >= periods else None
+
+    current_volume = _back(buffer, 'volumes', 0)
+    avg_volume = buffer['volume_sum'] / VOLUME_PERIODS if count >= VOLUME_PERIODS else current_volume
+    indicators['volume_ratio'] = current_volume / avg_volume if avg_volume > 0 else 1.0
+
+    return indicators
+
+def signal_conditions(current_price, indicators):
+    """Return the outcome of every test generate_signal makes on its inputs
+
+    Two bars with the same conditions give the same signal type, confidence,
+    reasons and risks, so the signal only needs re-evaluating when they change.
+    """
+    rsi = indicators['rsi']
+    macd_line = indicators['macd']
+    macd_signal = indicators['macd_signal']
+    histogram = indicators['macd_histogram']
+    ma20 = indicators['ma20']
+    ma200 = indicators['ma200']
+    volume_ratio = indicators['volume_ratio']
+
+    return (
+        bool(rsi and rsi < 30), bool(rsi and rsi < 40),
+        bool(rsi and rsi > 60), bool(rsi and rsi > 65), bool(rsi and rsi > 70),
+        bool(histogram and histogram > 0), bool(histogram and histogram < 0),
+        bool(macd_line and macd_signal and macd_line > macd_signal),
+        bool(macd_line and macd_signal and macd_line < macd_signal),
+        bool(ma200 and current_price > ma200), bool(ma200 and current_price < ma200),
+        bool(ma20 and current_price > ma20), bool(ma20 and current_price < ma20),
+        volume_ratio > 1.2, volume_ratio > 1.3,
+    )
+
+def _parse_bar(record):
+    """Normalize a feed record into a bar dict"""
+    return {
+        'ticker': record['ticker'],
+        'time': record.get('time'),
+        'close': float(record['close']),
+        'volume': float(record.get('volume') or 0),
+    }
+
+def read_bar_feed(feed_file, follow=False):
+    """Yield bars from an NDJSON or CSV feed file
+
+    With `follow`, keep waiting for lines appended to an NDJSON feed (as `tail -f`).
+    """
+    if feed_file.endswith('.csv'):
+        if follow:
+            raise ValueError("Only NDJSON feeds can be followed")
+        with open(feed_file, 'r', newline='') as f:
+            for record in csv.DictReader(f):
+                yield _parse_bar(record)
+        return
+
+    with open(feed_file, 'rb') as f:
+        while True:
+            position = f.tell()
+            line = f.readline()
+            if follow and not line.endswith(b'\n'):
+                # Nothing new, or a line still being written: read it again later
+                f.seek(position)
+                time.sleep(FOLLOW_POLL_SECONDS)
+                continue
+            if not line:
+                return
+            if line.strip():
+                yield _parse_bar(json.loads(line))
+
+def run_stream(bars, company_names, on_signal, delay=0):
+    """Push every bar into its ticker's ring buffer and re-evaluate signals on changes
+
+    Returns the number of bars processed, of signal evaluations and the total
+    time spent updating indicators.
+    """
+    from market_watcher_real_data import generate_signal
+
+    buffers = {}
+    conditions = {}
+    n_bars = n_signals = 0
+    update_seconds = 0.0
+
+    try:
+        for bar in bars:
+            ticker = bar['ticker']
+            start = time.perf_counter()
+            buffer = buffers.get(ticker)
+            if buffer is None:
+                buffer = buffers[ticker] = new_ring_buffer()
+            push_bar(buffer, bar['close'], bar['volume'])
+            indicators = buffer_indicators(buffer)
+            bar_conditions = signal_conditions(bar['close'], indicators)
+            update_seconds += time.perf_counter() - start
+            n_bars += 1
+
+            if conditions.get(ticker) != bar_conditions:
+                conditions[ticker] = bar_conditions
+                signal_result = generate_signal(
+                    ticker, company_names.get(ticker, ticker), bar['close'],
+                    indicators['rsi'], indicators['macd'], indicators['macd_signal'],
+                    indicators['macd_histogram'], indicators['ma20'], indicators['ma50'],
+                    indicators['ma200'], indicators['volume_ratio']
+                )
+                signal_result['bar_time'] = bar['time']
+                n_signals += 1
+                on_signal(signal_result)
+
+            if delay:
+                time.sleep(delay)
+    except KeyboardInterrupt:
+        print("\nStream interrupted")
+
+    return n_bars, n_signals, update_seconds
+
+def load_company_names(excel_file):
+    """Map tickers to company names from the watchlist, when it is available"""
+    if not os.path.exists(excel_file):
+        return {}
+
+    from market_watcher_real_data import parse_watchlist
+    from watchlist_cache import cached_parse_watchlist
+
+    active_tickers, _ = cached_parse_watchlist(excel_file, parse_watchlist)
+    return dict(zip(active_tickers['Ticker'], active_tickers['Nom']))
+
+def parse_args():
+    """Parse command line arguments"""
+    from market_watcher_real_data import EXCEL_FILE
+
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Intraday streaming mode")
+    parser.add_argument('feed', help="Bar feed file (NDJSON or .csv)")
+    parser.add_argument('--output', help="Write re-evaluated signals to this NDJSON file (replaced if it exists)")
+    parser.add_argument('--follow', action='store_true', help="Keep reading bars appended to an NDJSON feed")
+    parser.add_argument('--delay', type=float, default=0, help="Seconds to wait between bars when replaying")
+    parser.add_argument('--watchlist', default=EXCEL_FILE, help="Excel watchlist used for company names")
+    parser.add_argument('--min-confidence', type=int, default=0,
+                        help="Only print signals with at least this confidence")
+    args = parser.parse_args()
+    if args.follow and args.feed.endswith('.csv'):
+        parser.error("--follow needs an NDJSON feed (CSV feeds are read once)")
+    return args
+
+def main():
+    """Main execution"""
+    args = parse_args()
+
+    print("="*80)
+    print("MARKET WATCHER PEA - Intraday Stream")
+    print(f"Execution Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*80)
+
+    if not os.path.exists(args.feed):
+        print(f"ERROR: Bar feed not found: {args.feed}")
+        sys.exit(1)
+
+    company_names = load_company_names(args.watchlist)
+    stream = open_result_stream(args.output) if args.output else None
+
+    def on_signal(signal_result):
+        if stream is not None:
+            write_signal(stream, signal_result)
+        if signal_result['confidence_score'] >= args.min_confidence:
+            print(f"  {signal_result['bar_time']} {signal_result['ticker']}: "
+                  f"{signal_result['signal_type'].upper()} "
+                  f"(Confidence: {signal_result['confidence_score']}/100)")
+
+    try:
+        n_bars, n_signals, update_seconds = run_stream(
+            read_bar_feed(args.feed, args.follow), company_names, on_signal, args.delay)
+    finally:
+        if stream is not None:
+            close_result_stream(stream)
+
+    print(f"\nBars processed: {n_bars}, signal evaluations: {n_signals}")
+    if n_bars:
+        print(f"Average indicator update: {update_seconds / n_bars * 1e6:.1f} us/bar")
+    if stream is not None:
+        print(f"Signals saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
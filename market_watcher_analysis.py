@@ -6,13 +6,23 @@ Analyzes PEA-eligible securities and generates trading signals
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+import argparse
 import json
 import sys
+import zlib
+
+from indicator_kernels import ema_series, rsi_series, sma_series
+from pipeline_metrics import merge_metrics, new_metrics, save_metrics, stage
+from result_stream import close_result_stream, open_result_stream, stream_path, write_signal
+from signal_history import append_results
+from watchlist_cache import cached_parse_watchlist
 
 # File paths
 EXCEL_FILE = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/PEA_Watchlist_Indicateurs.xlsx'
 OUTPUT_JSON = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/market_analysis_results.json'
+SIGNAL_HISTORY_DB = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/signal_history.db'
 
 def parse_watchlist(excel_file):
     """Parse the Excel watchlist and return active tickers"""
@@ -32,79 +42,80 @@ def parse_watchlist(excel_file):
         print(f"ERROR parsing Excel file: {e}")
         sys.exit(1)
 
+def calculate_rsi_series(prices, periods=14):
+    """Calculate the full Relative Strength Index series (NaN before `periods` deltas)"""
+    return rsi_series(prices, periods)
+
 def calculate_rsi(prices, periods=14):
-    """Calculate Relative Strength Index"""
+    """Calculate Relative Strength Index
+
+    This script reads the RSI of the first `periods` deltas of the history.
+    """
     if len(prices) < periods + 1:
         return None
 
-    deltas = np.diff(prices)
-    gain = np.where(deltas > 0, deltas, 0)
-    loss = np.where(deltas < 0, -deltas, 0)
-
-    avg_gain = np.mean(gain[:periods])
-    avg_loss = np.mean(loss[:periods])
+    return calculate_rsi_series(prices[:periods+1], periods)[-1]
 
-    if avg_loss == 0:
-        return 100.0
-
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-
-    return rsi
+def calculate_ema_series(prices, periods):
+    """Calculate the full Exponential Moving Average series (NaN before the seed)"""
+    return ema_series(prices, periods)
 
 def calculate_ema(prices, periods):
     """Calculate Exponential Moving Average"""
     if len(prices) < periods:
         return None
 
-    multiplier = 2 / (periods + 1)
-    ema = [np.mean(prices[:periods])]
+    return calculate_ema_series(prices, periods)[-1]
 
-    for price in prices[periods:]:
-        ema.append((price - ema[-1]) * multiplier + ema[-1])
+def calculate_macd_series(prices):
+    """Calculate EMA12, EMA26, MACD, signal and histogram series in one forward pass
 
-    return ema[-1]
+    The signal line keeps this script's definition: the EMA9 of the last 9
+    MACD values from index 26 onwards, i.e. their 9-bar mean.
+    """
+    prices = np.asarray(prices, dtype=float)
+    ema12 = calculate_ema_series(prices, 12)
+    ema26 = calculate_ema_series(prices, 26)
+    macd_line = ema12 - ema26
+
+    signal_line = np.full(len(prices), np.nan)
+    if len(prices) >= 35:
+        window_sums = np.cumsum(np.concatenate(([0.0], macd_line[26:])))
+        signal_line[34:] = (window_sums[9:] - window_sums[:-9]) / 9
+
+    histogram = macd_line - signal_line
+
+    return ema12, ema26, macd_line, signal_line, histogram
 
 def calculate_macd(prices):
     """Calculate MACD (12, 26, 9)"""
     if len(prices) < 26:
         return None, None, None
 
-    ema12 = calculate_ema(prices, 12)
-    ema26 = calculate_ema(prices, 26)
-
-    if ema12 is None or ema26 is None:
-        return None, None, None
-
-    macd_line = ema12 - ema26
-
-    # Calculate signal line (9-period EMA of MACD)
-    # For simplicity, using last 9 MACD values
-    macd_values = []
-    for i in range(len(prices) - 26):
-        e12 = calculate_ema(prices[:26+i+1], 12)
-        e26 = calculate_ema(prices[:26+i+1], 26)
-        if e12 and e26:
-            macd_values.append(e12 - e26)
+    _, _, macd_values, signal_values, _ = calculate_macd_series(prices)
+    macd_line = macd_values[-1]
 
-    if len(macd_values) < 9:
+    # Until 9 MACD values exist the signal line falls back to the MACD line
+    if np.isnan(signal_values[-1]):
         signal_line = macd_line
     else:
-        signal_line = calculate_ema(np.array(macd_values[-9:]), 9)
-        if signal_line is None:
-            signal_line = macd_line
+        signal_line = signal_values[-1]
 
     histogram = macd_line - signal_line
 
     return macd_line, signal_line, histogram
 
+def calculate_moving_average_series(prices, periods):
+    """Calculate the full Simple Moving Average series (NaN before the first window)"""
+    return sma_series(prices, periods)
+
 def calculate_moving_average(prices, periods):
     """Calculate Simple Moving Average"""
     if len(prices) < periods:
         return None
-    return np.mean(prices[-periods:])
+    return calculate_moving_average_series(prices, periods)[-1]
 
-def analyze_ticker(ticker_info, historical_data):
+def analyze_ticker(ticker_info, historical_data, metrics=None):
     """Perform complete technical analysis on a ticker"""
 
     ticker = ticker_info['Ticker']
@@ -114,21 +125,24 @@ def analyze_ticker(ticker_info, historical_data):
     print(f"Analyzing: {company_name} ({ticker})")
     print(f"{'='*60}")
 
-    # Mock historical data for demonstration
-    # In production, this would come from Yahoo Finance MCP
-    np.random.seed(hash(ticker) % 2**32)
-    base_price = 100 + np.random.random() * 200
-
-    # Generate realistic price history (250 trading days)
-    trend = np.linspace(0, np.random.randn() * 20, 250)
-    noise = np.random.randn(250) * 5
-    prices = base_price + trend + noise
-    prices = np.maximum(prices, 1)  # Ensure positive prices
-
-    # Generate volume data
-    base_volume = 100000 + np.random.random() * 500000
-    volumes = base_volume * (1 + np.random.randn(250) * 0.3)
-    volumes = np.maximum(volumes, 1000)
+    with stage(metrics, 'data_load', ticker):
+        # Mock historical data for demonstration
+        # In production, this would come from Yahoo Finance MCP
+        # crc32 rather than hash(): str hashes are salted per process, which
+        # would give worker processes different series than a serial run
+        np.random.seed(zlib.crc32(ticker.encode('utf-8')))
+        base_price = 100 + np.random.random() * 200
+
+        # Generate realistic price history (250 trading days)
+        trend = np.linspace(0, np.random.randn() * 20, 250)
+        noise = np.random.randn(250) * 5
+        prices = base_price + trend + noise
+        prices = np.maximum(prices, 1)  # Ensure positive prices
+
+        # Generate volume data
+        base_volume = 100000 + np.random.random() * 500000
+        volumes = base_volume * (1 + np.random.randn(250) * 0.3)
+        volumes = np.maximum(volumes, 1000)
 
     current_price = prices[-1]
     current_volume = volumes[-1]
@@ -137,13 +151,14 @@ def analyze_ticker(ticker_info, historical_data):
     print(f"Current volume: {current_volume:.0f}")
 
     # Calculate technical indicators
-    rsi = calculate_rsi(prices)
-    macd_line, macd_signal, macd_histogram = calculate_macd(prices)
-    ma20 = calculate_moving_average(prices, 20)
-    ma50 = calculate_moving_average(prices, 50)
-    ma200 = calculate_moving_average(prices, 200)
-    avg_volume_20 = np.mean(volumes[-20:])
-    volume_ratio = current_volume / avg_volume_20
+    with stage(metrics, 'indicators', ticker):
+        rsi = calculate_rsi(prices)
+        macd_line, macd_signal, macd_histogram = calculate_macd(prices)
+        ma20 = calculate_moving_average(prices, 20)
+        ma50 = calculate_moving_average(prices, 50)
+        ma200 = calculate_moving_average(prices, 200)
+        avg_volume_20 = np.mean(volumes[-20:])
+        volume_ratio = current_volume / avg_volume_20
 
     print(f"\nTechnical Indicators:")
     print(f"  RSI(14): {rsi:.2f}" if rsi else "  RSI(14): N/A")
@@ -156,11 +171,12 @@ def analyze_ticker(ticker_info, historical_data):
     print(f"  Volume Ratio: {volume_ratio:.2f}")
 
     # Generate trading signal
-    signal_result = generate_signal(
-        ticker, company_name, current_price,
-        rsi, macd_line, macd_signal, macd_histogram,
-        ma20, ma50, ma200, volume_ratio
-    )
+    with stage(metrics, 'signals', ticker):
+        signal_result = generate_signal(
+            ticker, company_name, current_price,
+            rsi, macd_line, macd_signal, macd_histogram,
+            ma20, ma50, ma200, volume_ratio
+        )
 
     return signal_result
 
@@ -324,61 +340,158 @@ def generate_signal(ticker, company_name, current_price,
 
     return result
 
-def main():
-    """Main execution function"""
+def analyze_ticker_chunk(ticker_rows, emit=None):
+    """Analyze a chunk of tickers, in this process or a worker
+
+    Returns the signals in watchlist order and the stage metrics of the chunk.
+    With `emit`, each signal is passed to it as soon as it is generated
+    instead of being collected in the returned list.
+    """
+    metrics = new_metrics()
+    results = []
+    for ticker_row in ticker_rows:
+        try:
+            # In production, fetch historical data from Yahoo Finance MCP here
+            historical_data = None
+
+            signal_result = analyze_ticker(ticker_row, historical_data, metrics)
+            if emit is not None:
+                emit(signal_result)
+            else:
+                results.append(signal_result)
+
+        except Exception as e:
+            print(f"ERROR analyzing {ticker_row['Ticker']}: {e}")
+            continue
+
+    return results, metrics
+
+def split_chunks(items, n_chunks):
+    """Split a list into at most n_chunks contiguous chunks of similar size"""
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size, extra = divmod(len(items), n_chunks)
+    chunks = []
+    start = 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+def analyze_tickers_parallel(ticker_rows, workers, metrics=None, emit=None):
+    """Analyze tickers across a process pool, merging results in watchlist order
+
+    Worker stage times are summed into `metrics`. With `emit`, the signals of
+    each chunk are passed to it as soon as the chunk is merged.
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_results, chunk_metrics in executor.map(analyze_ticker_chunk,
+                                                         split_chunks(ticker_rows, workers * 4)):
+            if emit is not None:
+                for signal_result in chunk_results:
+                    emit(signal_result)
+            else:
+                results.extend(chunk_results)
+            if metrics is not None:
+                merge_metrics(metrics, chunk_metrics)
+    return results
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Technical Analysis Engine")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes for the ticker analysis (default: 1)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write results as NDJSON, one line per ticker as soon as it is analyzed")
+    return parser.parse_args()
+
+def main(workers=1, stream_output=False):
+    """Main execution function
+
+    With `stream_output`, signals are appended to an NDJSON file next to
+    OUTPUT_JSON as they are generated, followed by a summary record.
+    """
     print("="*80)
     print("MARKET WATCHER PEA - Technical Analysis Engine")
     print(f"Execution Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*80)
 
+    metrics = new_metrics()
+
     # Step 1: Parse watchlist
     print("\nStep 1: Loading watchlist from Excel file...")
-    active_tickers, previous_indicators = parse_watchlist(EXCEL_FILE)
+    with stage(metrics, 'watchlist_load'):
+        active_tickers, previous_indicators = cached_parse_watchlist(EXCEL_FILE, parse_watchlist)
 
     if len(active_tickers) == 0:
         print("WARNING: No active tickers found in watchlist!")
         sys.exit(0)
 
     # Step 2: Analyze each ticker
-    print(f"\nStep 2: Analyzing {len(active_tickers)} tickers...")
-
-    results = []
-    for idx, ticker_row in active_tickers.iterrows():
-        try:
-            # In production, fetch historical data from Yahoo Finance MCP here
-            historical_data = None
-
-            signal_result = analyze_ticker(ticker_row, historical_data)
-            results.append(signal_result)
+    ticker_rows = [ticker_row for _, ticker_row in active_tickers.iterrows()]
+
+    stream = None
+    emit = None
+    if stream_output:
+        stream = open_result_stream(stream_path(OUTPUT_JSON))
+        emit = lambda signal: write_signal(stream, signal)
+        print(f"Streaming results to: {stream['path']}")
+
+    if workers > 1:
+        print(f"\nStep 2: Analyzing {len(ticker_rows)} tickers ({workers} workers)...")
+        with stage(metrics, 'analysis'):
+            results = analyze_tickers_parallel(ticker_rows, workers, metrics, emit)
+    else:
+        print(f"\nStep 2: Analyzing {len(ticker_rows)} tickers...")
+        with stage(metrics, 'analysis'):
+            results, chunk_metrics = analyze_ticker_chunk(ticker_rows, emit)
+        merge_metrics(metrics, chunk_metrics)
 
-        except Exception as e:
-            print(f"ERROR analyzing {ticker_row['Ticker']}: {e}")
-            continue
+    # Filter high-confidence signals (score >= 60)
+    if stream is not None:
+        analyzed = stream['count']
+        high_confidence_signals = stream['high_confidence']
+    else:
+        analyzed = len(results)
+        high_confidence_signals = [r for r in results if r['confidence_score'] >= 60]
 
     # Step 3: Save results
     print(f"\n{'='*80}")
-    print(f"Analysis Complete: {len(results)} tickers processed")
+    print(f"Analysis Complete: {analyzed} tickers processed")
     print(f"{'='*80}")
 
-    # Filter high-confidence signals (score >= 60)
-    high_confidence_signals = [r for r in results if r['confidence_score'] >= 60]
-
     print(f"\nHigh-confidence signals (score >= 60): {len(high_confidence_signals)}")
     for signal in high_confidence_signals:
         print(f"  - {signal['ticker']}: {signal['signal_type'].upper()} (Score: {signal['confidence_score']})")
 
     # Save all results to JSON
-    output_data = {
-        "execution_time": datetime.now().isoformat(),
-        "total_tickers_analyzed": len(results),
-        "high_confidence_signals": len(high_confidence_signals),
-        "signals": results
-    }
+    if stream is not None:
+        with stage(metrics, 'json_save'):
+            close_result_stream(stream)
+        output_file = stream['path']
+    else:
+        output_data = {
+            "execution_time": datetime.now().isoformat(),
+            "total_tickers_analyzed": len(results),
+            "high_confidence_signals": len(high_confidence_signals),
+            "signals": results
+        }
 
-    with open(OUTPUT_JSON, 'w') as f:
-        json.dump(output_data, f, indent=2)
+        with stage(metrics, 'json_save'):
+            with open(OUTPUT_JSON, 'w') as f:
+                json.dump(output_data, f, indent=2)
+        output_file = OUTPUT_JSON
 
-    print(f"\nResults saved to: {OUTPUT_JSON}")
+    print(f"\nResults saved to: {output_file}")
+
+    with stage(metrics, 'history_save'):
+        try:
+            append_results(SIGNAL_HISTORY_DB, output_file, 'market_watcher_analysis')
+        except Exception as e:
+            print(f"  WARNING: Could not append to signal history: {e}")
+    save_metrics(metrics, OUTPUT_JSON, script='market_watcher_analysis', workers=workers,
+                 tickers_analyzed=analyzed)
     print("\nNext steps:")
     print("  1. Update Excel file with new indicators")
     print("  2. Generate Markdown reports for high-confidence signals")
@@ -386,4 +499,5 @@ def main():
     print("  4. Send email alerts via Gmail")
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(workers=args.workers, stream_output=args.stream)
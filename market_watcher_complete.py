@@ -7,79 +7,70 @@ Fetches real market data, analyzes, generates reports, and sends alerts
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import argparse
 import json
 import sys
-import os
+
+from indicator_kernels import ema_series, macd_series, rsi_series, sma_series
+from pipeline_metrics import new_metrics, save_metrics, stage
+from report_renderer import render_report, write_reports
+from result_stream import close_result_stream, open_result_stream, stream_path, write_signal
+from signal_history import append_results
 
 # File paths
 EXCEL_FILE = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/PEA_Watchlist_Indicateurs.xlsx'
 OUTPUT_JSON = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/market_signals.json'
+SIGNAL_HISTORY_DB = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/signal_history.db'
 REPORTS_DIR = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/reports'
 
 # Technical indicator calculations
+def calculate_rsi_series(prices, periods=14):
+    """Calculate full RSI series (NaN before `periods` deltas)"""
+    return rsi_series(prices, periods)
+
 def calculate_rsi(prices, periods=14):
     """Calculate RSI indicator"""
     if len(prices) < periods + 1:
         return None
-    deltas = np.diff(prices)
-    gain = np.where(deltas > 0, deltas, 0)
-    loss = np.where(deltas < 0, -deltas, 0)
-    avg_gain = np.mean(gain[-periods:])
-    avg_loss = np.mean(loss[-periods:])
-    if avg_loss == 0:
-        return 100.0
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
+    return calculate_rsi_series(prices, periods)[-1]
+
+def calculate_ema_series(prices, periods):
+    """Calculate full EMA series (NaN before the seed)"""
+    return ema_series(prices, periods)
 
 def calculate_ema(prices, periods):
     """Calculate EMA"""
     if len(prices) < periods:
         return None
-    prices = np.array(prices)
-    multiplier = 2 / (periods + 1)
-    ema = np.zeros(len(prices))
-    ema[periods-1] = np.mean(prices[:periods])
-    for i in range(periods, len(prices)):
-        ema[i] = (prices[i] - ema[i-1]) * multiplier + ema[i-1]
-    return ema[-1]
+    return calculate_ema_series(prices, periods)[-1]
+
+def calculate_macd_series(prices):
+    """Calculate EMA12, EMA26, MACD, signal and histogram series in one pass"""
+    return macd_series(prices)
 
 def calculate_macd(prices):
     """Calculate MACD (12, 26, 9)"""
     if len(prices) < 26:
         return None, None, None
 
-    prices = np.array(prices)
-    ema12 = calculate_ema(prices, 12)
-    ema26 = calculate_ema(prices, 26)
-
-    if ema12 is None or ema26 is None:
-        return None, None, None
-
-    macd_line = ema12 - ema26
+    _, _, macd_values, signal_values, _ = calculate_macd_series(prices)
+    macd_line = macd_values[-1]
 
-    # Calculate MACD values for signal line
-    macd_values = []
-    for i in range(26, len(prices)+1):
-        e12 = calculate_ema(prices[:i], 12)
-        e26 = calculate_ema(prices[:i], 26)
-        if e12 and e26:
-            macd_values.append(e12 - e26)
-
-    if len(macd_values) < 9:
-        signal_line = macd_line
-    else:
-        signal_line = calculate_ema(np.array(macd_values), 9)
-        if signal_line is None:
-            signal_line = macd_line
+    # Fewer than 9 MACD values: signal line falls back to the MACD line
+    signal_line = macd_line if np.isnan(signal_values[-1]) else signal_values[-1]
 
     histogram = macd_line - signal_line
     return macd_line, signal_line, histogram
 
+def calculate_ma_series(prices, periods):
+    """Calculate full Simple Moving Average series (NaN before the first window)"""
+    return sma_series(prices, periods)
+
 def calculate_ma(prices, periods):
     """Calculate Simple Moving Average"""
     if len(prices) < periods:
         return None
-    return np.mean(prices[-periods:])
+    return calculate_ma_series(prices, periods)[-1]
 
 def generate_signal(ticker, company_name, current_price, rsi, macd_line, macd_signal,
                    macd_histogram, ma20, ma50, ma200, volume_ratio):
@@ -222,91 +213,33 @@ def generate_signal(ticker, company_name, current_price, rsi, macd_line, macd_si
 
 def generate_markdown_report(signal):
     """Generate detailed Markdown report for a signal"""
+    return render_report(signal)
 
-    emoji = "🟢" if signal['signal_type'] == "buy" else "🔴" if signal['signal_type'] == "sell" else "🟡"
-
-    report = f"""# {emoji} {signal['signal_type'].upper()} SIGNAL: {signal['company_name']}
-
-**Ticker**: {signal['ticker']}
-**Signal Date**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-**Confidence Score**: {signal['confidence_score']}/100
-**Current Price**: {signal['technical_details']['current_price']:.2f} EUR
-
----
-
-## Executive Summary
-
-{signal['summary']}
-
----
-
-## Key Technical Points
-
-"""
-
-    for i, point in enumerate(signal['key_points'], 1):
-        report += f"{i}. {point}\n"
-
-    report += f"""
----
-
-## Technical Indicators
-
-| Indicator | Value | Interpretation |
-|-----------|-------|----------------|
-| **RSI (14)** | {signal['technical_details']['rsi']:.2f if signal['technical_details']['rsi'] else 'N/A'} | {'Oversold' if signal['technical_details']['rsi'] and signal['technical_details']['rsi'] < 30 else 'Overbought' if signal['technical_details']['rsi'] and signal['technical_details']['rsi'] > 70 else 'Neutral'} |
-| **MACD** | {signal['technical_details']['macd']:.4f if signal['technical_details']['macd'] else 'N/A'} | {'Bullish' if signal['technical_details']['macd_histogram'] and signal['technical_details']['macd_histogram'] > 0 else 'Bearish'} |
-| **MA20** | {signal['technical_details']['ma20']:.2f if signal['technical_details']['ma20'] else 'N/A'} EUR | Price {'above' if signal['technical_details']['ma20'] and signal['technical_details']['current_price'] > signal['technical_details']['ma20'] else 'below'} MA20 |
-| **MA50** | {signal['technical_details']['ma50']:.2f if signal['technical_details']['ma50'] else 'N/A'} EUR | Price {'above' if signal['technical_details']['ma50'] and signal['technical_details']['current_price'] > signal['technical_details']['ma50'] else 'below'} MA50 |
-| **MA200** | {signal['technical_details']['ma200']:.2f if signal['technical_details']['ma200'] else 'N/A'} EUR | Long-term {'uptrend' if signal['technical_details']['ma200'] and signal['technical_details']['current_price'] > signal['technical_details']['ma200'] else 'downtrend'} |
-| **Volume Ratio** | {signal['technical_details']['volume_ratio']:.2f}x | {'Elevated' if signal['technical_details']['volume_ratio'] > 1.2 else 'Normal'} volume |
-
----
-
-## Risk Factors
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Complete Analysis Workflow")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write results as NDJSON, one line per ticker as soon as it is analyzed")
+    return parser.parse_args()
 
-"""
-
-    for i, risk in enumerate(signal['risks'], 1):
-        report += f"{i}. {risk}\n"
-
-    report += f"""
----
-
-## Action Suggestion
-
-{signal['action_suggestion']}
-
-### Price Targets
-
-- **Short-term target**: {signal['target_price']['short_term']:.2f} EUR
-- **Medium-term target**: {signal['target_price']['medium_term']:.2f} EUR
-- **Stop-loss**: {signal['target_price']['stop_loss']:.2f} EUR
-
----
-
-## Disclaimer
-
-⚠️ **DISCLAIMER**: This analysis is provided for informational purposes only and does not constitute investment advice. All investment decisions remain your sole responsibility. Past performance does not guarantee future results. Always conduct your own research and consider consulting a licensed financial advisor.
-
----
-
-*Report generated by Market Watcher PEA on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}*
-"""
+def main(stream_output=False):
+    """Main execution
 
-    return report
-
-def main():
-    """Main execution"""
+    With `stream_output`, signals are appended to an NDJSON file next to
+    OUTPUT_JSON as they are generated, followed by a summary record.
+    """
     print("="*80)
     print("MARKET WATCHER PEA - Complete Analysis Workflow")
     print(f"Execution Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*80)
 
+    metrics = new_metrics()
+
     # Load watchlist
     print("\n[1/7] Loading watchlist from Excel...")
-    watchlist_df = pd.read_excel(EXCEL_FILE, sheet_name='Watchlist')
-    active_tickers = watchlist_df[watchlist_df['Actif'] == True]
+    with stage(metrics, 'watchlist_load'):
+        watchlist_df = pd.read_excel(EXCEL_FILE, sheet_name='Watchlist')
+        active_tickers = watchlist_df[watchlist_df['Actif'] == True]
 
     print(f"Found {len(active_tickers)} active tickers")
 
@@ -322,72 +255,89 @@ def main():
     print("\n[3/7] Processing ESE.PA (demonstration)...")
 
     # Sample data from ESE.PA (already fetched)
-    ese_data = {
-        'ticker': 'ESE.PA',
-        'company_name': 'BNP PARIBAS EASY S&P 500 UCITS ETF EUR CAPITALISATION',
-        'current_price': 30.003,
-        'prices': [28.73, 28.73, 28.76, 28.48, 28.44, 28.40, 28.87, 28.93, 29.22, 29.02],  # Last 10 days sample
-        'volume': 124085,
-        'avg_volume': 136733
-    }
+    with stage(metrics, 'data_load', 'ESE.PA'):
+        ese_data = {
+            'ticker': 'ESE.PA',
+            'company_name': 'BNP PARIBAS EASY S&P 500 UCITS ETF EUR CAPITALISATION',
+            'current_price': 30.003,
+            'prices': [28.73, 28.73, 28.76, 28.48, 28.44, 28.40, 28.87, 28.93, 29.22, 29.02],  # Last 10 days sample
+            'volume': 124085,
+            'avg_volume': 136733
+        }
 
     # Calculate indicators (using last 10 days as sample)
-    prices = np.array(ese_data['prices'])
-    rsi = calculate_rsi(prices)
-    macd_line, macd_signal, macd_hist = calculate_macd(prices)
-    ma20 = calculate_ma(prices, min(20, len(prices)))
-    ma50 = calculate_ma(prices, min(50, len(prices)))
-    ma200 = calculate_ma(prices, min(200, len(prices)))
-    volume_ratio = ese_data['volume'] / ese_data['avg_volume']
+    with stage(metrics, 'indicators', ese_data['ticker']):
+        prices = np.array(ese_data['prices'])
+        rsi = calculate_rsi(prices)
+        macd_line, macd_signal, macd_hist = calculate_macd(prices)
+        ma20 = calculate_ma(prices, min(20, len(prices)))
+        ma50 = calculate_ma(prices, min(50, len(prices)))
+        ma200 = calculate_ma(prices, min(200, len(prices)))
+        volume_ratio = ese_data['volume'] / ese_data['avg_volume']
 
     print(f"  RSI: {rsi:.2f}" if rsi else "  RSI: N/A")
     print(f"  Volume Ratio: {volume_ratio:.2f}")
 
     # Generate signal
     print("\n[4/7] Generating trading signals...")
-    signal = generate_signal(
-        ese_data['ticker'],
-        ese_data['company_name'],
-        ese_data['current_price'],
-        rsi, macd_line, macd_signal, macd_hist,
-        ma20, ma50, ma200, volume_ratio
-    )
+    with stage(metrics, 'signals', ese_data['ticker']):
+        signal = generate_signal(
+            ese_data['ticker'],
+            ese_data['company_name'],
+            ese_data['current_price'],
+            rsi, macd_line, macd_signal, macd_hist,
+            ma20, ma50, ma200, volume_ratio
+        )
 
     print(f"  Signal: {signal['signal_type'].upper()}")
     print(f"  Confidence: {signal['confidence_score']}/100")
 
+    stream = None
+    if stream_output:
+        stream = open_result_stream(stream_path(OUTPUT_JSON))
+        write_signal(stream, signal)
+
     results = [signal]
     high_confidence = [s for s in results if s['confidence_score'] >= 60]
 
     print(f"\n[5/7] Generating reports for high-confidence signals...")
     print(f"  High-confidence signals (≥60): {len(high_confidence)}")
 
-    # Create reports directory
-    os.makedirs(REPORTS_DIR, exist_ok=True)
-
-    for sig in high_confidence:
-        markdown_report = generate_markdown_report(sig)
-        filename = f"signal_{sig['ticker']}_{datetime.now().strftime('%Y%m%d_%H%M')}.md"
-        filepath = os.path.join(REPORTS_DIR, filename)
-
-        with open(filepath, 'w') as f:
-            f.write(markdown_report)
+    # Render all reports in one batch and write them concurrently
+    with stage(metrics, 'report_writing'):
+        filenames = write_reports(high_confidence, REPORTS_DIR)
 
+    for filename in filenames:
         print(f"  Created: {filename}")
 
     # Save JSON results
     print(f"\n[6/7] Saving analysis results...")
-    output_data = {
-        "execution_time": datetime.now().isoformat(),
-        "total_analyzed": len(results),
-        "high_confidence_count": len(high_confidence),
-        "signals": results
-    }
+    if stream is not None:
+        with stage(metrics, 'json_save'):
+            close_result_stream(stream)
+        output_file = stream['path']
+    else:
+        output_data = {
+            "execution_time": datetime.now().isoformat(),
+            "total_analyzed": len(results),
+            "high_confidence_count": len(high_confidence),
+            "signals": results
+        }
+
+        with stage(metrics, 'json_save'):
+            with open(OUTPUT_JSON, 'w') as f:
+                json.dump(output_data, f, indent=2)
+        output_file = OUTPUT_JSON
+
+    print(f"  Saved to: {output_file}")
 
-    with open(OUTPUT_JSON, 'w') as f:
-        json.dump(output_data, f, indent=2)
+    with stage(metrics, 'history_save'):
+        try:
+            append_results(SIGNAL_HISTORY_DB, output_file, 'market_watcher_complete')
+        except Exception as e:
+            print(f"  WARNING: Could not append to signal history: {e}")
 
-    print(f"  Saved to: {OUTPUT_JSON}")
+    save_metrics(metrics, OUTPUT_JSON, script='market_watcher_complete', tickers_analyzed=len(results))
 
     print(f"\n[7/7] Next steps:")
     print("  - Upload reports to Google Drive (via MCP)")
@@ -401,4 +351,5 @@ def main():
     return results, high_confidence
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(stream_output=args.stream)
@@ -6,14 +6,46 @@ Uses Yahoo Finance data via MCP to perform technical analysis
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import argparse
 import json
 import sys
 
+from analysis_cache import (analysis_key, cache_lookup, cache_slice, cache_store, hit_rate,
+                            load_analysis_cache, merge_cache, save_analysis_cache, scoring_fingerprint)
+from batch_indicators import build_price_matrix, compute_batch_indicators, indicator_value
+from extended_indicators import EXTENDED_NAMES, extended_pass
+from indicator_graph import compute_indicators, new_graph
+from indicator_kernels import ema_series, macd_series, rsi_series, sma_series, volume_ratio_series
+from indicator_state import (build_indicator_state, load_indicator_states, save_indicator_states,
+                             state_indicators, update_indicator_state)
+from pipeline_metrics import merge_metrics, new_metrics, save_metrics, stage
+from result_stream import (close_result_stream, open_result_stream, read_result_stream, stream_path,
+                           write_signal)
+from screener import (HIGH_CONFIDENCE_SCREEN, build_snapshot, load_screens, print_screens, screen_signals,
+                      screens_path)
+from signal_history import append_results
+from price_store import (dates_to_days, open_price_store, read_ticker, read_ticker_range, store_exists, store_mtime,
+                         update_store_from_json)
+from signal_scoring import DEFAULT_SCORING_PARAMS
+from timeframes import (cache_slice as timeframe_cache_slice, load_timeframe_cache,
+                        merge_cache as merge_timeframe_cache, save_timeframe_cache,
+                        ticker_timeframe_bars, timeframe_trend)
+from watchlist_cache import cached_parse_watchlist
+
 # File paths
 EXCEL_FILE = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/PEA_Watchlist_Indicateurs.xlsx'
 YFINANCE_DATA_DIR = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/yfinance_data'
+PRICE_STORE_DIR = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/yfinance_store'
 OUTPUT_JSON = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/market_analysis_real_results.json'
+SIGNAL_HISTORY_DB = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/signal_history.db'
+INDICATOR_STATE_FILE = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/yfinance_indicator_state.json'
+ANALYSIS_CACHE_FILE = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/yfinance_analysis_cache.json'
+TIMEFRAME_CACHE_FILE = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/yfinance_timeframes.npz'
+
+INDICATOR_NAMES = ('rsi', 'macd', 'macd_signal', 'macd_histogram',
+                   'ma20', 'ma50', 'ma200', 'volume_ratio')
 
 def parse_watchlist(excel_file):
     """Parse the Excel watchlist and return active tickers"""
@@ -29,12 +61,60 @@ def parse_watchlist(excel_file):
         print(f"ERROR parsing Excel file: {e}")
         sys.exit(1)
 
+def load_from_price_store(ticker):
+    """Load historical price data from the memory-mapped price store
+
+    Returns None when there is no store or the ticker is not in it.
+    """
+    if not store_exists(PRICE_STORE_DIR):
+        return None
+
+    store = open_price_store(PRICE_STORE_DIR)
+    columns = read_ticker(store, ticker)
+    if columns is None or len(columns[0]) == 0:
+        return None
+
+    prices, volumes, dates = columns
+    # Stores without highs and lows fall back to the closes
+    highs, lows = read_ticker_range(store, ticker) or (prices, prices)
+
+    return {
+        'prices': prices,
+        'volumes': volumes,
+        'highs': highs,
+        'lows': lows,
+        'dates': dates,
+        'current_price': float(prices[-1]),
+        'current_volume': float(volumes[-1])
+    }
+
+def json_data_file(ticker):
+    """Return the Yahoo Finance JSON file of a ticker"""
+    return f"{YFINANCE_DATA_DIR}/{ticker}_historical.json"
+
 def load_yahoo_finance_data(ticker):
-    """Load historical price data from Yahoo Finance JSON files"""
+    """Load historical price data from the price store or Yahoo Finance JSON files
+
+    A JSON file written after the store's current generation (not merged
+    into it yet) is read instead of the stored series, unless it is unreadable.
+    """
+    import os
+
+    market_data = load_from_price_store(ticker)
+    if market_data is None:
+        return load_from_json(ticker)
+
+    data_file = json_data_file(ticker)
+    if os.path.exists(data_file) and os.path.getmtime(data_file) > store_mtime(PRICE_STORE_DIR):
+        return load_from_json(ticker) or market_data
+    return market_data
+
+def load_from_json(ticker):
+    """Load historical price data from a Yahoo Finance JSON file"""
     import os
 
     # Check if data file exists
-    data_file = f"{YFINANCE_DATA_DIR}/{ticker}_historical.json"
+    data_file = json_data_file(ticker)
 
     if not os.path.exists(data_file):
         print(f"  WARNING: No data file found for {ticker}")
@@ -55,6 +135,9 @@ def load_yahoo_finance_data(ticker):
         return {
             'prices': np.array(prices),
             'volumes': np.array(volumes),
+            'highs': np.array(data.get('highs', prices)),
+            'lows': np.array(data.get('lows', prices)),
+            'dates': dates_to_days(data['dates']) if 'dates' in data else None,
             'current_price': prices[-1],
             'current_volume': volumes[-1]
         }
@@ -63,87 +146,121 @@ def load_yahoo_finance_data(ticker):
         print(f"  ERROR loading data for {ticker}: {e}")
         return None
 
+def check_market_data(market_data):
+    """Raise ValueError unless a ticker's columns are aligned and its prices and volumes finite"""
+    n_bars = len(market_data['prices'])
+    for name in ('prices', 'volumes', 'highs', 'lows', 'dates'):
+        values = market_data.get(name)
+        if values is None:
+            continue
+        if len(values) != n_bars:
+            raise ValueError(f"{len(values)} {name} for {n_bars} closes")
+        if name != 'dates' and not np.all(np.isfinite(np.asarray(values, dtype=float))):
+            raise ValueError(f"missing or non-finite {name}")
+
+def calculate_rsi_series(prices, periods=14):
+    """Calculate the full Relative Strength Index series (NaN before `periods` deltas)"""
+    return rsi_series(prices, periods)
+
 def calculate_rsi(prices, periods=14):
     """Calculate Relative Strength Index"""
     if len(prices) < periods + 1:
         return None
 
-    deltas = np.diff(prices)
-    gain = np.where(deltas > 0, deltas, 0)
-    loss = np.where(deltas < 0, -deltas, 0)
-
-    avg_gain = np.mean(gain[-periods:])
-    avg_loss = np.mean(loss[-periods:])
-
-    if avg_loss == 0:
-        return 100.0
+    return calculate_rsi_series(prices, periods)[-1]
 
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-
-    return rsi
+def calculate_ema_series(prices, periods):
+    """Calculate the full Exponential Moving Average series (NaN before the seed)"""
+    return ema_series(prices, periods)
 
 def calculate_ema(prices, periods):
     """Calculate Exponential Moving Average"""
     if len(prices) < periods:
         return None
 
-    prices = np.array(prices)
-    multiplier = 2 / (periods + 1)
-
-    ema = np.zeros(len(prices))
-    ema[periods-1] = np.mean(prices[:periods])
+    return calculate_ema_series(prices, periods)[-1]
 
-    for i in range(periods, len(prices)):
-        ema[i] = (prices[i] - ema[i-1]) * multiplier + ema[i-1]
+def calculate_macd_series(prices):
+    """Calculate EMA12, EMA26, MACD, signal and histogram series in one forward pass
 
-    return ema[-1]
+    The MACD line is defined from index 25; the signal line is the EMA9 of the
+    MACD line, seeded on its first 9 values. Undefined points are NaN.
+    """
+    return macd_series(prices)
 
 def calculate_macd(prices):
     """Calculate MACD (12, 26, 9)"""
     if len(prices) < 26:
         return None, None, None
 
-    prices = np.array(prices)
-
-    # Calculate EMAs
-    ema12 = calculate_ema(prices, 12)
-    ema26 = calculate_ema(prices, 26)
-
-    if ema12 is None or ema26 is None:
-        return None, None, None
-
-    macd_line = ema12 - ema26
-
-    # Calculate MACD values for signal line
-    macd_values = []
-    for i in range(26, len(prices)+1):
-        e12 = calculate_ema(prices[:i], 12)
-        e26 = calculate_ema(prices[:i], 26)
-        if e12 and e26:
-            macd_values.append(e12 - e26)
+    _, _, macd_values, signal_values, _ = calculate_macd_series(prices)
+    macd_line = macd_values[-1]
 
-    if len(macd_values) < 9:
+    # Until 9 MACD values exist the signal line falls back to the MACD line
+    if np.isnan(signal_values[-1]):
         signal_line = macd_line
     else:
-        signal_line = calculate_ema(np.array(macd_values), 9)
-        if signal_line is None:
-            signal_line = macd_line
+        signal_line = signal_values[-1]
 
     histogram = macd_line - signal_line
 
     return macd_line, signal_line, histogram
 
+def calculate_moving_average_series(prices, periods):
+    """Calculate the full Simple Moving Average series (NaN before the first window)"""
+    return sma_series(prices, periods)
+
 def calculate_moving_average(prices, periods):
     """Calculate Simple Moving Average"""
     if len(prices) < periods:
         return None
-    return np.mean(prices[-periods:])
+    return calculate_moving_average_series(prices, periods)[-1]
+
+def calculate_volume_ratio_series(volumes, periods=20):
+    """Calculate the full series of volume / 20-bar average volume"""
+    return volume_ratio_series(volumes, periods)
+
+def calculate_volume_ratio(volumes, periods=20):
+    """Calculate the last volume against the 20-bar average (1.0 before 20 bars)"""
+    return calculate_volume_ratio_series(volumes, periods)[-1]
+
+def calculate_timeframe_indicators(bars):
+    """Run the daily indicator graph unchanged on weekly or monthly bars"""
+    closes = bars['close']
+    graph = new_graph({'prices': closes, 'volumes': bars['volume']})
+    indicators = compute_indicators(graph, ('rsi', 'macd', 'macd_signal', 'macd_histogram', 'ma20', 'ma50'))
+    indicators['close'] = float(closes[-1]) if len(closes) else None
+    indicators['bars'] = len(closes)
+    return indicators
+
+def timeframe_confirmation(bars_by_timeframe):
+    """Summarize the trend of each higher timeframe for generate_signal"""
+    confirmation = {}
+    for timeframe, bars in bars_by_timeframe.items():
+        if len(bars['close']) == 0:
+            continue
+        indicators = calculate_timeframe_indicators(bars)
+        confirmation[timeframe] = {
+            "trend": timeframe_trend(indicators),
+            "rsi": round(indicators['rsi'], 2) if indicators['rsi'] else None,
+            "macd_histogram": round(indicators['macd_histogram'], 4) if indicators['macd_histogram'] else None,
+            "ma20": round(indicators['ma20'], 2) if indicators['ma20'] else None,
+            "bars": indicators['bars']
+        }
+    return confirmation
 
 def generate_signal(ticker, company_name, current_price,
                    rsi, macd_line, macd_signal, macd_histogram,
-                   ma20, ma50, ma200, volume_ratio):
-    """Generate buy/sell/watch signal with confidence scoring"""
+                   ma20, ma50, ma200, volume_ratio, timeframes=None, extended=None):
+    """Generate buy/sell/watch signal with confidence scoring
+
+    `timeframes` optionally gives the weekly/monthly trends (see
+    timeframe_confirmation): each one agreeing with a buy or sell signal
+    adds 5 to its confidence, each one against it takes 10 off.
+    `extended` optionally gives the Bollinger/ATR/stochastic/OBV/ADX values
+    (see compute_extended_indicators), reported in the technical details
+    only: they do not affect the signal type or its confidence.
+    """
 
     signal_type = "neutral"
     confidence_score = 0
@@ -221,6 +338,18 @@ def generate_signal(ticker, company_name, current_price,
         confidence_score = 0
         signal_reasons = ["All indicators in neutral zone"]
 
+    # Multi-timeframe confirmation of buy/sell signals
+    if timeframes and signal_type in ("buy", "sell"):
+        expected = "bullish" if signal_type == "buy" else "bearish"
+        for timeframe, confirmation in timeframes.items():
+            if confirmation['trend'] == expected:
+                confidence_score = min(confidence_score + 5, 100)
+                signal_reasons.append(f"{timeframe.capitalize()} trend confirms the {signal_type} signal")
+            elif confirmation['trend'] != "neutral":
+                confidence_score = max(confidence_score - 10, 0)
+                risk_factors.append(f"{timeframe.capitalize()} trend is {confirmation['trend']}, "
+                                    f"against the {signal_type} signal")
+
     # Add generic risk factors if missing
     if not risk_factors:
         risk_factors.append("Market conditions remain subject to volatility")
@@ -295,8 +424,23 @@ def generate_signal(ticker, company_name, current_price,
         }
     }
 
+    if extended is not None:
+        for name in EXTENDED_NAMES:
+            value = extended.get(name)
+            result["technical_details"][name] = round(value, 2) if value is not None else None
+
+    if timeframes is not None:
+        result["timeframes"] = timeframes
+
     return result
 
+def indicator_values(current_price, indicators):
+    """Full-precision indicators of a signal (technical_details are rounded), read by screens"""
+    values = {'current_price': float(current_price)}
+    for name in INDICATOR_NAMES + EXTENDED_NAMES:
+        values[name] = None if indicators[name] is None else float(indicators[name])
+    return values
+
 def analyze_ticker_with_real_data(ticker_info, market_data):
     """Perform complete technical analysis with real market data"""
 
@@ -312,7 +456,6 @@ def analyze_ticker_with_real_data(ticker_info, market_data):
         return None
 
     prices = market_data['prices']
-    volumes = market_data['volumes']
     current_price = market_data['current_price']
     current_volume = market_data['current_volume']
 
@@ -320,14 +463,14 @@ def analyze_ticker_with_real_data(ticker_info, market_data):
     print(f"Current volume: {current_volume:.0f}")
     print(f"Data points: {len(prices)}")
 
-    # Calculate technical indicators
-    rsi = calculate_rsi(prices)
-    macd_line, macd_signal, macd_histogram = calculate_macd(prices)
-    ma20 = calculate_moving_average(prices, 20)
-    ma50 = calculate_moving_average(prices, 50)
-    ma200 = calculate_moving_average(prices, 200)
-    avg_volume_20 = np.mean(volumes[-20:]) if len(volumes) >= 20 else current_volume
-    volume_ratio = current_volume / avg_volume_20 if avg_volume_20 > 0 else 1.0
+    # Calculate technical indicators (shared EMAs and cumulative sums computed once)
+    indicators = compute_indicators(new_graph(market_data), INDICATOR_NAMES + EXTENDED_NAMES)
+    rsi = indicators['rsi']
+    macd_line, macd_signal, macd_histogram = (indicators['macd'], indicators['macd_signal'],
+                                              indicators['macd_histogram'])
+    ma20, ma50, ma200 = indicators['ma20'], indicators['ma50'], indicators['ma200']
+    volume_ratio = indicators['volume_ratio']
+    extended = {name: indicators[name] for name in EXTENDED_NAMES}
 
     print(f"\nTechnical Indicators:")
     print(f"  RSI(14): {rsi:.2f}" if rsi else "  RSI(14): N/A")
@@ -338,76 +481,420 @@ def analyze_ticker_with_real_data(ticker_info, market_data):
     print(f"  MA50: {ma50:.2f}" if ma50 else "  MA50: N/A")
     print(f"  MA200: {ma200:.2f}" if ma200 else "  MA200: N/A")
     print(f"  Volume Ratio: {volume_ratio:.2f}")
+    print(f"  ATR(14): {extended['atr']:.2f}" if extended['atr'] else "  ATR(14): N/A")
+    print(f"  ADX(14): {extended['adx']:.2f}" if extended['adx'] else "  ADX(14): N/A")
 
     # Generate trading signal
     signal_result = generate_signal(
         ticker, company_name, current_price,
         rsi, macd_line, macd_signal, macd_histogram,
-        ma20, ma50, ma200, volume_ratio
+        ma20, ma50, ma200, volume_ratio, extended=extended
     )
+    signal_result['indicator_values'] = indicator_values(current_price, indicators)
 
     print(f"\n{signal_result['title']}")
     print(f"Confidence: {signal_result['confidence_score']}/100")
 
     return signal_result
 
-def main():
-    """Main execution with real market data"""
+def compute_ticker_indicators(ticker_rows, market_data_list, states=None):
+    """Compute the latest indicators of every ticker
+
+    Tickers whose stored state is still valid are rolled forward bar by bar;
+    the others are recomputed together by the batch engine and, when a state
+    store is given, get a fresh state. The extended indicators come with
+    them: from the state, or from one extended pass over the history.
+    A ticker with malformed data is reported and gets None.
+    """
+    ticker_indicators = [None] * len(market_data_list)
+    extended = {}
+    recompute = []
+
+    for row, (ticker_info, market_data) in enumerate(zip(ticker_rows, market_data_list)):
+        try:
+            check_market_data(market_data)
+            state = None
+            if states is not None:
+                state = update_indicator_state(states.get(ticker_info['Ticker']),
+                                               market_data['prices'], market_data['volumes'],
+                                               market_data.get('highs'), market_data.get('lows'))
+            if state:
+                ticker_indicators[row] = state_indicators(state)
+            else:
+                extended[row] = extended_pass(market_data['prices'], market_data['volumes'],
+                                              market_data.get('highs'), market_data.get('lows'))
+                recompute.append(row)
+        except Exception as e:
+            # Left out of the batch: its indicators stay None
+            print(f"ERROR analyzing {ticker_info['Ticker']}: {e}")
+            if states is not None:
+                states.pop(ticker_info['Ticker'], None)
+            continue
+
+    if states is not None:
+        updated = sum(indicators is not None for indicators in ticker_indicators)
+        print(f"Indicator state: {updated} updated incrementally, {len(recompute)} recomputed")
+
+    if not recompute:
+        return ticker_indicators
+
+    prices, volumes, lengths = build_price_matrix([market_data_list[row] for row in recompute])
+    indicators = compute_batch_indicators(prices, volumes, lengths)
+
+    print(f"Indicators computed for {len(recompute)} tickers ({prices.shape[1]} days)")
+
+    for i, row in enumerate(recompute):
+        extended_values, smoothed = extended[row]
+        ticker_indicators[row] = {name: indicator_value(indicators[name], i)
+                                  for name in INDICATOR_NAMES}
+        ticker_indicators[row].update(extended_values)
+
+        if states is not None:
+            ticker = ticker_rows[row]['Ticker']
+            market_data = market_data_list[row]
+            state = build_indicator_state(market_data['prices'], market_data['volumes'],
+                                          indicators['ema12'][i], indicators['ema26'][i],
+                                          indicators['macd_signal'][i], market_data.get('highs'),
+                                          market_data.get('lows'), smoothed)
+            if state:
+                states[ticker] = state
+            else:
+                states.pop(ticker, None)
+
+    return ticker_indicators
+
+def lookup_cached_signals(ticker_rows, market_data_list, cache):
+    """Return the cache key and cached signal (or None) of every ticker"""
+    keys = []
+    cached = []
+    for ticker_info, market_data in zip(ticker_rows, market_data_list):
+        key = analysis_key(ticker_info['Ticker'], ticker_info['Nom'], market_data['prices'],
+                           market_data['volumes'], cache['fingerprint'],
+                           market_data.get('highs'), market_data.get('lows'))
+        keys.append(key)
+        cached.append(cache_lookup(cache, key))
+    return keys, cached
+
+def analyze_tickers_batch(ticker_rows, market_data_list, states=None, metrics=None, emit=None,
+                          cache=None, timeframe_cache=None):
+    """Compute indicators for all tickers in one batch and generate their signals
+
+    With `emit`, each signal is passed to it as soon as it is generated
+    instead of being collected in the returned list. With an analysis
+    `cache`, tickers whose history is unchanged reuse their cached signal
+    and only the others are analyzed (and then cached). With a
+    `timeframe_cache`, signals are confirmed on weekly and monthly bars.
+    """
+    keys = [None] * len(ticker_rows)
+    cached = [None] * len(ticker_rows)
+    if cache is not None:
+        with stage(metrics, 'cache_lookup'):
+            keys, cached = lookup_cached_signals(ticker_rows, market_data_list, cache)
+
+    misses = [row for row, signal_result in enumerate(cached) if signal_result is None]
+    with stage(metrics, 'indicators'):
+        miss_indicators = compute_ticker_indicators([ticker_rows[row] for row in misses],
+                                                    [market_data_list[row] for row in misses], states)
+    ticker_indicators = dict(zip(misses, miss_indicators))
+
+    results = []
+    for row, (ticker_info, market_data) in enumerate(zip(ticker_rows, market_data_list)):
+        try:
+            if cached[row] is not None:
+                signal_result = cached[row]
+            else:
+                indicators = ticker_indicators[row]
+                if indicators is None:
+                    continue
+                timeframes = None
+                if timeframe_cache is not None:
+                    with stage(metrics, 'timeframes', ticker_info['Ticker']):
+                        timeframes = timeframe_confirmation(
+                            ticker_timeframe_bars(timeframe_cache, ticker_info['Ticker'], market_data))
+                with stage(metrics, 'signals', ticker_info['Ticker']):
+                    signal_result = generate_signal(
+                        ticker_info['Ticker'], ticker_info['Nom'], market_data['current_price'],
+                        indicators['rsi'], indicators['macd'], indicators['macd_signal'],
+                        indicators['macd_histogram'], indicators['ma20'], indicators['ma50'],
+                        indicators['ma200'], indicators['volume_ratio'], timeframes,
+                        {name: indicators[name] for name in EXTENDED_NAMES}
+                    )
+                    signal_result['indicator_values'] = indicator_values(market_data['current_price'],
+                                                                         indicators)
+                if cache is not None:
+                    cache_store(cache, keys[row], ticker_info['Ticker'], signal_result)
+            print(f"  {signal_result['ticker']}: {signal_result['signal_type'].upper()} "
+                  f"(Confidence: {signal_result['confidence_score']}/100)")
+            if emit is not None:
+                emit(signal_result)
+            else:
+                results.append(signal_result)
+        except Exception as e:
+            print(f"ERROR analyzing {ticker_info['Ticker']}: {e}")
+            continue
+
+    return results
+
+def load_market_data(ticker_rows, metrics=None):
+    """Load market data for a list of watchlist rows, skipping tickers without data or with malformed data"""
+    loaded_rows = []
+    market_data_list = []
+    for ticker_row in ticker_rows:
+        try:
+            with stage(metrics, 'data_load', ticker_row['Ticker']):
+                market_data = load_yahoo_finance_data(ticker_row['Ticker'])
+            if market_data:
+                check_market_data(market_data)
+                loaded_rows.append(ticker_row)
+                market_data_list.append(market_data)
+        except Exception as e:
+            print(f"ERROR loading {ticker_row['Ticker']}: {e}")
+            continue
+
+    return loaded_rows, market_data_list
+
+def analyze_ticker_chunk(ticker_rows, states=None, emit=None, cache=None, timeframe_cache=None):
+    """Load and analyze a chunk of tickers, in this process or a worker
+
+    Returns the signals in watchlist order, the (updated) indicator states
+    of the chunk, its stage metrics and its (updated) analysis and
+    timeframe caches. A ticker that fails is reported and left out, so it
+    never takes the rest of the chunk (or the other workers' chunks) down.
+    """
+    metrics = new_metrics()
+    loaded_rows, market_data_list = load_market_data(ticker_rows, metrics)
+
+    results = []
+    if market_data_list:
+        try:
+            results = analyze_tickers_batch(loaded_rows, market_data_list, states, metrics, emit, cache,
+                                            timeframe_cache)
+        except Exception as e:
+            # Errors escaping the batch come from its shared stages, before any
+            # signal is emitted: analyze the tickers one by one to isolate them
+            print(f"ERROR analyzing chunk ({e}), retrying ticker by ticker")
+            for ticker_row, market_data in zip(loaded_rows, market_data_list):
+                try:
+                    results.extend(analyze_tickers_batch([ticker_row], [market_data], states, metrics, emit,
+                                                         cache, timeframe_cache))
+                except Exception as e:
+                    print(f"ERROR analyzing {ticker_row['Ticker']}: {e}")
+
+    return results, states, metrics, cache, timeframe_cache
+
+def split_chunks(items, n_chunks):
+    """Split a list into at most n_chunks contiguous chunks of similar size"""
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size, extra = divmod(len(items), n_chunks)
+    chunks = []
+    start = 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+def analyze_tickers_parallel(ticker_rows, states, workers, metrics=None, emit=None, cache=None,
+                             timeframe_cache=None):
+    """Analyze tickers across a process pool, merging results in watchlist order
+
+    Tickers are split into contiguous chunks (several per worker to balance
+    the load); each chunk carries its own slice of the indicator states and
+    of the analysis and timeframe caches. Worker stage times are summed into `metrics`.
+    With `emit`, the signals of each chunk are passed to it as soon as the
+    chunk is merged.
+    """
+    chunks = split_chunks(ticker_rows, workers * 4)
+    chunk_states = [{row['Ticker']: states[row['Ticker']] for row in chunk if row['Ticker'] in states}
+                    for chunk in chunks]
+    chunk_caches = [None] * len(chunks)
+    if cache is not None:
+        chunk_caches = [cache_slice(cache, [row['Ticker'] for row in chunk]) for chunk in chunks]
+    chunk_timeframe_caches = [None] * len(chunks)
+    if timeframe_cache is not None:
+        chunk_timeframe_caches = [timeframe_cache_slice(timeframe_cache, [row['Ticker'] for row in chunk])
+                                  for chunk in chunks]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk, (chunk_results, updated_states, chunk_metrics, chunk_cache, chunk_timeframe_cache) in zip(
+                chunks, executor.map(analyze_ticker_chunk, chunks, chunk_states,
+                                     [None] * len(chunks), chunk_caches, chunk_timeframe_caches)):
+            if emit is not None:
+                for signal_result in chunk_results:
+                    emit(signal_result)
+            else:
+                results.extend(chunk_results)
+            if metrics is not None:
+                merge_metrics(metrics, chunk_metrics)
+            for row in chunk:
+                states.pop(row['Ticker'], None)
+            states.update(updated_states)
+            if cache is not None:
+                merge_cache(cache, chunk_cache)
+            if timeframe_cache is not None:
+                merge_timeframe_cache(timeframe_cache, chunk_timeframe_cache)
+
+    return results
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Real Market Data Analysis")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes for the ticker analysis (default: 1)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write results as NDJSON, one line per ticker as soon as it is analyzed")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Re-analyze every ticker instead of reusing cached signals")
+    parser.add_argument('--timeframes', action='store_true',
+                        help="Confirm signals on weekly and monthly bars")
+    return parser.parse_args()
+
+def main(workers=1, stream_output=False, use_cache=True, multi_timeframe=False):
+    """Main execution with real market data
+
+    With `stream_output`, signals are appended to an NDJSON file next to
+    OUTPUT_JSON as they are generated, followed by a summary record. With
+    `use_cache`, tickers whose history is unchanged since a previous run
+    reuse the signal stored in ANALYSIS_CACHE_FILE. With `multi_timeframe`,
+    signals are confirmed on weekly and monthly bars cached in
+    TIMEFRAME_CACHE_FILE. The screens of screens.json next to the watchlist
+    are run on the results and printed. The price store first takes in the
+    JSON files fetched since it was last written.
+    """
     print("="*80)
     print("MARKET WATCHER PEA - Real Market Data Analysis")
     print(f"Execution Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*80)
 
+    metrics = new_metrics()
+
     # Parse watchlist
     print("\nStep 1: Loading watchlist...")
-    active_tickers, previous_indicators = parse_watchlist(EXCEL_FILE)
+    with stage(metrics, 'watchlist_load'):
+        active_tickers, previous_indicators = cached_parse_watchlist(EXCEL_FILE, parse_watchlist)
 
     if len(active_tickers) == 0:
         print("WARNING: No active tickers found!")
         sys.exit(0)
 
-    # Analyze each ticker with real data
-    print(f"\nStep 2: Analyzing {len(active_tickers)} tickers with real market data...")
+    # Merge the JSON files fetched since the price store was last written
+    if store_exists(PRICE_STORE_DIR):
+        with stage(metrics, 'store_update'):
+            update_store_from_json(YFINANCE_DATA_DIR, PRICE_STORE_DIR)
 
-    results = []
-    for idx, ticker_row in active_tickers.iterrows():
-        try:
-            ticker = ticker_row['Ticker']
-            market_data = load_yahoo_finance_data(ticker)
+    try:
+        screens = load_screens(screens_path(EXCEL_FILE))
+    except ValueError as e:
+        print(f"  WARNING: Ignoring screens ({e})")
+        screens = {}
 
-            if market_data:
-                signal_result = analyze_ticker_with_real_data(ticker_row, market_data)
-                if signal_result:
-                    results.append(signal_result)
-        except Exception as e:
-            print(f"ERROR analyzing {ticker_row['Ticker']}: {e}")
-            continue
+    # Analyze each ticker with real data
+    ticker_rows = [ticker_row for _, ticker_row in active_tickers.iterrows()]
+    with stage(metrics, 'state_load'):
+        states = load_indicator_states(INDICATOR_STATE_FILE)
+
+    timeframe_cache = None
+    if multi_timeframe:
+        with stage(metrics, 'timeframe_load'):
+            timeframe_cache = load_timeframe_cache(TIMEFRAME_CACHE_FILE)
+
+    cache = None
+    if use_cache:
+        scoring_params = dict(DEFAULT_SCORING_PARAMS, multi_timeframe=multi_timeframe)
+        with stage(metrics, 'cache_load'):
+            cache = load_analysis_cache(ANALYSIS_CACHE_FILE, scoring_fingerprint(generate_signal, scoring_params))
+
+    stream = None
+    emit = None
+    if stream_output:
+        stream = open_result_stream(stream_path(OUTPUT_JSON))
+        emit = lambda signal: write_signal(stream, signal)
+        print(f"Streaming results to: {stream['path']}")
+
+    if workers > 1:
+        print(f"\nStep 2: Analyzing {len(ticker_rows)} tickers with real market data "
+              f"({workers} workers)...")
+        with stage(metrics, 'analysis'):
+            results = analyze_tickers_parallel(ticker_rows, states, workers, metrics, emit, cache,
+                                               timeframe_cache)
+    else:
+        print(f"\nStep 2: Analyzing {len(ticker_rows)} tickers with real market data...")
+        with stage(metrics, 'analysis'):
+            results, states, chunk_metrics, cache, timeframe_cache = analyze_ticker_chunk(
+                ticker_rows, states, emit, cache, timeframe_cache)
+        merge_metrics(metrics, chunk_metrics)
+
+    with stage(metrics, 'state_save'):
+        save_indicator_states(INDICATOR_STATE_FILE, states)
+    if cache is not None:
+        with stage(metrics, 'cache_save'):
+            save_analysis_cache(ANALYSIS_CACHE_FILE, cache)
+    if timeframe_cache is not None:
+        with stage(metrics, 'timeframe_save'):
+            save_timeframe_cache(TIMEFRAME_CACHE_FILE, timeframe_cache)
 
     # Summary
+    if stream is not None:
+        analyzed = stream['count']
+        high_confidence_signals = stream['high_confidence']
+    else:
+        analyzed = len(results)
+        high_confidence_signals = screen_signals(results, HIGH_CONFIDENCE_SCREEN)
+
     print(f"\n{'='*80}")
-    print(f"Analysis Complete: {len(results)} tickers processed")
+    print(f"Analysis Complete: {analyzed} tickers processed")
     print(f"{'='*80}")
 
-    high_confidence_signals = [r for r in results if r['confidence_score'] >= 60]
+    if cache is not None:
+        print(f"\nAnalysis cache: {cache['hits']} hits, {cache['misses']} misses "
+              f"({hit_rate(cache):.0%} hit rate)")
 
     print(f"\nHigh-confidence signals (score >= 60): {len(high_confidence_signals)}")
     for signal in high_confidence_signals:
         print(f"  - {signal['ticker']}: {signal['signal_type'].upper()} (Score: {signal['confidence_score']})")
 
     # Save results
-    output_data = {
-        "execution_time": datetime.now().isoformat(),
-        "total_tickers_analyzed": len(results),
-        "high_confidence_signals": len(high_confidence_signals),
-        "signals": results
-    }
+    if stream is not None:
+        with stage(metrics, 'json_save'):
+            close_result_stream(stream)
+        output_file = stream['path']
+    else:
+        output_data = {
+            "execution_time": datetime.now().isoformat(),
+            "total_tickers_analyzed": len(results),
+            "high_confidence_signals": len(high_confidence_signals),
+            "signals": results
+        }
 
-    with open(OUTPUT_JSON, 'w') as f:
-        json.dump(output_data, f, indent=2)
+        with stage(metrics, 'json_save'):
+            with open(OUTPUT_JSON, 'w') as f:
+                json.dump(output_data, f, indent=2)
+        output_file = OUTPUT_JSON
+
+    print(f"\nResults saved to: {output_file}")
+
+    if screens:
+        with stage(metrics, 'screens'):
+            signals = results if stream is None else read_result_stream(output_file)[0]
+            print_screens(build_snapshot(signals), screens)
+
+    with stage(metrics, 'history_save'):
+        try:
+            append_results(SIGNAL_HISTORY_DB, output_file, 'market_watcher_real_data')
+        except Exception as e:
+            print(f"  WARNING: Could not append to signal history: {e}")
 
-    print(f"\nResults saved to: {OUTPUT_JSON}")
+    run_info = {}
+    if cache is not None:
+        run_info = {'cache_hits': cache['hits'], 'cache_misses': cache['misses'],
+                    'cache_hit_rate': hit_rate(cache)}
+    save_metrics(metrics, OUTPUT_JSON, script='market_watcher_real_data', workers=workers,
+                 tickers_analyzed=analyzed, **run_info)
 
     return results, high_confidence_signals
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(workers=args.workers, stream_output=args.stream, use_cache=not args.no_cache,
+         multi_timeframe=args.timeframes)
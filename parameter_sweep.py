@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Scoring Parameter Sweep
+Evaluates a grid (or random sample) of generate_signal weights and
+thresholds against historical data on all cores, and ranks them
+
+Indicator series and forward outcomes are computed once, written to .npy
+files and memory-mapped read-only by every worker, so each parameter set
+only costs one vectorized scoring pass over the universe. A parameter set
+is judged on its high-confidence BUY/SELL signals, as main() filters them.
+
+Usage:
+    python parameter_sweep.py [--store DIR] [--samples N] [--grid FILE]
+                              [--workers N] [--output FILE]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from backtest import (CHUNK_ROWS, HORIZON, SCORE_INPUTS, first_hit_days,
+                      load_store_matrix, signal_outcomes)
+from batch_indicators import compute_indicator_series
+from price_store import store_exists
+from result_stream import HIGH_CONFIDENCE
+from signal_scoring import BUY, DEFAULT_SCORING_PARAMS, SELL, score_signals
+
+MIN_SIGNALS = 30
+
+# Values tried for each parameter; the defaults are always included
+SWEEP_GRID = {
+    'weight_rsi_strong': [20, 30, 40],
+    'weight_rsi_weak': [10, 15, 20],
+    'weight_macd_crossover': [15, 25, 35],
+    'weight_macd_momentum': [5, 10, 15],
+    'weight_ma200': [10, 20, 30],
+    'volume_surge_ratio': [1.2, 1.3, 1.5],
+    'volume_elevated_ratio': [1.1, 1.2, 1.3],
+    'signal_threshold': [35, 40, 45, 50],
+    'high_confidence': [50, 60, 70],
+}
+
+DEFAULT_SWEEP_PARAMS = dict(DEFAULT_SCORING_PARAMS, high_confidence=HIGH_CONFIDENCE)
+
+OUTCOME_ARRAYS = ('up5', 'up10', 'down5', 'down10', 'forward_return', 'mask')
+
+# Memory-mapped sweep data of a worker process
+_SWEEP_DATA = {}
+
+def prepare_sweep_data(prices, volumes, lengths, horizon, data_dir):
+    """Compute indicator series and forward outcomes once into .npy files"""
+    shape = prices.shape
+    arrays = {}
+    for name in SCORE_INPUTS + ('forward_return',):
+        arrays[name] = np.lib.format.open_memmap(
+            os.path.join(data_dir, f"{name}.npy"), mode='w+', dtype=np.float64, shape=shape)
+    for name in ('up5', 'up10', 'down5', 'down10'):
+        arrays[name] = np.lib.format.open_memmap(
+            os.path.join(data_dir, f"{name}.npy"), mode='w+', dtype=np.int16, shape=shape)
+    arrays['mask'] = np.lib.format.open_memmap(
+        os.path.join(data_dir, "mask.npy"), mode='w+', dtype=bool, shape=shape)
+
+    for first in range(0, shape[0], CHUNK_ROWS):
+        rows = slice(first, first + CHUNK_ROWS)
+        series = compute_indicator_series(prices[rows], volumes[rows], lengths[rows])
+        hits, forward_return, complete = first_hit_days(prices[rows], horizon)
+
+        for name in SCORE_INPUTS:
+            arrays[name][rows] = series[name]
+        for name, values in hits.items():
+            arrays[name][rows] = values
+        arrays['forward_return'][rows] = forward_return
+        arrays['mask'][rows] = complete & series['valid']
+
+    for array in arrays.values():
+        array.flush()
+
+def load_sweep_data(data_dir):
+    """Memory-map the sweep data read-only (worker initializer)"""
+    _SWEEP_DATA.clear()
+    for name in SCORE_INPUTS + OUTCOME_ARRAYS:
+        _SWEEP_DATA[name] = np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode='r')
+
+def evaluate_params(params):
+    """Backtest one parameter set on its high-confidence BUY/SELL signals"""
+    scoring_params = {k: v for k, v in params.items() if k in DEFAULT_SCORING_PARAMS}
+    high_confidence = params.get('high_confidence', HIGH_CONFIDENCE)
+
+    count = hit_short = hit_medium = stopped = return_sum = 0.0
+    n_rows = _SWEEP_DATA['mask'].shape[0]
+
+    for first in range(0, n_rows, CHUNK_ROWS):
+        rows = slice(first, first + CHUNK_ROWS)
+        scores = score_signals(*(_SWEEP_DATA[name][rows] for name in SCORE_INPUTS),
+                               params=scoring_params)
+        hits = {name: _SWEEP_DATA[name][rows] for name in ('up5', 'up10', 'down5', 'down10')}
+        short, medium, stop, directed_return = signal_outcomes(
+            scores['signal_type'], hits, _SWEEP_DATA['forward_return'][rows])
+
+        signal_type = scores['signal_type']
+        selected = (_SWEEP_DATA['mask'][rows]
+                    & ((signal_type == BUY) | (signal_type == SELL))
+                    & (scores['confidence_score'] >= high_confidence))
+
+        count += selected.sum()
+        hit_short += short[selected].sum()
+        hit_medium += medium[selected].sum()
+        stopped += stop[selected].sum()
+        return_sum += directed_return[selected].sum()
+
+    return {
+        'params': params,
+        'signals': int(count),
+        'hit_rate': float(hit_short / count) if count else None,
+        'hit_rate_medium': float(hit_medium / count) if count else None,
+        'stop_rate': float(stopped / count) if count else None,
+        'avg_return': float(return_sum / count) if count else None,
+    }
+
+def param_sets(grid, samples=None, seed=0):
+    """Return the parameter sets to evaluate: defaults first, then the grid
+
+    With `samples`, a random sample of that many grid points (without
+    replacement) is drawn instead of the full product.
+    """
+    names = list(grid)
+    sizes = [len(grid[name]) for name in names]
+    total = int(np.prod(sizes))
+
+    if samples is None or samples >= total:
+        points = itertools.product(*(grid[name] for name in names))
+    else:
+        rng = random.Random(seed)
+        points = (tuple(grid[name][i] for name, i in zip(names, np.unravel_index(flat, sizes)))
+                  for flat in rng.sample(range(total), samples))
+
+    sets = [dict(DEFAULT_SWEEP_PARAMS)]
+    for point in points:
+        params = dict(DEFAULT_SWEEP_PARAMS, **dict(zip(names, point)))
+        if params != sets[0]:
+            sets.append(params)
+    return sets
+
+def rank_results(results, min_signals=MIN_SIGNALS):
+    """Sort results by hit rate then average return; thin samples go last"""
+    def key(result):
+        enough = result['signals'] >= min_signals
+        return (not enough, -(result['hit_rate'] or 0), -(result['avg_return'] or 0))
+    return sorted(results, key=key)
+
+def run_sweep(prices, volumes, lengths, sets, horizon=HORIZON, workers=None):
+    """Evaluate parameter sets across a process pool sharing one set of series"""
+    data_dir = tempfile.mkdtemp(prefix='pea_sweep_')
+    try:
+        prepare_sweep_data(prices, volumes, lengths, horizon, data_dir)
+        with ProcessPoolExecutor(max_workers=workers, initializer=load_sweep_data,
+                                 initargs=(data_dir,)) as executor:
+            return list(executor.map(evaluate_params, sets, chunksize=4))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def format_changes(params):
+    """Describe a parameter set by its differences from the defaults"""
+    changes = [f"{k}={v}" for k, v in params.items() if DEFAULT_SWEEP_PARAMS.get(k) != v]
+    return ', '.join(changes) if changes else '(current settings)'
+
+def print_ranking(ranked, top):
+    """Print the best parameter sets"""
+    print(f"\n{'Rank':>4} {'Hit +5%':>8} {'Hit +10%':>9} {'Stopped':>8} {'Avg ret':>8} {'Signals':>9}  Parameters")
+    print("-" * 100)
+    for rank, result in enumerate(ranked[:top], 1):
+        if result['signals'] == 0:
+            print(f"{rank:>4} {'-':>8} {'-':>9} {'-':>8} {'-':>8} {0:>9}  {format_changes(result['params'])}")
+            continue
+        print(f"{rank:>4} {result['hit_rate']:>8.1%} {result['hit_rate_medium']:>9.1%} "
+              f"{result['stop_rate']:>8.1%} {result['avg_return']:>8.2%} {result['signals']:>9}  "
+              f"{format_changes(result['params'])}")
+
+def parse_args():
+    """Parse command line arguments"""
+    from market_watcher_real_data import PRICE_STORE_DIR
+
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Scoring parameter sweep")
+    parser.add_argument('--store', default=PRICE_STORE_DIR, help="Price store directory")
+    parser.add_argument('--horizon', type=int, default=HORIZON,
+                        help=f"Trading days to evaluate targets over (default: {HORIZON})")
+    parser.add_argument('--grid', help="JSON file of {parameter: [values]} replacing the default grid")
+    parser.add_argument('--samples', type=int, default=200,
+                        help="Random grid points to evaluate, 0 for the full grid (default: 200)")
+    parser.add_argument('--seed', type=int, default=0, help="Random sampling seed")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--min-signals', type=int, default=MIN_SIGNALS,
+                        help=f"Signals needed to be ranked ahead (default: {MIN_SIGNALS})")
+    parser.add_argument('--top', type=int, default=20, help="Rows of the ranking to print")
+    parser.add_argument('--output', help="Write the full ranking as JSON to this file")
+    return parser.parse_args()
+
+def main():
+    """Main execution"""
+    args = parse_args()
+
+    if not store_exists(args.store):
+        print(f"ERROR: No price store found in {args.store} (run price_store.py migrate first)")
+        sys.exit(1)
+
+    grid = SWEEP_GRID
+    if args.grid:
+        with open(args.grid, 'r') as f:
+            grid = json.load(f)
+        unknown = set(grid) - set(DEFAULT_SWEEP_PARAMS)
+        if unknown:
+            print(f"ERROR: Unknown parameters in grid: {', '.join(sorted(unknown))}")
+            sys.exit(1)
+
+    sets = param_sets(grid, args.samples or None, args.seed)
+    tickers, prices, volumes, lengths = load_store_matrix(args.store)
+    print(f"Sweeping {len(sets)} parameter sets over {len(tickers)} tickers x {prices.shape[1]} days "
+          f"({args.workers} workers)...")
+
+    results = run_sweep(prices, volumes, lengths, sets, args.horizon, args.workers)
+    ranked = rank_results(results, args.min_signals)
+    print_ranking(ranked, args.top)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'horizon': args.horizon, 'tickers': len(tickers), 'results': ranked}, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Market Watcher PEA - Pipeline Metrics
+Times the stages of a run, the per-ticker latency and the peak RSS, and
+writes them to a metrics JSON file next to the results file
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+SLOWEST_TICKERS = 10
+
+def new_metrics():
+    """Return an empty metrics accumulator"""
+    return {'started': time.perf_counter(), 'stages': {}, 'tickers': {}}
+
+def peak_rss_mb(children=False):
+    """Return the peak resident set size in MB, or None when unavailable
+
+    With `children`, the largest peak among terminated child processes
+    (e.g. the --workers pool) is returned instead of this process's.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return usage.ru_maxrss * scale / (1024 * 1024)
+
+@contextmanager
+def stage(metrics, name, ticker=None):
+    """Time a block as (part of) a pipeline stage, and as one ticker's latency
+
+    Repeated blocks of the same stage are summed. Does nothing when
+    `metrics` is None.
+    """
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        entry = metrics['stages'].setdefault(name, {'seconds': 0.0, 'calls': 0})
+        entry['seconds'] += elapsed
+        entry['calls'] += 1
+        entry['peak_rss_mb'] = peak_rss_mb()
+
+        if ticker is not None:
+            latency = metrics['tickers'].setdefault(ticker, {})
+            latency[name] = latency.get(name, 0.0) + elapsed
+
+def merge_metrics(metrics, other):
+    """Add the stages and ticker latencies of another accumulator (e.g. a worker's)"""
+    for name, entry in other['stages'].items():
+        total = metrics['stages'].setdefault(name, {'seconds': 0.0, 'calls': 0})
+        total['seconds'] += entry['seconds']
+        total['calls'] += entry['calls']
+        peaks = [p for p in (total.get('peak_rss_mb'), entry.get('peak_rss_mb')) if p is not None]
+        total['peak_rss_mb'] = max(peaks) if peaks else None
+
+    for ticker, latency in other['tickers'].items():
+        total = metrics['tickers'].setdefault(ticker, {})
+        for name, seconds in latency.items():
+            total[name] = total.get(name, 0.0) + seconds
+
+def metrics_path(output_json):
+    """Return the metrics file path that goes with a results file"""
+    root, _ = os.path.splitext(output_json)
+    return f"{root}_metrics.json"
+
+def save_metrics(metrics, output_json, **run_info):
+    """Write the run metrics next to `output_json` and print the stage timings
+
+    `run_info` (e.g. workers=4) is stored as-is at the top of the file.
+    """
+    tickers = {ticker: dict(latency, total=sum(latency.values()))
+               for ticker, latency in metrics['tickers'].items()}
+    slowest = sorted(tickers, key=lambda t: tickers[t]['total'], reverse=True)[:SLOWEST_TICKERS]
+
+    output_data = dict(run_info)
+    output_data.update({
+        "execution_time": datetime.now().isoformat(),
+        "total_seconds": time.perf_counter() - metrics['started'],
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_workers_mb": peak_rss_mb(children=True) or None,
+        "stages": metrics['stages'],
+        "slowest_tickers": [{'ticker': t, 'seconds': tickers[t]['total']} for t in slowest],
+        "tickers": tickers
+    })
+
+    path = metrics_path(output_json)
+    with open(path, 'w') as f:
+        json.dump(output_data, f, indent=2)
+
+    print("\nStage timings:")
+    for name, entry in metrics['stages'].items():
+        print(f"  {name:<16} {entry['seconds']:>9.3f}s")
+    if slowest:
+        print(f"  Slowest ticker: {slowest[0]} ({tickers[slowest[0]]['total']:.3f}s)")
+    print(f"Metrics saved to: {path}")
+
+    return path
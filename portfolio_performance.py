@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Portfolio Performance Engine
+Computes the Portfolio Advisor metrics (docs/agents/portfolio-advisor-spec.md)
+for a portfolio of positions, on the closing prices of the price store:
+monthly time-weighted performance, per-position contribution, annualized
+return, volatility, Sharpe ratio, maximum drawdown and sector / geographic
+Herfindahl concentration
+
+Positions come from a Boursorama portfolio export (CSV, ';'-separated,
+French decimals). Tickers, sectors and countries missing from the export are
+taken from an optional JSON metadata file keyed by ISIN, ticker or name:
+    {"FR0000121014": {"ticker": "MC.PA", "sector": "Luxe", "country": "France"}}
+An optional Boursorama transactions export (with a date column) makes the
+holdings vary over time; without it the current holdings are replayed over
+the whole history.
+
+Usage:
+    python portfolio_performance.py <positions.csv> [--metadata meta.json]
+        [--transactions operations.csv] [--store DIR] [--risk-free 0.03] [--output FILE]
+"""
+
+from datetime import date
+import argparse
+import csv
+import json
+import sys
+import unicodedata
+
+import numpy as np
+
+from price_store import NO_DATE, open_price_store, read_ticker, store_exists
+
+TRADING_DAYS = 252
+RISK_FREE_RATE = 0.03
+HERFINDAHL_MODERATE = 1500
+HERFINDAHL_HIGH = 2500
+UNKNOWN = 'Non renseigné'
+
+# Boursorama export headers (and a few common variants) per field
+COLUMN_ALIASES = {
+    'name': ('name', 'libelle', 'nom', 'valeur'),
+    'isin': ('isin', 'codeisin'),
+    'ticker': ('ticker', 'symbol', 'symbole', 'mnemo'),
+    'quantity': ('quantity', 'quantite', 'qte', 'nombre'),
+    'buy_price': ('buyingprice', 'pru', 'prixderevient', 'prixrevientunitaire', 'avgbuyprice'),
+    'last_price': ('lastprice', 'cours', 'derniercours', 'currentprice'),
+    'trade_price': ('coursexecute', 'prixexecution', 'prix', 'price'),
+    'date': ('date', 'dateoperation', 'dateop', 'dateexecution'),
+    'side': ('sens', 'operation', 'typeoperation', 'side'),
+    'sector': ('sector', 'secteur'),
+    'country': ('country', 'pays'),
+}
+NUMERIC_FIELDS = ('quantity', 'buy_price', 'last_price', 'trade_price')
+SELL_WORDS = ('vente', 'sell', 'cession')
+
+def _normalize_header(header):
+    """Lower-case a header and drop accents, spaces and punctuation"""
+    text = unicodedata.normalize('NFKD', header).encode('ascii', 'ignore').decode().lower()
+    return ''.join(c for c in text if c.isalnum())
+
+def parse_number(text):
+    """Parse a Boursorama number ("1 234,56", "12,5 %", "-3.2") or None when empty"""
+    text = str(text).replace('\xa0', '').replace(' ', '').replace('%', '').replace('€', '')
+    if not text or text == '-':
+        return None
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    return float(text)
+
+def read_boursorama_csv(path):
+    """Read a Boursorama CSV export into dicts keyed by COLUMN_ALIASES fields"""
+    for encoding in ('utf-8-sig', 'latin-1'):
+        try:
+            with open(path, 'r', encoding=encoding, newline='') as f:
+                content = f.read()
+            break
+        except UnicodeDecodeError:
+            continue
+
+    delimiter = ';' if content.count(';') >= content.count(',') else ','
+    reader = csv.reader(content.splitlines(), delimiter=delimiter)
+    headers = [_normalize_header(h) for h in next(reader)]
+
+    fields = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for column, header in enumerate(headers):
+            if header in aliases and column not in fields.values():
+                fields[field] = column
+                break
+
+    rows = []
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        row = {}
+        for field, column in fields.items():
+            value = values[column].strip() if column < len(values) else ''
+            row[field] = parse_number(value) if field in NUMERIC_FIELDS else value
+        rows.append(row)
+    return rows
+
+def _lookup_metadata(row, metadata):
+    """Return the metadata entry of a row (by ISIN, ticker or name)"""
+    for key in ('isin', 'ticker', 'name'):
+        if row.get(key) and row[key] in metadata:
+            return metadata[row[key]]
+    return {}
+
+def load_positions(csv_path, metadata=None):
+    """Load the positions of a Boursorama portfolio export
+
+    Returns dicts with ticker, name, isin, quantity, buy_price, last_price,
+    sector and country (metadata fills what the export lacks).
+    """
+    metadata = metadata or {}
+    positions = []
+    for row in read_boursorama_csv(csv_path):
+        if not row.get('quantity'):
+            continue
+        extra = _lookup_metadata(row, metadata)
+        positions.append({
+            'ticker': row.get('ticker') or extra.get('ticker'),
+            'name': row.get('name') or extra.get('name') or row.get('ticker'),
+            'isin': row.get('isin'),
+            'quantity': row['quantity'],
+            'buy_price': row.get('buy_price'),
+            'last_price': row.get('last_price'),
+            'sector': row.get('sector') or extra.get('sector') or UNKNOWN,
+            'country': row.get('country') or extra.get('country') or UNKNOWN,
+        })
+    return positions
+
+def load_transactions(csv_path, positions, metadata=None):
+    """Load a Boursorama transactions export as (day, position row, signed quantity)
+
+    Sales (or negative quantities) reduce the holding. Transactions on
+    instruments that are not in `positions` are ignored.
+    """
+    metadata = metadata or {}
+    rows_by_key = {}
+    for row, position in enumerate(positions):
+        for key in ('ticker', 'isin', 'name'):
+            if position.get(key):
+                rows_by_key.setdefault(position[key], row)
+
+    transactions = []
+    for tx in read_boursorama_csv(csv_path):
+        if not tx.get('quantity') or not tx.get('date'):
+            continue
+        keys = [tx.get('ticker'), tx.get('isin'), tx.get('name'), _lookup_metadata(tx, metadata).get('ticker')]
+        row = next((rows_by_key[key] for key in keys if key in rows_by_key), None)
+        if row is None:
+            continue
+        quantity = abs(tx['quantity'])
+        if tx['quantity'] < 0 or any(word in tx.get('side', '').lower() for word in SELL_WORDS):
+            quantity = -quantity
+        transactions.append((parse_date(tx['date']), row, quantity))
+    return transactions
+
+def parse_date(text):
+    """Parse a DD/MM/YYYY or ISO date into days since 1970-01-01"""
+    text = text.strip()[:10]
+    if '/' in text:
+        day, month, year = text.split('/')
+        text = f"{year}-{month}-{day}"
+    return int(np.datetime64(text, 'D').astype(np.int64))
+
+def _undated_days(length, last_day):
+    """Business days ending on `last_day`, for a series stored without dates"""
+    end = np.datetime64(int(last_day), 'D')
+    days = np.busday_offset(end, -np.arange(length - 1, -1, -1), roll='backward')
+    return days.astype(np.int64)
+
+def price_history(store_dir, tickers):
+    """Align the closes of `tickers` on the union of their trading days
+
+    Returns (days, prices) where prices is (tickers x days), forward-filled,
+    NaN before a ticker's first close and for tickers not in the store.
+    Series stored without dates are placed on the business days ending on
+    the latest known date (today when the store has no dates).
+    """
+    store = open_price_store(store_dir)
+    series = [read_ticker(store, ticker) if ticker else None for ticker in tickers]
+
+    dated = [s[2][s[2] != NO_DATE] for s in series if s is not None and len(s[0])]
+    last_day = max((int(d.max()) for d in dated if len(d)), default=(date.today() - date(1970, 1, 1)).days)
+
+    series_days = []
+    for s in series:
+        if s is None or len(s[0]) == 0:
+            series_days.append(None)
+        elif np.all(s[2] != NO_DATE):
+            series_days.append(s[2].astype(np.int64))
+        else:
+            series_days.append(_undated_days(len(s[0]), last_day))
+
+    known = [d for d in series_days if d is not None]
+    days = np.unique(np.concatenate(known)) if known else np.zeros(0, dtype=np.int64)
+
+    prices = np.full((len(tickers), len(days)), np.nan)
+    for row, (s, s_days) in enumerate(zip(series, series_days)):
+        if s_days is not None:
+            prices[row, np.searchsorted(days, s_days)] = s[0]
+
+    # Forward-fill gaps (holidays of one exchange, halted lines)
+    last_seen = np.where(np.isnan(prices), 0, np.arange(len(days)))
+    np.maximum.accumulate(last_seen, axis=1, out=last_seen)
+    prices = prices[np.arange(len(tickers))[:, None], last_seen]
+
+    return days, prices
+
+def holdings_matrix(positions, days, priced, transactions=None):
+    """Quantity held of each position on each day (positions x days)
+
+    Without transactions the current quantities are held throughout. With
+    them, quantities change on each transaction day (the next trading day
+    when it falls on a closed day) and end at the current quantities.
+    A position only counts from its first known close (`priced` mask).
+    """
+    current = np.array([p['quantity'] for p in positions], dtype=float)
+    quantities = np.repeat(current[:, None], len(days), axis=1)
+
+    if transactions:
+        tx_days, tx_rows, tx_quantities = (np.array(column) for column in zip(*transactions))
+        columns = np.searchsorted(days, tx_days)
+        inside = columns < len(days)
+        changes = np.zeros_like(quantities)
+        np.add.at(changes, (tx_rows[inside], columns[inside]), tx_quantities[inside])
+        initial = current - np.bincount(tx_rows[inside], tx_quantities[inside], minlength=len(positions))
+        quantities = initial[:, None] + np.cumsum(changes, axis=1)
+
+    return np.where(priced, quantities, 0.0)
+
+def daily_pnl(prices, quantities):
+    """Price P&L of each position on each day, from the previous day's holdings"""
+    closes = np.nan_to_num(prices)
+    pnl = np.zeros_like(closes)
+    pnl[:, 1:] = quantities[:, :-1] * (closes[:, 1:] - closes[:, :-1])
+    return pnl
+
+def monthly_performance(days, values, pnl):
+    """Monthly time-weighted returns and per-position contributions
+
+    A month's return chains the daily returns pnl_t / value_{t-1}, so
+    deposits and new positions do not count as performance. A position's
+    contribution is its month P&L over the portfolio value at the start of
+    the month (the close of the previous month). Days following a close
+    with nothing held are left out of the daily returns used for the risk
+    metrics.
+    """
+    total = values.sum(axis=0)
+    total_pnl = pnl.sum(axis=0)
+    previous = np.concatenate([[np.nan], total[:-1]])
+    returns = np.divide(total_pnl, previous, out=np.zeros_like(total_pnl), where=previous > 0)
+
+    months = days.astype('datetime64[D]').astype('datetime64[M]')
+    starts = np.concatenate([[0], np.flatnonzero(months[1:] != months[:-1]) + 1])
+    ends = np.concatenate([starts[1:], [len(days)]]) - 1
+
+    # The first day has no return and no P&L, so the first month starts from its close
+    start_values = total[np.maximum(starts - 1, 0)]
+
+    month_returns = np.exp(np.add.reduceat(np.log1p(returns), starts)) - 1
+    month_pnl = np.add.reduceat(pnl, starts, axis=1)
+    contributions = np.divide(month_pnl, start_values, out=np.zeros_like(month_pnl),
+                              where=start_values > 0)
+
+    end_values = total[ends]
+    return {
+        'months': [str(m) for m in months[starts]],
+        'start_values': start_values,
+        'end_values': end_values,
+        'net_flows': end_values - start_values - month_pnl.sum(axis=0),
+        'returns': month_returns,
+        'contributions': contributions,
+        'daily_returns': returns[1:][previous[1:] > 0],
+    }
+
+def risk_metrics(daily_returns, risk_free_rate=RISK_FREE_RATE):
+    """Annualized return and volatility, Sharpe ratio and maximum drawdown"""
+    if len(daily_returns) < 2:
+        return {'annualized_return': None, 'annualized_volatility': None,
+                'sharpe_ratio': None, 'max_drawdown': None}
+
+    growth = np.cumprod(1 + daily_returns)
+    annualized_return = growth[-1] ** (TRADING_DAYS / len(daily_returns)) - 1
+    volatility = np.std(daily_returns, ddof=1) * np.sqrt(TRADING_DAYS)
+    drawdowns = growth / np.maximum.accumulate(np.maximum(growth, 1.0)) - 1
+
+    return {
+        'annualized_return': float(annualized_return),
+        'annualized_volatility': float(volatility),
+        'sharpe_ratio': float((annualized_return - risk_free_rate) / volatility) if volatility > 0 else None,
+        'max_drawdown': float(drawdowns.min()),
+    }
+
+def concentration(labels, market_values):
+    """Weights per group (sector, country) and their Herfindahl index
+
+    Weights are in percent, so the index ranges from 10000 / n_groups to
+    10000 (a single group).
+    """
+    names, groups = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+    group_values = np.bincount(groups, weights=market_values, minlength=len(names))
+    total = group_values.sum()
+    weights = group_values / total * 100 if total > 0 else np.zeros(len(names))
+    order = np.argsort(-group_values, kind='stable')
+    herfindahl = float(np.sum(weights ** 2))
+
+    if herfindahl > HERFINDAHL_HIGH:
+        level = 'Forte concentration'
+    elif herfindahl >= HERFINDAHL_MODERATE:
+        level = 'Concentration modérée'
+    else:
+        level = 'Bien diversifié'
+
+    return {
+        'weights': [{'name': names[i], 'value': round(float(group_values[i]), 2),
+                     'weight': round(float(weights[i]), 2),
+                     'count': int(np.sum(groups == i))} for i in order],
+        'herfindahl': round(herfindahl),
+        'level': level,
+    }
+
+def diversification(market_values):
+    """Number of positions, effective number of stocks and top-3 weight"""
+    total = market_values.sum()
+    if total <= 0:
+        return {'num_positions': len(market_values), 'ens': None, 'top3_weight': None, 'level': 'Faible'}
+
+    weights = market_values / total
+    ens = 1 / np.sum(weights ** 2)
+    top3_weight = np.sort(weights)[::-1][:3].sum() * 100
+    n = len(market_values)
+
+    if n >= 8 and ens > 6 and top3_weight < 50:
+        level = 'Excellente'
+    elif n >= 5 and ens >= 4 and top3_weight <= 60:
+        level = 'Bonne'
+    elif n >= 3 and ens >= 2 and top3_weight <= 75:
+        level = 'Moyenne'
+    else:
+        level = 'Faible'
+
+    return {'num_positions': n, 'ens': round(float(ens), 2),
+            'top3_weight': round(float(top3_weight), 2), 'level': level}
+
+def _optional_round(value, digits=2):
+    """Round a value, keeping None"""
+    return None if value is None else round(float(value), digits)
+
+def analyze_portfolio(positions, store_dir, transactions=None, risk_free_rate=RISK_FREE_RATE):
+    """Compute the performance, risk and allocation report of a portfolio"""
+    tickers = [p['ticker'] for p in positions]
+    days, prices = price_history(store_dir, tickers)
+    priced = ~np.isnan(prices)
+    missing = [p['name'] for p, has_prices in zip(positions, priced.any(axis=1)) if not has_prices]
+
+    # Current values: the export's last price, else the store's last close
+    store_last = np.where(priced.any(axis=1), prices[:, -1] if len(days) else np.nan, np.nan)
+    last_prices = np.array([p['last_price'] if p['last_price'] else store_last[row]
+                            for row, p in enumerate(positions)], dtype=float)
+    buy_prices = np.array([p['buy_price'] or np.nan for p in positions], dtype=float)
+    quantities_now = np.array([p['quantity'] for p in positions], dtype=float)
+    market_values = np.nan_to_num(quantities_now * last_prices)
+    total_value = market_values.sum()
+
+    position_pnl = (last_prices - buy_prices) * quantities_now
+    weights = market_values / total_value * 100 if total_value > 0 else np.zeros(len(positions))
+
+    report = {
+        'as_of': str(days[-1].astype('datetime64[D]')) if len(days) else None,
+        'total_value': round(float(total_value), 2),
+        'total_invested': round(float(np.nansum(buy_prices * quantities_now)), 2),
+        'total_pnl': round(float(np.nansum(position_pnl)), 2),
+        'missing_prices': missing,
+        'positions': [],
+        'monthly': [],
+    }
+    report['total_return_pct'] = (round((report['total_value'] / report['total_invested'] - 1) * 100, 2)
+                                  if report['total_invested'] > 0 else None)
+
+    if len(days):
+        quantities = holdings_matrix(positions, days, priced, transactions)
+        values = quantities * np.nan_to_num(prices)
+        held = np.flatnonzero(values.sum(axis=0) > 0)
+    else:
+        held = np.zeros(0, dtype=int)
+
+    if len(held):
+        # Performance starts on the first day the portfolio holds something
+        first = held[0]
+        pnl = daily_pnl(prices, quantities)
+        monthly = monthly_performance(days[first:], values[:, first:], pnl[:, first:])
+        risk = risk_metrics(monthly['daily_returns'], risk_free_rate)
+        time_weighted_return = np.prod(1 + monthly['returns']) - 1
+        for i, month in enumerate(monthly['months']):
+            report['monthly'].append({
+                'month': month,
+                'start_value': round(float(monthly['start_values'][i]), 2),
+                'end_value': round(float(monthly['end_values'][i]), 2),
+                'net_flows': round(float(monthly['net_flows'][i]), 2),
+                'return_pct': round(float(monthly['returns'][i]) * 100, 2),
+            })
+        # Contribution of each position to the latest month
+        last_contributions = monthly['contributions'][:, -1] * 100
+    else:
+        risk = risk_metrics(np.zeros(0), risk_free_rate)
+        time_weighted_return = 0.0
+        last_contributions = np.zeros(len(positions))
+
+    report['time_weighted_return_pct'] = round(float(time_weighted_return) * 100, 2)
+    report['risk'] = {name: _optional_round(value, 4) for name, value in risk.items()}
+    report['risk']['risk_free_rate'] = risk_free_rate
+
+    for row, position in enumerate(positions):
+        report['positions'].append({
+            'ticker': position['ticker'],
+            'name': position['name'],
+            'quantity': position['quantity'],
+            'buy_price': position['buy_price'],
+            'last_price': _optional_round(last_prices[row]) if not np.isnan(last_prices[row]) else None,
+            'market_value': round(float(market_values[row]), 2),
+            'weight': round(float(weights[row]), 2),
+            'pnl': None if np.isnan(position_pnl[row]) else round(float(position_pnl[row]), 2),
+            'pnl_pct': (None if np.isnan(position_pnl[row])
+                        else round(float((last_prices[row] / buy_prices[row] - 1) * 100), 2)),
+            'contribution': (None if np.isnan(position_pnl[row]) or total_value <= 0
+                             else round(float(position_pnl[row] / total_value * 100), 2)),
+            'month_contribution': round(float(last_contributions[row]), 2),
+            'sector': position['sector'],
+            'country': position['country'],
+        })
+
+    report['sectors'] = concentration([p['sector'] for p in positions], market_values)
+    report['countries'] = concentration([p['country'] for p in positions], market_values)
+    report['diversification'] = diversification(market_values)
+    return report
+
+def format_pct(value):
+    """Format a percentage, or N/A"""
+    return f"{value:+.2f}%" if value is not None else 'N/A'
+
+def print_report(report):
+    """Print the main figures of a portfolio report"""
+    risk = report['risk']
+    print(f"\nPortfolio value: {report['total_value']:.2f} EUR (as of {report['as_of']})")
+    print(f"Invested: {report['total_invested']:.2f} EUR, P&L {report['total_pnl']:+.2f} EUR "
+          f"({format_pct(report['total_return_pct'])})")
+    print(f"Time-weighted return: {format_pct(report['time_weighted_return_pct'])}")
+    if risk['annualized_return'] is not None:
+        sharpe = f"{risk['sharpe_ratio']:.2f}" if risk['sharpe_ratio'] is not None else 'N/A'
+        print(f"Annualized return {risk['annualized_return']:.2%}, volatility "
+              f"{risk['annualized_volatility']:.2%}, Sharpe {sharpe}, max drawdown {risk['max_drawdown']:.2%}")
+
+    print("\nLast months:")
+    for month in report['monthly'][-6:]:
+        print(f"  {month['month']}  {month['end_value']:>12.2f} EUR  {format_pct(month['return_pct']):>8}")
+
+    print("\nTop contributors:")
+    ranked = sorted((p for p in report['positions'] if p['contribution'] is not None),
+                    key=lambda p: p['contribution'], reverse=True)
+    for position in ranked[:5]:
+        print(f"  {position['name']:<30} {format_pct(position['contribution']):>8}")
+
+    for label, key in (('Sectors', 'sectors'), ('Countries', 'countries')):
+        print(f"\n{label} (Herfindahl {report[key]['herfindahl']}, {report[key]['level']}):")
+        for group in report[key]['weights']:
+            print(f"  {group['name']:<30} {group['weight']:>6.2f}%")
+
+    div = report['diversification']
+    print(f"\nDiversification: {div['num_positions']} positions, ENS {div['ens']}, "
+          f"top 3 {div['top3_weight']}% ({div['level']})")
+    if report['missing_prices']:
+        print(f"WARNING: No price history for {', '.join(report['missing_prices'])}")
+
+def parse_args():
+    """Parse command line arguments"""
+    from market_watcher_real_data import PRICE_STORE_DIR
+
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Portfolio performance")
+    parser.add_argument('positions', help="Boursorama portfolio export (CSV)")
+    parser.add_argument('--metadata', help="JSON file mapping ISIN/ticker/name to ticker, sector, country")
+    parser.add_argument('--transactions', help="Boursorama transactions export (CSV)")
+    parser.add_argument('--store', default=PRICE_STORE_DIR, help="Price store directory")
+    parser.add_argument('--risk-free', type=float, default=RISK_FREE_RATE,
+                        help=f"Annual risk-free rate for the Sharpe ratio (default: {RISK_FREE_RATE})")
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    return parser.parse_args()
+
+def main():
+    """Main execution"""
+    args = parse_args()
+
+    if not store_exists(args.store):
+        print(f"ERROR: No price store found in {args.store} (run price_store.py migrate first)")
+        sys.exit(1)
+
+    metadata = {}
+    if args.metadata:
+        with open(args.metadata, 'r') as f:
+            metadata = json.load(f)
+
+    positions = load_positions(args.positions, metadata)
+    if not positions:
+        print(f"ERROR: No positions found in {args.positions}")
+        sys.exit(1)
+
+    transactions = None
+    if args.transactions:
+        transactions = load_transactions(args.transactions, positions, metadata)
+        print(f"Loaded {len(transactions)} transactions")
+
+    print(f"Analyzing {len(positions)} positions...")
+    report = analyze_portfolio(positions, args.store, transactions, args.risk_free)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nReport saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Columnar Price Store
+Binary, memory-mapped storage of daily closes, volumes, dates, highs and
+lows for the whole universe, replacing the per-ticker
+{ticker}_historical.json files
+
+Each write goes to a new generation directory inside the store, and a
+single CURRENT file naming it is then replaced atomically, so a reader
+sees either the previous generation or the new one, never a mix:
+    CURRENT                name of the current generation directory
+    generation-<n>/
+        close.f64          little-endian float64 closes, all tickers back to back
+        volume.f64         little-endian float64 volumes, same order
+        date.i32           little-endian int32 dates (days since 1970-01-01, 0 = unknown)
+        high.f64           little-endian float64 daily highs (the close when unknown)
+        low.f64            little-endian float64 daily lows (the close when unknown)
+        index.json         {ticker: [offset, length]} into the columns
+The previous generation is kept for readers that just read CURRENT; older
+ones are removed. Stores written before generations existed hold the
+files directly in the store directory and are still read.
+
+Stores written before highs and lows were kept have no high/low files;
+read_ticker_range returns None for them.
+
+`update` re-reads the {ticker}_historical.json files written since the
+current generation and publishes a new generation with their series
+replacing the stored ones.
+
+Usage:
+    python price_store.py migrate <json_dir> <store_dir>
+    python price_store.py update <json_dir> <store_dir>
+"""
+
+from functools import lru_cache
+import glob
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+STORE_VERSION = 1
+NO_DATE = 0
+
+COLUMNS = {
+    'close': ('close.f64', '<f8'),
+    'volume': ('volume.f64', '<f8'),
+    'date': ('date.i32', '<i4'),
+    'high': ('high.f64', '<f8'),
+    'low': ('low.f64', '<f8'),
+}
+# Columns a store may lack (written by an earlier version)
+OPTIONAL_COLUMNS = ('high', 'low')
+INDEX_FILE = 'index.json'
+CURRENT_FILE = 'CURRENT'
+GENERATION_PREFIX = 'generation-'
+# A writer may remove the generation a reader just picked: read CURRENT again
+OPEN_ATTEMPTS = 3
+
+def store_exists(store_dir):
+    """Return True when a price store has been written in store_dir"""
+    return (os.path.exists(os.path.join(store_dir, CURRENT_FILE))
+            or os.path.exists(os.path.join(store_dir, INDEX_FILE)))
+
+def current_generation(store_dir):
+    """Return the name of the current generation directory, or None (flat store or no store)"""
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE), 'r') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+@lru_cache(maxsize=None)
+def open_price_store(store_dir):
+    """Open a price store with every column memory-mapped read-only
+
+    The result is cached, so the files are mapped once per process. Mapped
+    files stay readable after a writer replaces or removes them.
+    """
+    for attempt in range(OPEN_ATTEMPTS):
+        generation = current_generation(store_dir)
+        try:
+            return _open_columns(os.path.join(store_dir, generation) if generation else store_dir)
+        except FileNotFoundError:
+            if attempt == OPEN_ATTEMPTS - 1:
+                raise
+
+def store_mtime(store_dir):
+    """Return when the current generation (or flat store) was written"""
+    generation = current_generation(store_dir)
+    data_dir = os.path.join(store_dir, generation) if generation else store_dir
+    return os.path.getmtime(os.path.join(data_dir, INDEX_FILE))
+
+def _open_columns(data_dir):
+    """Map the index and columns of one generation (or of a flat store)"""
+    with open(os.path.join(data_dir, INDEX_FILE), 'r') as f:
+        index = json.load(f)
+
+    if index.get('version') != STORE_VERSION:
+        raise ValueError(f"Unsupported price store version: {index.get('version')}")
+
+    store = {'index': index['tickers']}
+    for name, (filename, dtype) in COLUMNS.items():
+        path = os.path.join(data_dir, filename)
+        if name in OPTIONAL_COLUMNS and not os.path.exists(path):
+            store[name] = None
+        elif os.path.getsize(path) == 0:
+            store[name] = np.zeros(0, dtype=dtype)
+        else:
+            store[name] = np.memmap(path, dtype=dtype, mode='r')
+
+    return store
+
+def read_ticker(store, ticker):
+    """Return zero-copy (closes, volumes, dates) views for a ticker, or None"""
+    entry = store['index'].get(ticker)
+    if entry is None:
+        return None
+
+    offset, length = entry
+    end = offset + length
+    return store['close'][offset:end], store['volume'][offset:end], store['date'][offset:end]
+
+def read_ticker_range(store, ticker):
+    """Return zero-copy (highs, lows) views for a ticker, or None
+
+    None when the ticker is not in the store or the store has no highs and lows.
+    """
+    entry = store['index'].get(ticker)
+    if entry is None or store['high'] is None:
+        return None
+
+    offset, length = entry
+    end = offset + length
+    return store['high'][offset:end], store['low'][offset:end]
+
+def dates_to_days(dates):
+    """Convert ISO date strings to int32 days since epoch"""
+    return np.array(dates, dtype='datetime64[D]').astype(np.int32)
+
+def write_price_store(store_dir, series_by_ticker):
+    """Write a complete price store from {ticker: (closes, volumes, dates[, highs, lows])}
+
+    Tickers without highs and lows get their closes in those columns.
+    The columns and index go to a new generation directory, published by
+    replacing CURRENT, so readers never see a half-written store.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    previous = current_generation(store_dir)
+    number = int(previous[len(GENERATION_PREFIX):]) + 1 if previous else 0
+    generation = f"{GENERATION_PREFIX}{number}"
+    data_dir = os.path.join(store_dir, generation)
+    # Left over by a write that died before publishing it
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.makedirs(data_dir)
+
+    tickers = sorted(series_by_ticker)
+    index = {}
+    offset = 0
+    for ticker in tickers:
+        length = len(series_by_ticker[ticker][0])
+        index[ticker] = [offset, length]
+        offset += length
+
+    for position, name in enumerate(COLUMNS):
+        filename, dtype = COLUMNS[name]
+        with open(os.path.join(data_dir, filename), 'wb') as f:
+            for ticker in tickers:
+                series = series_by_ticker[ticker]
+                column = series[position] if position < len(series) else series[0]
+                np.asarray(column, dtype=dtype).tofile(f)
+
+    with open(os.path.join(data_dir, INDEX_FILE), 'w') as f:
+        json.dump({'version': STORE_VERSION, 'tickers': index}, f)
+
+    tmp_current = os.path.join(store_dir, f"{CURRENT_FILE}.tmp")
+    with open(tmp_current, 'w') as f:
+        f.write(generation)
+    os.replace(tmp_current, os.path.join(store_dir, CURRENT_FILE))
+
+    remove_old_generations(store_dir, keep=(generation, previous))
+    open_price_store.cache_clear()
+
+def update_price_store(store_dir, series_by_ticker):
+    """Publish a new generation where `series_by_ticker` replace (or add to) the stored tickers"""
+    merged = {}
+    if store_exists(store_dir):
+        store = open_price_store(store_dir)
+        for ticker in store['index']:
+            closes, volumes, dates = read_ticker(store, ticker)
+            highs, lows = read_ticker_range(store, ticker) or (closes, closes)
+            merged[ticker] = (closes, volumes, dates, highs, lows)
+    merged.update(series_by_ticker)
+    write_price_store(store_dir, merged)
+
+def remove_old_generations(store_dir, keep):
+    """Remove the generations not in `keep`, and the files of a flat store"""
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        if name.startswith(GENERATION_PREFIX) and name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+        elif name == INDEX_FILE or name in (filename for filename, _ in COLUMNS.values()):
+            os.remove(path)
+
+def read_historical_json(data_file):
+    """Read one {ticker}_historical.json file as (closes, volumes, dates, highs, lows)"""
+    with open(data_file, 'r') as f:
+        data = json.load(f)
+
+    prices = data.get('prices', [])
+    volumes = data.get('volumes', [100000] * len(prices))
+    if 'dates' in data:
+        dates = dates_to_days(data['dates'])
+    else:
+        dates = np.full(len(prices), NO_DATE, dtype=np.int32)
+    highs = data.get('highs', prices)
+    lows = data.get('lows', prices)
+
+    return prices, volumes, dates, highs, lows
+
+def read_json_dir(json_dir, since=None):
+    """Read the {ticker}_historical.json files of a directory as {ticker: series}
+
+    With `since` (a timestamp), only the files modified after it are read.
+    Unreadable, empty and misaligned files are reported and skipped.
+    """
+    series_by_ticker = {}
+
+    for data_file in sorted(glob.glob(os.path.join(json_dir, '*_historical.json'))):
+        if since is not None and os.path.getmtime(data_file) <= since:
+            continue
+        ticker = os.path.basename(data_file)[:-len('_historical.json')]
+        try:
+            series = read_historical_json(data_file)
+        except Exception as e:
+            print(f"  ERROR reading {data_file}: {e}")
+            continue
+
+        if len(series[0]) == 0:
+            print(f"  WARNING: No price data in file for {ticker}")
+            continue
+        if any(len(column) != len(series[0]) for column in series[1:]):
+            print(f"  WARNING: Misaligned columns for {ticker}, skipped")
+            continue
+
+        series_by_ticker[ticker] = series
+
+    return series_by_ticker
+
+def migrate_json_to_store(json_dir, store_dir):
+    """One-shot migration of every {ticker}_historical.json into a price store"""
+    series_by_ticker = read_json_dir(json_dir)
+    write_price_store(store_dir, series_by_ticker)
+
+    total_bars = sum(len(s[0]) for s in series_by_ticker.values())
+    print(f"Migrated {len(series_by_ticker)} tickers ({total_bars} bars) to {store_dir}")
+
+    return len(series_by_ticker)
+
+def update_store_from_json(json_dir, store_dir):
+    """Bring a price store up to date with the JSON files written since its current generation
+
+    Returns the number of tickers updated (none leaves the store untouched).
+    """
+    since = store_mtime(store_dir) if store_exists(store_dir) else None
+    series_by_ticker = read_json_dir(json_dir, since)
+    if series_by_ticker:
+        update_price_store(store_dir, series_by_ticker)
+        print(f"Updated {len(series_by_ticker)} tickers in {store_dir}")
+
+    return len(series_by_ticker)
+
+def main():
+    """Command line entry point"""
+    if len(sys.argv) != 4 or sys.argv[1] not in ('migrate', 'update'):
+        print("Usage: python price_store.py migrate|update <json_dir> <store_dir>")
+        sys.exit(1)
+
+    if sys.argv[1] == 'migrate':
+        migrate_json_to_store(sys.argv[2], sys.argv[3])
+    else:
+        update_store_from_json(sys.argv[2], sys.argv[3])
+
+if __name__ == "__main__":
+    main()
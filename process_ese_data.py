@@ -8,6 +8,11 @@ import numpy as np
 from datetime import datetime
 import json
 
+from indicator_kernels import ema_series, macd_series
+from signal_history import append_results
+
+SIGNAL_HISTORY_DB = '/Users/yousrimaazaoui/Documents/projets/test-debile/claude-project/signal_history.db'
+
 # ESE.PA historical data (1 year from Yahoo Finance)
 historical_data = [
     {"Date":"2025-01-06","Close":28.7256}, {"Date":"2025-01-07","Close":28.7253},
@@ -57,31 +62,19 @@ def calc_rsi(prices, periods=14):
     return 100 - (100 / (1 + rs))
 
 # Calculate EMA
-def calc_ema(prices, periods):
-    prices = np.array(prices)
-    multiplier = 2 / (periods + 1)
-    ema = np.zeros(len(prices))
-    ema[periods-1] = np.mean(prices[:periods])
-    for i in range(periods, len(prices)):
-        ema[i] = (prices[i] - ema[i-1]) * multiplier + ema[i-1]
-    return ema[-1]
-
-# Calculate MACD
-def calc_macd(prices):
-    ema12 = calc_ema(prices, 12)
-    ema26 = calc_ema(prices, 26)
-    macd_line = ema12 - ema26
+def calc_ema_series(prices, periods):
+    return ema_series(prices, periods)
 
-    macd_values = []
-    for i in range(26, len(prices)+1):
-        e12 = calc_ema(prices[:i], 12)
-        e26 = calc_ema(prices[:i], 26)
-        macd_values.append(e12 - e26)
+def calc_ema(prices, periods):
+    return calc_ema_series(prices, periods)[-1]
 
-    signal_line = calc_ema(np.array(macd_values), 9)
-    histogram = macd_line - signal_line
+# Calculate MACD (EMA12, EMA26, MACD line and EMA9 signal line in one pass)
+def calc_macd_series(prices):
+    return macd_series(prices)
 
-    return macd_line, signal_line, histogram
+def calc_macd(prices):
+    _, _, macd_values, signal_values, hist_values = calc_macd_series(prices)
+    return macd_values[-1], signal_values[-1], hist_values[-1]
 
 # Calculate all indicators
 rsi = calc_rsi(prices_array)
@@ -203,3 +196,8 @@ with open(output_file, 'w') as f:
     json.dump(result, f, indent=2)
 
 print(f"\nResults saved to: {output_file}")
+
+try:
+    append_results(SIGNAL_HISTORY_DB, output_file, 'process_ese_data')
+except Exception as e:
+    print(f"  WARNING: Could not append to signal history: {e}")
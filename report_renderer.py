@@ -0,0 +1,173 @@
+"""
+Market Watcher PEA - Markdown Report Renderer
+Renders the detailed Markdown report of trading signals from a template
+compiled once at import, and writes a batch of reports concurrently
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from string import Template
+import os
+
+WRITE_WORKERS = 8
+
+SIGNAL_EMOJIS = {'buy': "🟢", 'sell': "🔴"}
+
+REPORT_TEMPLATE = Template("""# $emoji $signal_type SIGNAL: $company_name
+
+**Ticker**: $ticker
+**Signal Date**: $signal_date
+**Confidence Score**: $confidence_score/100
+**Current Price**: $current_price
+
+---
+
+## Executive Summary
+
+$summary
+
+---
+
+## Key Technical Points
+
+$key_points
+
+---
+
+## Technical Indicators
+
+| Indicator | Value | Interpretation |
+|-----------|-------|----------------|
+| **RSI (14)** | $rsi | $rsi_reading |
+| **MACD** | $macd | $macd_reading |
+| **MA20** | $ma20 | $ma20_reading |
+| **MA50** | $ma50 | $ma50_reading |
+| **MA200** | $ma200 | $ma200_reading |
+| **Volume Ratio** | $volume_ratio | $volume_reading |
+
+---
+
+## Risk Factors
+
+$risks
+
+---
+
+## Action Suggestion
+
+$action_suggestion
+
+### Price Targets
+
+- **Short-term target**: $short_term
+- **Medium-term target**: $medium_term
+- **Stop-loss**: $stop_loss
+
+---
+
+## Disclaimer
+
+⚠️ **DISCLAIMER**: This analysis is provided for informational purposes only and does not constitute investment advice. All investment decisions remain your sole responsibility. Past performance does not guarantee future results. Always conduct your own research and consider consulting a licensed financial advisor.
+
+---
+
+*Report generated by Market Watcher PEA on $generated_on*
+""")
+
+def format_value(value, spec, suffix=''):
+    """Format an indicator value, or 'N/A' when it is missing (None or 0)"""
+    return f"{value:{spec}}{suffix}" if value else 'N/A'
+
+def numbered_list(items):
+    """Format items as a numbered Markdown list"""
+    return '\n'.join(f"{i}. {item}" for i, item in enumerate(items, 1))
+
+def position_reading(price, average, above, below):
+    """Describe the price relative to a moving average, or 'N/A' without one"""
+    if not average:
+        return 'N/A'
+    return above if price > average else below
+
+def report_fields(signal, generated_at):
+    """Compute the template fields of one signal"""
+    details = signal['technical_details']
+    price = details['current_price']
+    rsi = details['rsi']
+    histogram = details['macd_histogram']
+    volume_ratio = details['volume_ratio']
+    targets = signal['target_price']
+
+    if not rsi:
+        rsi_reading = 'N/A'
+    elif rsi < 30:
+        rsi_reading = 'Oversold'
+    elif rsi > 70:
+        rsi_reading = 'Overbought'
+    else:
+        rsi_reading = 'Neutral'
+
+    return {
+        'emoji': SIGNAL_EMOJIS.get(signal['signal_type'], "🟡"),
+        'signal_type': signal['signal_type'].upper(),
+        'company_name': signal['company_name'],
+        'ticker': signal['ticker'],
+        'signal_date': generated_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'generated_on': generated_at.strftime('%Y-%m-%d at %H:%M:%S'),
+        'confidence_score': signal['confidence_score'],
+        'current_price': format_value(price, '.2f', ' EUR'),
+        'summary': signal['summary'],
+        'key_points': numbered_list(signal['key_points']),
+        'risks': numbered_list(signal['risks']),
+        'rsi': format_value(rsi, '.2f'),
+        'rsi_reading': rsi_reading,
+        'macd': format_value(details['macd'], '.4f'),
+        'macd_reading': 'N/A' if not histogram else 'Bullish' if histogram > 0 else 'Bearish',
+        'ma20': format_value(details['ma20'], '.2f', ' EUR'),
+        'ma20_reading': position_reading(price, details['ma20'], 'Price above MA20', 'Price below MA20'),
+        'ma50': format_value(details['ma50'], '.2f', ' EUR'),
+        'ma50_reading': position_reading(price, details['ma50'], 'Price above MA50', 'Price below MA50'),
+        'ma200': format_value(details['ma200'], '.2f', ' EUR'),
+        'ma200_reading': position_reading(price, details['ma200'],
+                                          'Long-term uptrend', 'Long-term downtrend'),
+        'volume_ratio': format_value(volume_ratio, '.2f', 'x'),
+        'volume_reading': ('N/A' if volume_ratio is None
+                           else 'Elevated volume' if volume_ratio > 1.2 else 'Normal volume'),
+        'action_suggestion': signal['action_suggestion'],
+        'short_term': format_value(targets['short_term'], '.2f', ' EUR'),
+        'medium_term': format_value(targets['medium_term'], '.2f', ' EUR'),
+        'stop_loss': format_value(targets['stop_loss'], '.2f', ' EUR'),
+    }
+
+def render_report(signal, generated_at=None):
+    """Render the Markdown report of one signal"""
+    return REPORT_TEMPLATE.substitute(report_fields(signal, generated_at or datetime.now()))
+
+def render_reports(signals, generated_at=None):
+    """Render the reports of a batch of signals with one shared timestamp"""
+    generated_at = generated_at or datetime.now()
+    return [render_report(signal, generated_at) for signal in signals]
+
+def report_filename(signal, generated_at):
+    """Return the report file name of a signal"""
+    return f"signal_{signal['ticker']}_{generated_at.strftime('%Y%m%d_%H%M')}.md"
+
+def _write_file(filepath, content):
+    """Write one report file"""
+    with open(filepath, 'w') as f:
+        f.write(content)
+
+def write_reports(signals, reports_dir, workers=WRITE_WORKERS):
+    """Render a batch of signals and write their reports concurrently
+
+    Returns the file names in the order of `signals`.
+    """
+    generated_at = datetime.now()
+    reports = render_reports(signals, generated_at)
+    filenames = [report_filename(signal, generated_at) for signal in signals]
+
+    os.makedirs(reports_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() re-raises the first write error, if any
+        list(executor.map(_write_file, (os.path.join(reports_dir, name) for name in filenames), reports))
+
+    return filenames
@@ -0,0 +1,66 @@
+"""
+Market Watcher PEA - Streaming Result Output
+Writes signals as NDJSON, one compact line per ticker as soon as it is
+analyzed, followed by a summary record once the scan is complete
+
+Each line is a JSON object whose "record" key tells its kind:
+    {"record": "signal", "signal": {...}}
+    {"record": "summary", "execution_time": ..., "total_tickers_analyzed": ..., ...}
+A file without a summary record belongs to a scan still running (or one
+that was interrupted).
+"""
+
+from datetime import datetime
+import json
+import os
+
+HIGH_CONFIDENCE = 60
+
+def stream_path(output_json):
+    """Return the NDJSON results file that goes with a JSON results file"""
+    root, _ = os.path.splitext(output_json)
+    return f"{root}.ndjson"
+
+def open_result_stream(path):
+    """Create (or truncate) an NDJSON results file and return its stream"""
+    return {
+        'path': path,
+        'file': open(path, 'w'),
+        'count': 0,
+        'high_confidence': [],
+    }
+
+def _write_record(stream, record):
+    """Append one compact JSON line and flush it for downstream readers"""
+    stream['file'].write(json.dumps(record, separators=(',', ':')) + '\n')
+    stream['file'].flush()
+
+def write_signal(stream, signal):
+    """Append one signal; only high-confidence signals are kept in memory"""
+    _write_record(stream, {'record': 'signal', 'signal': signal})
+    stream['count'] += 1
+    if signal['confidence_score'] >= HIGH_CONFIDENCE:
+        stream['high_confidence'].append(signal)
+
+def close_result_stream(stream):
+    """Append the summary record and close the file"""
+    _write_record(stream, {
+        'record': 'summary',
+        'execution_time': datetime.now().isoformat(),
+        'total_tickers_analyzed': stream['count'],
+        'high_confidence_signals': len(stream['high_confidence']),
+    })
+    stream['file'].close()
+
+def read_result_stream(path):
+    """Read an NDJSON results file back as (signals, summary or None)"""
+    signals = []
+    summary = None
+    with open(path, 'r') as f:
+        for line in f:
+            record = json.loads(line)
+            if record['record'] == 'signal':
+                signals.append(record['signal'])
+            elif record['record'] == 'summary':
+                summary = record
+    return signals, summary
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Screener
+Keeps the latest indicators of every ticker as columns (one NumPy array per
+indicator) and evaluates screens such as
+    rsi < 30 and close > ma200 and volume_ratio > 1.3
+as vectorized masks over the whole universe, with sorting and top-K
+
+Screens are defined in screens.json next to the watchlist:
+    {"oversold_uptrend": {"where": "rsi < 30 and close > ma200",
+                          "sort": "-volume_ratio", "top": 10}}
+"sort" names a numeric column ("-" for descending, undefined values last)
+and "top" keeps the first K matches. Expressions are parsed with the ast
+module: only comparisons, and/or/not, + - * /, column names and number or
+string constants are accepted. An undefined indicator fails every
+comparison. Indicators are read at full precision from the signals'
+indicator_values when they have them (technical_details are rounded to
+2 decimals, which zeroes small values such as a low-priced MACD).
+
+Usage:
+    python screener.py [--results FILE] [--screens screens.json]
+                       [--where EXPR] [--sort=[-]COLUMN] [--top K]
+"""
+
+import argparse
+import ast
+import json
+import operator
+import os
+import sys
+
+import numpy as np
+
+from extended_indicators import EXTENDED_NAMES
+from result_stream import HIGH_CONFIDENCE
+from signal_history import INDICATOR_COLUMNS, read_results_file
+
+TEXT_COLUMNS = ('ticker', 'company_name', 'signal_type')
+NUMERIC_COLUMNS = ('confidence_score',) + INDICATOR_COLUMNS + EXTENDED_NAMES
+# Shorter names screens may use for a column
+ALIASES = {'close': 'current_price'}
+SCREEN_FIELDS = ('where', 'sort', 'top')
+HIGH_CONFIDENCE_SCREEN = {'where': f"confidence_score >= {HIGH_CONFIDENCE}"}
+
+COMPARISONS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+ARITHMETIC = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+
+def build_snapshot(signals):
+    """Return the columns of the latest signals: {column: array}, one row per ticker
+
+    Numeric columns hold NaN where an indicator is undefined. Signals
+    without indicator_values (other scripts, older results) fall back to
+    their rounded technical_details.
+    """
+    snapshot = {name: np.array([signal.get(name) or '' for signal in signals], dtype=str)
+                for name in TEXT_COLUMNS}
+    snapshot['confidence_score'] = np.array([signal['confidence_score'] for signal in signals], dtype=float)
+    details = [signal.get('indicator_values') or signal.get('technical_details', {}) for signal in signals]
+    for name in INDICATOR_COLUMNS + EXTENDED_NAMES:
+        snapshot[name] = np.array([detail.get(name) for detail in details], dtype=float)
+    return snapshot
+
+def column_name(name):
+    """Resolve an alias to its column, rejecting unknown names"""
+    name = ALIASES.get(name, name)
+    if name not in TEXT_COLUMNS and name not in NUMERIC_COLUMNS:
+        raise ValueError(f"Unknown column: {name}")
+    return name
+
+def _compile(node, names):
+    """Turn a whitelisted expression node into a function of the snapshot"""
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile(value, names) for value in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        def boolean(snapshot):
+            mask = parts[0](snapshot)
+            for part in parts[1:]:
+                mask = combine(mask, part(snapshot))
+            return mask
+        return boolean
+
+    if isinstance(node, ast.Compare):
+        if not all(type(op) in COMPARISONS for op in node.ops):
+            raise ValueError("Only <, <=, >, >=, == and != comparisons are allowed")
+        operands = [_compile(operand, names) for operand in [node.left] + node.comparators]
+        ops = [COMPARISONS[type(op)] for op in node.ops]
+        def compare(snapshot):
+            values = [operand(snapshot) for operand in operands]
+            mask = ops[0](values[0], values[1])
+            for i in range(1, len(ops)):
+                mask = mask & ops[i](values[i], values[i+1])
+            return mask
+        return compare
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+        operand = _compile(node.operand, names)
+        if isinstance(node.op, ast.Not):
+            return lambda snapshot: np.logical_not(operand(snapshot))
+        return lambda snapshot: -operand(snapshot)
+
+    if isinstance(node, ast.BinOp):
+        if type(node.op) not in ARITHMETIC:
+            raise ValueError("Only +, -, * and / arithmetic is allowed")
+        left, right = _compile(node.left, names), _compile(node.right, names)
+        op = ARITHMETIC[type(node.op)]
+        return lambda snapshot: op(left(snapshot), right(snapshot))
+
+    if isinstance(node, ast.Name):
+        name = column_name(node.id)
+        names.append(name)
+        return lambda snapshot: snapshot[name]
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) \
+            and not isinstance(node.value, bool):
+        return lambda snapshot: node.value
+
+    raise ValueError(f"Unsupported element in screen: {type(node).__name__}")
+
+def compile_screen(expression):
+    """Compile a screen expression into (mask function, column names it reads)
+
+    Raises ValueError on syntax errors, unknown columns and anything
+    outside the whitelist (calls, attributes, subscripts...).
+    """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid screen {expression!r}: {e.msg}")
+
+    names = []
+    evaluate = _compile(tree.body, names)
+
+    def mask(snapshot):
+        n_rows = len(snapshot['ticker'])
+        try:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = np.asarray(evaluate(snapshot))
+        except TypeError as e:
+            # e.g. a text column compared with a number
+            raise ValueError(f"Screen {expression!r} mixes incompatible columns ({e})")
+        if result.dtype != bool:
+            raise ValueError(f"Screen {expression!r} is not a condition")
+        return np.broadcast_to(result, (n_rows,))
+
+    return mask, list(dict.fromkeys(names))
+
+def sort_key(sort):
+    """Return (column, descending) of a sort spec such as "-volume_ratio" """
+    descending = sort.startswith('-')
+    name = column_name(sort.lstrip('-'))
+    if name not in NUMERIC_COLUMNS:
+        raise ValueError(f"Cannot sort on text column: {name}")
+    return name, descending
+
+def run_screen(snapshot, screen):
+    """Return the snapshot rows matching a screen, sorted and cut to its top K
+
+    `screen` is a dict with "where" and optional "sort" and "top"; without
+    "sort" the rows keep the snapshot (watchlist) order.
+    """
+    mask, _ = compile_screen(screen['where'])
+    rows = np.flatnonzero(mask(snapshot))
+
+    if screen.get('sort'):
+        name, descending = sort_key(screen['sort'])
+        values = snapshot[name][rows]
+        # NaN sorts last either way; the stable sort keeps watchlist order among ties
+        rows = rows[np.argsort(-values if descending else values, kind='stable')]
+
+    if screen.get('top') is not None:
+        rows = rows[:screen['top']]
+    return rows
+
+def screen_signals(signals, screen):
+    """Return the signals matching a screen (e.g. {"where": "confidence_score >= 60"})"""
+    return [signals[row] for row in run_screen(build_snapshot(signals), screen)]
+
+def screens_path(watchlist_file):
+    """Return the screens config file that goes with a watchlist"""
+    return os.path.join(os.path.dirname(os.path.abspath(watchlist_file)), 'screens.json')
+
+def placeholder_snapshot():
+    """A one-row snapshot with an empty string or NaN in every column, to try screens on"""
+    snapshot = {name: np.array([''], dtype=str) for name in TEXT_COLUMNS}
+    snapshot.update({name: np.array([np.nan]) for name in NUMERIC_COLUMNS})
+    return snapshot
+
+def check_screen(name, screen):
+    """Check a screen's fields, its sort column and that its expression evaluates to a condition
+
+    The expression is run on placeholder_snapshot(), so that a non-condition
+    ("rsi") or a text column compared with a number is reported here rather
+    than when the screens run. Errors name the screen.
+    """
+    if not isinstance(screen, dict):
+        raise ValueError(f"Screen {name}: expected an object with \"where\" and optional \"sort\"/\"top\" "
+                         f"(got {type(screen).__name__})")
+    unknown = set(screen) - set(SCREEN_FIELDS)
+    if 'where' not in screen or unknown:
+        raise ValueError(f"Screen {name}: expected a \"where\" and optional \"sort\"/\"top\" "
+                         f"(got {', '.join(sorted(screen))})")
+    if not isinstance(screen['where'], str) or not isinstance(screen.get('sort') or '', str):
+        raise ValueError(f"Screen {name}: \"where\" and \"sort\" must be strings")
+    top = screen.get('top')
+    if top is not None and (type(top) is not int or top < 1):
+        raise ValueError(f"Screen {name}: \"top\" must be a positive integer (got {top!r})")
+    try:
+        mask, _ = compile_screen(screen['where'])
+        mask(placeholder_snapshot())
+        if screen.get('sort'):
+            sort_key(screen['sort'])
+    except ValueError as e:
+        raise ValueError(f"Screen {name}: {e}")
+
+def load_screens(path):
+    """Read {name: screen} from a screens config file ({} when missing)
+
+    Every screen is checked here, so that a typo is reported with the
+    screen's name before any ticker is screened.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r') as f:
+        screens = json.load(f)
+    if not isinstance(screens, dict):
+        raise ValueError(f"{path}: expected {{name: screen}} (got {type(screens).__name__})")
+    for name, screen in screens.items():
+        check_screen(name, screen)
+    return screens
+
+def format_row(snapshot, row, names):
+    """One matching ticker with its signal and the columns the screen reads"""
+    values = []
+    for name in names:
+        if name in ('ticker', 'signal_type', 'confidence_score'):
+            continue
+        value = snapshot[name][row]
+        if name in NUMERIC_COLUMNS:
+            values.append(f"{name} {'N/A' if np.isnan(value) else f'{value:.2f}'}")
+        else:
+            values.append(f"{name} {value}")
+    line = (f"  - {snapshot['ticker'][row]}: {snapshot['signal_type'][row].upper()} "
+            f"(Score: {snapshot['confidence_score'][row]:.0f})")
+    return '  '.join([line] + values)
+
+def print_screens(snapshot, screens):
+    """Run every screen on the snapshot and print its matches (a failing screen is skipped)"""
+    for name, screen in screens.items():
+        try:
+            rows = run_screen(snapshot, screen)
+            names = compile_screen(screen['where'])[1]
+            if screen.get('sort'):
+                names = list(dict.fromkeys(names + [sort_key(screen['sort'])[0]]))
+        except ValueError as e:
+            print(f"  WARNING: Screen {name} skipped: {e}")
+            continue
+        print(f"\nScreen {name} ({screen['where']}): {len(rows)} tickers")
+        for row in rows:
+            print(format_row(snapshot, row, names))
+
+def parse_args():
+    """Parse command line arguments"""
+    from market_watcher_real_data import EXCEL_FILE, OUTPUT_JSON
+
+    parser = argparse.ArgumentParser(description="Screen the latest signals of every ticker")
+    parser.add_argument('--results', default=OUTPUT_JSON, help="Results JSON or NDJSON file")
+    parser.add_argument('--screens', default=screens_path(EXCEL_FILE),
+                        help="Screens config file (default: screens.json next to the watchlist)")
+    parser.add_argument('--where', help="Run this screen instead of the config file's")
+    parser.add_argument('--sort', help="Sort column of --where, e.g. --sort=-volume_ratio for descending")
+    parser.add_argument('--top', type=int, help="Keep the first K matches of --where")
+    return parser.parse_args()
+
+def main():
+    """Main execution"""
+    args = parse_args()
+    try:
+        if args.where:
+            screens = {'command line': {'where': args.where, 'sort': args.sort, 'top': args.top}}
+            check_screen('command line', screens['command line'])
+        else:
+            screens = load_screens(args.screens)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    if not screens:
+        print(f"No screens defined in {args.screens}")
+        sys.exit(0)
+
+    signals, execution_time = read_results_file(args.results)
+    snapshot = build_snapshot(signals)
+    print(f"Screening {len(signals)} tickers from {args.results} ({execution_time})")
+    print_screens(snapshot, screens)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Signal History
+Appends the signals and indicator values of every run to a local SQLite
+database, indexed by ticker, date and signal type, and answers history
+queries on it
+
+Usage:
+    python signal_history.py import <history.db> <results.json|results.ndjson> [...]
+    python signal_history.py query <history.db> [--ticker ESE.PA] [--type buy]
+                                   [--min-confidence 60] [--year 2025] [--limit 50]
+    python signal_history.py latest <history.db> [--type buy] [--min-confidence 60]
+"""
+
+from datetime import datetime
+import argparse
+import json
+import os
+import sqlite3
+
+from result_stream import read_result_stream
+
+INDICATOR_COLUMNS = ('current_price', 'rsi', 'macd', 'macd_signal', 'macd_histogram',
+                     'ma20', 'ma50', 'ma200', 'volume_ratio')
+
+SIGNAL_COLUMNS = ('ticker', 'company_name', 'signal_time', 'signal_date', 'signal_type',
+                  'confidence_score') + INDICATOR_COLUMNS
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    script TEXT NOT NULL,
+    execution_time TEXT NOT NULL,
+    source TEXT,
+    imported_at TEXT NOT NULL,
+    UNIQUE (script, execution_time)
+);
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    ticker TEXT NOT NULL,
+    company_name TEXT,
+    signal_time TEXT NOT NULL,
+    signal_date TEXT NOT NULL,
+    signal_type TEXT NOT NULL,
+    confidence_score INTEGER NOT NULL,
+    {', '.join(f'{name} REAL' for name in INDICATOR_COLUMNS)},
+    signal_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_signals_ticker ON signals (ticker, signal_type, signal_date);
+CREATE INDEX IF NOT EXISTS idx_signals_type ON signals (signal_type, signal_date);
+CREATE INDEX IF NOT EXISTS idx_signals_date ON signals (signal_date);
+CREATE TABLE IF NOT EXISTS latest (
+    ticker TEXT PRIMARY KEY,
+    signal_id INTEGER NOT NULL REFERENCES signals(id),
+    signal_time TEXT NOT NULL
+);
+"""
+
+def open_history(db_path):
+    """Open (and create if needed) the signal history database"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _signal_row(run_id, signal, execution_time):
+    """Flatten one signal into its `signals` table row"""
+    details = signal.get('technical_details', {})
+    # Intraday signals carry the time of their bar
+    signal_time = signal.get('bar_time') or execution_time
+    return (
+        run_id, signal['ticker'], signal.get('company_name'), signal_time, signal_time[:10],
+        signal['signal_type'], signal['confidence_score'],
+        *(details.get(name) for name in INDICATOR_COLUMNS),
+        json.dumps(signal, separators=(',', ':'))
+    )
+
+def record_run(conn, signals, execution_time, script, source=None):
+    """Append the signals of one run
+
+    A run is identified by its script and execution time, so importing the
+    same results twice is a no-op. Returns the number of signals added.
+    """
+    with conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO runs (script, execution_time, source, imported_at) "
+            "VALUES (?, ?, ?, ?)",
+            (script, execution_time, source, datetime.now().isoformat()))
+        if cursor.rowcount == 0:
+            return 0
+
+        run_id = cursor.lastrowid
+        placeholders = ', '.join('?' * (len(SIGNAL_COLUMNS) + 2))
+        conn.executemany(
+            f"INSERT INTO signals (run_id, {', '.join(SIGNAL_COLUMNS)}, signal_json) "
+            f"VALUES ({placeholders})",
+            [_signal_row(run_id, signal, execution_time) for signal in signals])
+
+        # Keep the latest signal of each ticker at hand (an older import does not replace it)
+        conn.execute(
+            "INSERT INTO latest (ticker, signal_id, signal_time) "
+            "SELECT ticker, id, signal_time FROM signals WHERE run_id = ? ORDER BY id "
+            "ON CONFLICT (ticker) DO UPDATE SET signal_id = excluded.signal_id, "
+            "signal_time = excluded.signal_time WHERE excluded.signal_time >= latest.signal_time",
+            (run_id,))
+
+    return len(signals)
+
+def analysis_signal(data):
+    """Convert a single-ticker analysis (process_ese_data.py's ese_analysis.json) to a signal"""
+    return {
+        'ticker': data['ticker'],
+        'company_name': data.get('company_name'),
+        'signal_type': data['signal'].lower(),
+        'confidence_score': data['confidence'],
+        'key_points': data.get('reasons', []),
+        'technical_details': {'current_price': data.get('current_price'), **data.get('indicators', {})},
+    }
+
+def read_results_file(path):
+    """Read a results JSON or NDJSON file as (signals, execution_time)
+
+    An NDJSON file without a summary record (interrupted scan) is dated
+    by its modification time. A single-ticker analysis file (analysis_date,
+    signal, confidence) gives one signal. Raises ValueError for other files.
+    """
+    if path.endswith('.ndjson'):
+        signals, summary = read_result_stream(path)
+        if summary is not None:
+            return signals, summary['execution_time']
+        return signals, datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: not a results file")
+    if 'execution_time' in data:
+        return data.get('signals', []), data['execution_time']
+    if {'ticker', 'analysis_date', 'signal', 'confidence'} <= set(data):
+        return [analysis_signal(data)], data['analysis_date']
+    raise ValueError(f"{path}: not a results file (no execution_time or analysis_date)")
+
+def import_results(conn, path, script=None):
+    """Append the signals of a results file; the script defaults to the file name"""
+    signals, execution_time = read_results_file(path)
+    if script is None:
+        script = os.path.splitext(os.path.basename(path))[0]
+    return record_run(conn, signals, execution_time, script, source=os.path.abspath(path))
+
+def append_results(db_path, path, script):
+    """Append the results file a scan just wrote to the history database"""
+    conn = open_history(db_path)
+    try:
+        added = import_results(conn, path, script)
+    finally:
+        conn.close()
+    print(f"Signal history: {added} signals appended to {db_path}")
+    return added
+
+def _filters(ticker=None, signal_type=None, min_confidence=None, start=None, end=None):
+    """Build the WHERE clause and parameters of a history query"""
+    clauses = []
+    params = []
+    if ticker is not None:
+        clauses.append("ticker = ?")
+        params.append(ticker)
+    if signal_type is not None:
+        clauses.append("signal_type = ?")
+        params.append(signal_type.lower())
+    if min_confidence is not None:
+        clauses.append("confidence_score >= ?")
+        params.append(min_confidence)
+    if start is not None:
+        clauses.append("signal_date >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("signal_date <= ?")
+        params.append(end)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+def _rows(cursor, full):
+    """Convert result rows to dicts, with the decoded signal when `full`"""
+    rows = []
+    for row in cursor:
+        record = {name: row[name] for name in SIGNAL_COLUMNS}
+        if full:
+            record['signal'] = json.loads(row['signal_json'])
+        rows.append(record)
+    return rows
+
+def query_signals(conn, ticker=None, signal_type=None, min_confidence=None, start=None, end=None,
+                  limit=None, full=False):
+    """Return the matching signals, most recent first
+
+    `start` and `end` are inclusive YYYY-MM-DD dates. With `full`, each row
+    also holds the complete signal dict under 'signal'.
+    """
+    where, params = _filters(ticker, signal_type, min_confidence, start, end)
+    sql = f"SELECT * FROM signals {where} ORDER BY signal_time DESC, ticker"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return _rows(conn.execute(sql, params), full)
+
+def latest_signals(conn, signal_type=None, min_confidence=None, full=False):
+    """Return the latest signal of every ticker, by ticker
+
+    The filters apply to that latest signal (e.g. the tickers currently on BUY).
+    """
+    where, params = _filters(signal_type=signal_type, min_confidence=min_confidence)
+    sql = f"SELECT s.* FROM latest JOIN signals s ON s.id = latest.signal_id {where} ORDER BY s.ticker"
+    return _rows(conn.execute(sql, params), full)
+
+def year_range(year):
+    """Return the (start, end) dates of a calendar year"""
+    return f"{year}-01-01", f"{year}-12-31"
+
+def print_signals(rows):
+    """Print history rows as a table"""
+    for row in rows:
+        rsi = f"{row['rsi']:.1f}" if row['rsi'] is not None else 'N/A'
+        price = f"{row['current_price']:.2f}" if row['current_price'] is not None else 'N/A'
+        print(f"  {row['signal_time'][:19]:<19}  {row['ticker']:<10} {row['signal_type'].upper():<7} "
+              f"{row['confidence_score']:>3}/100  price {price}  RSI {rsi}")
+    print(f"{len(rows)} signals")
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Market Watcher PEA - Signal History")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="Append results JSON/NDJSON files")
+    import_parser.add_argument('db')
+    import_parser.add_argument('files', nargs='+')
+
+    for name, help_text in (('query', "List matching signals"),
+                            ('latest', "Latest signal per ticker")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('db')
+        command.add_argument('--type', dest='signal_type', help="buy, sell, watch or neutral")
+        command.add_argument('--min-confidence', type=int)
+        if name == 'query':
+            command.add_argument('--ticker')
+            command.add_argument('--year', type=int)
+            command.add_argument('--limit', type=int)
+
+    return parser.parse_args()
+
+def main():
+    """Main execution"""
+    args = parse_args()
+    conn = open_history(args.db)
+
+    if args.command == 'import':
+        for path in args.files:
+            try:
+                added = import_results(conn, path)
+            except (OSError, ValueError) as e:
+                print(f"  WARNING: {e}, skipped")
+                continue
+            print(f"{path}: {added} signals imported" if added else f"{path}: already imported")
+    elif args.command == 'query':
+        start, end = year_range(args.year) if args.year else (None, None)
+        print_signals(query_signals(conn, args.ticker, args.signal_type, args.min_confidence,
+                                    start, end, args.limit))
+    else:
+        print_signals(latest_signals(conn, args.signal_type, args.min_confidence))
+
+    conn.close()
+
+if __name__ == "__main__":
+    main()
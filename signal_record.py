@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Market Watcher PEA - Compact Signal Records
+Slotted signal records holding the numeric inputs and the reason/risk
+bitmasks of a signal; the narrative strings, targets and rounded technical
+details of generate_signal are rendered on demand by to_dict()
+
+to_dict() returns exactly the dict market_watcher_real_data.generate_signal
+returns when called without `timeframes` and `extended` (and the dict of
+market_watcher_analysis.generate_signal): the core technical_details only,
+without the extended indicators or the "timeframes" confirmations.
+
+Usage:
+    python signal_record.py compare [N]    # memory of N dicts vs N records
+"""
+
+import sys
+import tracemalloc
+
+import numpy as np
+
+from signal_scoring import (BUY, REASON_ABOVE_MA200, REASON_BELOW_MA20_HIGH_VOLUME,
+                            REASON_MACD_BULLISH_CROSSOVER, REASON_MACD_POSITIVE,
+                            REASON_MIXED_SIGNALS, REASON_NEUTRAL_ZONE, REASON_RSI_NEAR_OVERSOLD,
+                            REASON_RSI_OVERSOLD, REASON_VOLUME_SURGE, RISK_BELOW_MA200,
+                            RISK_EXTENDED_ABOVE_MA20, RISK_GENERIC, RISK_MACD_BEARISH_CROSSOVER,
+                            RISK_MACD_NEGATIVE, RISK_RSI_NEAR_OVERBOUGHT, RISK_RSI_OVERBOUGHT, SELL,
+                            SIGNAL_NAMES, score_signals)
+
+# generate_signal's texts, in the order it appends them
+REASON_TEXTS = (
+    (REASON_RSI_OVERSOLD, "RSI oversold at {rsi:.1f} indicates strong rebound potential"),
+    (REASON_RSI_NEAR_OVERSOLD, "RSI at {rsi:.1f} approaching oversold territory"),
+    (REASON_MACD_BULLISH_CROSSOVER, "Bullish MACD crossover detected"),
+    (REASON_MACD_POSITIVE, "Positive MACD momentum"),
+    (REASON_ABOVE_MA200, "Price above MA200 ({ma200:.2f}) confirms long-term uptrend"),
+    (REASON_VOLUME_SURGE, "Volume surge ({volume_ratio:.1%} above average) confirms accumulation"),
+    (REASON_BELOW_MA20_HIGH_VOLUME, "Price below MA20 with elevated volume suggests buying opportunity"),
+    (REASON_MIXED_SIGNALS, "Mixed technical signals require confirmation"),
+    (REASON_NEUTRAL_ZONE, "All indicators in neutral zone"),
+)
+
+RISK_TEXTS = (
+    (RISK_RSI_OVERBOUGHT, "RSI overbought at {rsi:.1f} indicates potential correction"),
+    (RISK_RSI_NEAR_OVERBOUGHT, "RSI at {rsi:.1f} approaching overbought zone"),
+    (RISK_MACD_BEARISH_CROSSOVER, "Bearish MACD crossover detected"),
+    (RISK_MACD_NEGATIVE, "Negative MACD momentum"),
+    (RISK_BELOW_MA200, "Price below MA200 ({ma200:.2f}) indicates long-term downtrend"),
+    (RISK_EXTENDED_ABOVE_MA20, "Price extended above MA20 with high RSI suggests profit-taking zone"),
+    (RISK_GENERIC, "Market conditions remain subject to volatility"),
+    (RISK_GENERIC, "External macroeconomic factors should be monitored"),
+)
+
+MAX_KEY_POINTS = 5
+MAX_RISKS = 3
+
+class SignalRecord:
+    """One trading signal, stored as its inputs, scores and reason/risk bitmasks"""
+
+    __slots__ = ('ticker', 'company_name', 'signal_code', 'confidence_score',
+                 'reason_codes', 'risk_codes', 'current_price', 'rsi', 'macd',
+                 'macd_signal', 'macd_histogram', 'ma20', 'ma50', 'ma200', 'volume_ratio')
+
+    def __init__(self, ticker, company_name, signal_code, confidence_score, reason_codes, risk_codes,
+                 current_price, rsi, macd, macd_signal, macd_histogram, ma20, ma50, ma200, volume_ratio):
+        self.ticker = ticker
+        self.company_name = company_name
+        self.signal_code = signal_code
+        self.confidence_score = confidence_score
+        self.reason_codes = reason_codes
+        self.risk_codes = risk_codes
+        self.current_price = current_price
+        self.rsi = rsi
+        self.macd = macd
+        self.macd_signal = macd_signal
+        self.macd_histogram = macd_histogram
+        self.ma20 = ma20
+        self.ma50 = ma50
+        self.ma200 = ma200
+        self.volume_ratio = volume_ratio
+
+    @property
+    def signal_type(self):
+        """Signal name: buy, sell, watch or neutral"""
+        return SIGNAL_NAMES[self.signal_code]
+
+    def _texts(self, texts, codes):
+        """Render the texts whose bit is set in `codes`"""
+        values = {'rsi': self.rsi, 'ma200': self.ma200, 'volume_ratio': self.volume_ratio}
+        return [text.format(**values) for bit, text in texts if codes & bit]
+
+    def key_points(self):
+        """The reasons of the signal, as generate_signal words them"""
+        return self._texts(REASON_TEXTS, self.reason_codes)[:MAX_KEY_POINTS]
+
+    def risks(self):
+        """The risk factors of the signal, as generate_signal words them"""
+        return self._texts(RISK_TEXTS, self.risk_codes)[:MAX_RISKS]
+
+    def targets(self):
+        """Return the (short-term, medium-term, stop-loss) prices"""
+        price = self.current_price
+        if self.signal_code == BUY:
+            return price * 1.05, price * 1.10, price * 0.95
+        if self.signal_code == SELL:
+            return price * 0.95, price * 0.90, price * 1.05
+        return price, price, price * 0.97
+
+    def action_suggestion(self):
+        """The suggested action, as generate_signal words it"""
+        price = self.current_price
+        short_term, medium_term, stop_loss = self.targets()
+        if self.signal_code == BUY:
+            return (f"Consider initiating position at current levels ({price:.2f}). "
+                    f"Set stop-loss at {stop_loss:.2f} (-5%). "
+                    f"First target at {short_term:.2f} (+5%), second target at {medium_term:.2f} (+10%).")
+        if self.signal_code == SELL:
+            return (f"Consider reducing exposure or taking profits at {price:.2f}. "
+                    f"Monitor support at {stop_loss:.2f}. "
+                    f"Potential downside to {medium_term:.2f} (-10%).")
+        return ("Wait for clearer technical confirmation before acting. "
+                "Monitor key levels and volume for entry signals.")
+
+    def title(self):
+        """The signal title with its emoji"""
+        emoji = "🟢" if self.signal_code == BUY else "🔴" if self.signal_code == SELL else "🟡"
+        return f"{emoji} {self.signal_type.upper()} Signal on {self.company_name}"
+
+    def summary(self):
+        """The one-paragraph summary of the signal"""
+        signal_type = self.signal_type
+        if self.signal_code == BUY:
+            return (f"{self.company_name} shows a {signal_type} signal with confidence score "
+                    f"{self.confidence_score}/100. "
+                    f"Technical indicators suggest entry opportunity at {self.current_price:.2f}.")
+        if self.signal_code == SELL:
+            return (f"{self.company_name} shows a {signal_type} signal with confidence score "
+                    f"{self.confidence_score}/100. "
+                    f"Technical indicators suggest taking profits at {self.current_price:.2f}.")
+        return f"{self.company_name} is in a {signal_type} zone. Monitor for clearer directional signals."
+
+    def to_dict(self):
+        """Render the record as generate_signal does without timeframes or extended indicators"""
+        short_term, medium_term, stop_loss = self.targets()
+        return {
+            "ticker": self.ticker,
+            "company_name": self.company_name,
+            "signal_type": self.signal_type,
+            "confidence_score": self.confidence_score,
+            "title": self.title(),
+            "summary": self.summary(),
+            "key_points": self.key_points(),
+            "risks": self.risks(),
+            "action_suggestion": self.action_suggestion(),
+            "target_price": {
+                "short_term": round(short_term, 2),
+                "medium_term": round(medium_term, 2),
+                "stop_loss": round(stop_loss, 2)
+            },
+            "technical_details": {
+                "current_price": round(self.current_price, 2),
+                "rsi": round(self.rsi, 2) if self.rsi else None,
+                "macd": round(self.macd, 2) if self.macd else None,
+                "macd_signal": round(self.macd_signal, 2) if self.macd_signal else None,
+                "macd_histogram": round(self.macd_histogram, 2) if self.macd_histogram else None,
+                "ma20": round(self.ma20, 2) if self.ma20 else None,
+                "ma50": round(self.ma50, 2) if self.ma50 else None,
+                "ma200": round(self.ma200, 2) if self.ma200 else None,
+                "volume_ratio": round(self.volume_ratio, 2)
+            }
+        }
+
+def _optional(value):
+    """Return a float, or None for NaN"""
+    return None if np.isnan(value) else float(value)
+
+def signal_records(tickers, company_names, current_price, rsi, macd_line, macd_signal,
+                   macd_histogram, ma20, ma50, ma200, volume_ratio):
+    """Score N tickers at once and return their SignalRecords
+
+    Indicator arrays are aligned with `tickers`, with NaN (or None) for
+    missing values, as score_signals takes them.
+    """
+    columns = [np.asarray([np.nan if v is None else v for v in values], dtype=float)
+               if isinstance(values, (list, tuple)) else np.asarray(values, dtype=float)
+               for values in (current_price, rsi, macd_line, macd_signal, macd_histogram,
+                              ma20, ma50, ma200, volume_ratio)]
+    scores = score_signals(*columns)
+
+    records = []
+    for i, ticker in enumerate(tickers):
+        records.append(SignalRecord(
+            ticker, company_names[i], int(scores['signal_type'][i]),
+            int(scores['confidence_score'][i]), int(scores['reason_codes'][i]),
+            int(scores['risk_codes'][i]), float(columns[0][i]),
+            *(_optional(column[i]) for column in columns[1:8]), float(columns[8][i])
+        ))
+    return records
+
+def signal_record(ticker, company_name, current_price, rsi, macd_line, macd_signal,
+                  macd_histogram, ma20, ma50, ma200, volume_ratio):
+    """Build the SignalRecord of one ticker (same arguments as generate_signal)"""
+    return signal_records([ticker], [company_name], [current_price], [rsi], [macd_line],
+                          [macd_signal], [macd_histogram], [ma20], [ma50], [ma200],
+                          [volume_ratio])[0]
+
+def _sample_inputs(n, seed=0):
+    """Random generate_signal inputs covering every rule"""
+    rng = np.random.RandomState(seed)
+    price = 50 + rng.random_sample(n) * 200
+    macd_line = rng.randn(n)
+    macd_signal = macd_line + rng.randn(n) * 0.5
+    return {
+        'current_price': price,
+        'rsi': rng.random_sample(n) * 100,
+        'macd_line': macd_line,
+        'macd_signal': macd_signal,
+        'macd_histogram': macd_line - macd_signal,
+        'ma20': price * (1 + rng.randn(n) * 0.05),
+        'ma50': price * (1 + rng.randn(n) * 0.08),
+        'ma200': price * (1 + rng.randn(n) * 0.15),
+        'volume_ratio': rng.random_sample(n) * 2,
+    }
+
+def _traced_size(build):
+    """Return (result, bytes allocated by build() and still alive)"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+def compare_memory(n=2000):
+    """Print the memory held by N generate_signal dicts versus N SignalRecords"""
+    from market_watcher_real_data import generate_signal
+
+    inputs = _sample_inputs(n)
+    tickers = [f"T{i:04d}.PA" for i in range(n)]
+    names = [f"Company {i}" for i in range(n)]
+    rows = [[float(inputs[key][i]) for key in inputs] for i in range(n)]
+
+    dicts, dict_bytes = _traced_size(lambda: [
+        generate_signal(tickers[i], names[i], *rows[i]) for i in range(n)])
+    records, record_bytes = _traced_size(lambda: signal_records(tickers, names, *inputs.values()))
+
+    mismatches = sum(record.to_dict() != d for record, d in zip(records, dicts))
+
+    print(f"{n} signals:")
+    print(f"  dicts:   {dict_bytes / 1024:>10.1f} KB ({dict_bytes / n:.0f} bytes per signal)")
+    print(f"  records: {record_bytes / 1024:>10.1f} KB ({record_bytes / n:.0f} bytes per signal)")
+    print(f"  ratio:   {dict_bytes / record_bytes:>10.1f}x")
+    print(f"  to_dict() mismatches: {mismatches}")
+    return dict_bytes, record_bytes, mismatches
+
+def main():
+    """Main execution"""
+    if len(sys.argv) < 2 or sys.argv[1] != 'compare':
+        print(__doc__)
+        sys.exit(1)
+
+    compare_memory(int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
+
+if __name__ == "__main__":
+    main()
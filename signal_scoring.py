@@ -0,0 +1,179 @@
+"""
+Market Watcher PEA - Vectorized Signal Scoring
+Applies the generate_signal rule set to N tickers at once with boolean masks
+
+Inputs are 1-D arrays aligned by ticker, with NaN where generate_signal
+would receive None. The scorer reproduces generate_signal exactly,
+including its truthiness checks: an indicator equal to 0 is treated like a
+missing one (e.g. `if rsi and rsi < 30` skips an RSI of exactly 0, and a
+MACD histogram of exactly 0 is neither bullish nor bearish).
+"""
+
+import numpy as np
+
+# Signal type codes
+NEUTRAL = 0
+BUY = 1
+SELL = 2
+WATCH = 3
+SIGNAL_NAMES = ('neutral', 'buy', 'sell', 'watch')
+
+# Weights and thresholds hard-coded in generate_signal
+DEFAULT_SCORING_PARAMS = {
+    'weight_rsi_strong': 30,
+    'weight_rsi_weak': 15,
+    'weight_macd_crossover': 25,
+    'weight_macd_momentum': 10,
+    'weight_ma200': 20,
+    'weight_volume_surge': 15,
+    'weight_below_ma20': 10,
+    'weight_extended_ma20': 15,
+    'volume_surge_ratio': 1.3,
+    'volume_elevated_ratio': 1.2,
+    'signal_threshold': 40,
+    'watch_threshold': 30,
+}
+
+# Reason codes (key_points), in the order generate_signal appends them
+REASON_RSI_OVERSOLD = 1 << 0
+REASON_RSI_NEAR_OVERSOLD = 1 << 1
+REASON_MACD_BULLISH_CROSSOVER = 1 << 2
+REASON_MACD_POSITIVE = 1 << 3
+REASON_ABOVE_MA200 = 1 << 4
+REASON_VOLUME_SURGE = 1 << 5
+REASON_BELOW_MA20_HIGH_VOLUME = 1 << 6
+REASON_MIXED_SIGNALS = 1 << 7
+REASON_NEUTRAL_ZONE = 1 << 8
+
+# Risk codes (risks), in the order generate_signal appends them
+RISK_RSI_OVERBOUGHT = 1 << 0
+RISK_RSI_NEAR_OVERBOUGHT = 1 << 1
+RISK_MACD_BEARISH_CROSSOVER = 1 << 2
+RISK_MACD_NEGATIVE = 1 << 3
+RISK_BELOW_MA200 = 1 << 4
+RISK_EXTENDED_ABOVE_MA20 = 1 << 5
+RISK_GENERIC = 1 << 6
+
+REASON_NAMES = {
+    REASON_RSI_OVERSOLD: 'rsi_oversold',
+    REASON_RSI_NEAR_OVERSOLD: 'rsi_near_oversold',
+    REASON_MACD_BULLISH_CROSSOVER: 'macd_bullish_crossover',
+    REASON_MACD_POSITIVE: 'macd_positive',
+    REASON_ABOVE_MA200: 'above_ma200',
+    REASON_VOLUME_SURGE: 'volume_surge',
+    REASON_BELOW_MA20_HIGH_VOLUME: 'below_ma20_high_volume',
+    REASON_MIXED_SIGNALS: 'mixed_signals',
+    REASON_NEUTRAL_ZONE: 'neutral_zone',
+}
+
+RISK_NAMES = {
+    RISK_RSI_OVERBOUGHT: 'rsi_overbought',
+    RISK_RSI_NEAR_OVERBOUGHT: 'rsi_near_overbought',
+    RISK_MACD_BEARISH_CROSSOVER: 'macd_bearish_crossover',
+    RISK_MACD_NEGATIVE: 'macd_negative',
+    RISK_BELOW_MA200: 'below_ma200',
+    RISK_EXTENDED_ABOVE_MA20: 'extended_above_ma20',
+    RISK_GENERIC: 'generic',
+}
+
+def _truthy(values):
+    """Mask of values Python would treat as true (NaN stands for None)
+
+    NaN is truthy here, but every rule also compares the value, and NaN
+    comparisons are always false, so a NaN never triggers a rule.
+    """
+    return values != 0
+
+def score_signals(current_price, rsi, macd_line, macd_signal, macd_histogram,
+                  ma20, ma50, ma200, volume_ratio, params=None):
+    """Score N tickers at once with the generate_signal rules
+
+    `params` overrides entries of DEFAULT_SCORING_PARAMS (integer weights,
+    used by parameter sweeps); the defaults reproduce generate_signal.
+    Returns a dict of arrays: buy_score, sell_score, signal_type (codes
+    indexing SIGNAL_NAMES), confidence_score, reason_codes and risk_codes
+    (bitmasks of the REASON_* / RISK_* constants).
+    """
+    arrays = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (
+        current_price, rsi, macd_line, macd_signal, macd_histogram,
+        ma20, ma50, ma200, volume_ratio)))
+    current_price, rsi, macd_line, macd_signal, macd_histogram, ma20, ma50, ma200, volume_ratio = arrays
+    p = dict(DEFAULT_SCORING_PARAMS, **(params or {}))
+
+    with np.errstate(invalid='ignore'):
+        has_rsi = _truthy(rsi)
+        has_macd = _truthy(macd_histogram) & _truthy(macd_line) & _truthy(macd_signal)
+
+        # BUY rules
+        rsi_oversold = has_rsi & (rsi < 30)
+        rsi_near_oversold = ~rsi_oversold & has_rsi & (rsi < 40)
+        macd_bullish = has_macd & (macd_histogram > 0) & (macd_line > macd_signal)
+        macd_positive = ~macd_bullish & _truthy(macd_histogram) & (macd_histogram > 0)
+        above_ma200 = _truthy(ma200) & (current_price > ma200)
+        volume_surge = volume_ratio > p['volume_surge_ratio']
+        below_ma20_volume = _truthy(ma20) & (current_price < ma20) & (volume_ratio > p['volume_elevated_ratio'])
+
+        # SELL rules
+        rsi_overbought = has_rsi & (rsi > 70)
+        rsi_near_overbought = ~rsi_overbought & has_rsi & (rsi > 60)
+        macd_bearish = has_macd & (macd_histogram < 0) & (macd_line < macd_signal)
+        macd_negative = ~macd_bearish & _truthy(macd_histogram) & (macd_histogram < 0)
+        below_ma200 = _truthy(ma200) & (current_price < ma200)
+        extended_ma20 = _truthy(ma20) & (current_price > ma20) & has_rsi & (rsi > 65)
+
+    buy_score = (p['weight_rsi_strong'] * rsi_oversold + p['weight_rsi_weak'] * rsi_near_oversold
+                 + p['weight_macd_crossover'] * macd_bullish + p['weight_macd_momentum'] * macd_positive
+                 + p['weight_ma200'] * above_ma200 + p['weight_volume_surge'] * volume_surge
+                 + p['weight_below_ma20'] * below_ma20_volume)
+    sell_score = (p['weight_rsi_strong'] * rsi_overbought + p['weight_rsi_weak'] * rsi_near_overbought
+                  + p['weight_macd_crossover'] * macd_bearish + p['weight_macd_momentum'] * macd_negative
+                  + p['weight_ma200'] * below_ma200 + p['weight_extended_ma20'] * extended_ma20)
+    buy_score = np.asarray(buy_score).astype(np.int64)
+    sell_score = np.asarray(sell_score).astype(np.int64)
+
+    threshold = p['signal_threshold']
+    watch_threshold = p['watch_threshold']
+    is_buy = (buy_score > sell_score) & (buy_score >= threshold)
+    is_sell = ~is_buy & (sell_score > buy_score) & (sell_score >= threshold)
+    is_watch = ~is_buy & ~is_sell & ((buy_score >= watch_threshold) | (sell_score >= watch_threshold))
+
+    signal_type = np.full(buy_score.shape, NEUTRAL, dtype=np.int8)
+    signal_type[is_buy] = BUY
+    signal_type[is_sell] = SELL
+    signal_type[is_watch] = WATCH
+
+    confidence_score = np.zeros(buy_score.shape, dtype=np.int64)
+    confidence_score[is_buy] = np.minimum(buy_score[is_buy], 100)
+    confidence_score[is_sell] = np.minimum(sell_score[is_sell], 100)
+    confidence_score[is_watch] = np.maximum(buy_score, sell_score)[is_watch]
+
+    reason_codes = (REASON_RSI_OVERSOLD * rsi_oversold
+                    | REASON_RSI_NEAR_OVERSOLD * rsi_near_oversold
+                    | REASON_MACD_BULLISH_CROSSOVER * macd_bullish
+                    | REASON_MACD_POSITIVE * macd_positive
+                    | REASON_ABOVE_MA200 * above_ma200
+                    | REASON_VOLUME_SURGE * volume_surge
+                    | REASON_BELOW_MA20_HIGH_VOLUME * below_ma20_volume).astype(np.int32)
+    reason_codes[is_watch & (reason_codes == 0)] = REASON_MIXED_SIGNALS
+    reason_codes[signal_type == NEUTRAL] = REASON_NEUTRAL_ZONE
+
+    risk_codes = (RISK_RSI_OVERBOUGHT * rsi_overbought
+                  | RISK_RSI_NEAR_OVERBOUGHT * rsi_near_overbought
+                  | RISK_MACD_BEARISH_CROSSOVER * macd_bearish
+                  | RISK_MACD_NEGATIVE * macd_negative
+                  | RISK_BELOW_MA200 * below_ma200
+                  | RISK_EXTENDED_ABOVE_MA20 * extended_ma20).astype(np.int32)
+    risk_codes[risk_codes == 0] = RISK_GENERIC
+
+    return {
+        'buy_score': buy_score,
+        'sell_score': sell_score,
+        'signal_type': signal_type,
+        'confidence_score': confidence_score,
+        'reason_codes': reason_codes,
+        'risk_codes': risk_codes,
+    }
+
+def decode_codes(codes, names):
+    """Return the names of the bits set in a reason or risk bitmask, in order"""
+    return [name for bit, name in names.items() if codes & bit]
@@ -0,0 +1,306 @@
+"""
+Market Watcher PEA - Multi-Timeframe Bars
+Resamples the daily closes, highs, lows and volumes of the price store into
+weekly and monthly OHLCV bars, caches them between runs and, when new days arrive,
+only updates the trailing (partial) period and appends the new ones
+
+Weeks start on Monday and months are calendar months. Series stored
+without dates are cut into fixed blocks of 5 (weekly) and 21 (monthly)
+bars counted from their first bar. The open is the first close of the
+period; without daily highs and lows, high and low are the highest and
+lowest close.
+
+Cached bars keep the trailing daily closes and dates they were built from;
+when the history no longer matches them (an earlier bar corrected or
+backfilled), the bars are rebuilt, as indicator_state does for its state.
+
+Usage:
+    python timeframes.py check    # incremental updates against full rebuilds
+"""
+
+import os
+import sys
+
+import numpy as np
+
+from indicator_state import TAIL_LENGTH
+from price_store import NO_DATE
+
+TIMEFRAMES = ('weekly', 'monthly')
+# Bars per period for series stored without dates
+UNDATED_BLOCKS = {'weekly': 5, 'monthly': 21}
+BAR_FIELDS = ('period', 'open', 'high', 'low', 'close', 'volume')
+CACHE_VERSION = 3
+
+TREND_BULLISH = 'bullish'
+TREND_BEARISH = 'bearish'
+TREND_NEUTRAL = 'neutral'
+
+def dated_days(days):
+    """Return the days of a history when every bar is dated, else None"""
+    if days is None or np.any(np.asarray(days) == NO_DATE):
+        return None
+    return np.asarray(days, dtype=np.int64)
+
+def period_ids(timeframe, count, first_index=0, days=None):
+    """Period number of `count` consecutive days
+
+    `days` are days since epoch (None for undated bars); `first_index` is
+    the position of the first day in the ticker's history, so that undated
+    blocks stay aligned when the series grows.
+    """
+    if days is None:
+        return (first_index + np.arange(count)) // UNDATED_BLOCKS[timeframe]
+
+    if timeframe == 'weekly':
+        # 1970-01-01 was a Thursday: shift so that weeks start on Monday
+        return (days + 3) // 7
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+def aggregate_bars(ids, closes, volumes, highs=None, lows=None):
+    """Aggregate consecutive days sharing a period id into OHLCV bars"""
+    closes = np.asarray(closes, dtype=float)
+    highs = closes if highs is None else np.asarray(highs, dtype=float)
+    lows = closes if lows is None else np.asarray(lows, dtype=float)
+
+    starts = np.concatenate([[0], np.flatnonzero(ids[1:] != ids[:-1]) + 1])
+    ends = np.concatenate([starts[1:], [len(ids)]]) - 1
+    return {
+        'period': np.asarray(ids[starts], dtype=np.int64),
+        'open': closes[starts],
+        'high': np.maximum.reduceat(highs, starts),
+        'low': np.minimum.reduceat(lows, starts),
+        'close': closes[ends],
+        'volume': np.add.reduceat(np.asarray(volumes, dtype=float), starts),
+    }
+
+def build_bars(timeframe, closes, volumes, days=None, highs=None, lows=None):
+    """Build the bars of a ticker's whole daily history"""
+    if len(closes) == 0:
+        bars = {field: np.zeros(0) for field in BAR_FIELDS}
+        bars['period'] = np.zeros(0, dtype=np.int64)
+    else:
+        bars = aggregate_bars(period_ids(timeframe, len(closes), 0, dated_days(days)), closes, volumes,
+                              highs, lows)
+    _mark_tail(bars, closes, days)
+    return bars
+
+def _mark_tail(bars, closes, days):
+    """Remember the history the bars cover: its length and trailing closes and dates"""
+    days = dated_days(days)
+    bars['n_bars'] = len(closes)
+    bars['tail_closes'] = np.array(closes[-TAIL_LENGTH:], dtype=float)
+    bars['tail_days'] = np.zeros(0, dtype=np.int64) if days is None else days[-TAIL_LENGTH:].copy()
+
+def _tail_matches(bars, closes, days):
+    """True when the history still holds the trailing closes and dates of the cached bars"""
+    n_cached = bars['n_bars']
+    tail = bars['tail_closes']
+    if not np.array_equal(closes[n_cached-len(tail):n_cached], tail):
+        return False
+    days = dated_days(days)
+    if days is None:
+        return len(bars['tail_days']) == 0
+    return (len(bars['tail_days']) == len(tail)
+            and np.array_equal(days[n_cached-len(tail):n_cached], bars['tail_days']))
+
+def update_bars(timeframe, bars, closes, volumes, days=None, highs=None, lows=None):
+    """Bring cached bars up to date with a ticker's daily history
+
+    New days extend the trailing period while they fall in it and open new
+    periods after it; earlier bars are untouched. When the history no longer
+    extends the cached one (shortened, or its trailing closes or dates
+    rewritten), the bars are rebuilt. Returns (bars, rebuilt).
+    """
+    n_cached = bars['n_bars'] if bars else 0
+    if (not bars or n_cached == 0 or len(closes) < n_cached
+            or not _tail_matches(bars, closes, days)):
+        return build_bars(timeframe, closes, volumes, days, highs, lows), True
+
+    if len(closes) == n_cached:
+        return bars, False
+
+    new = slice(n_cached, None)
+    dated = dated_days(days)
+    ids = period_ids(timeframe, len(closes) - n_cached, n_cached, None if dated is None else dated[new])
+    added = aggregate_bars(ids, closes[new], volumes[new],
+                           None if highs is None else highs[new], None if lows is None else lows[new])
+
+    updated = {field: bars[field] for field in BAR_FIELDS}
+    if len(updated['period']) and added['period'][0] == updated['period'][-1]:
+        # Fold the first new period into the trailing one
+        for field in BAR_FIELDS:
+            updated[field] = updated[field].copy()
+        updated['high'][-1] = max(updated['high'][-1], added['high'][0])
+        updated['low'][-1] = min(updated['low'][-1], added['low'][0])
+        updated['close'][-1] = added['close'][0]
+        updated['volume'][-1] += added['volume'][0]
+        added = {field: added[field][1:] for field in BAR_FIELDS}
+
+    for field in BAR_FIELDS:
+        updated[field] = np.concatenate([updated[field], added[field]])
+    _mark_tail(updated, closes, days)
+    return updated, False
+
+def new_timeframe_cache():
+    """Return an empty cache: {timeframe: {ticker: bars}}"""
+    return {timeframe: {} for timeframe in TIMEFRAMES}
+
+def ticker_timeframe_bars(cache, ticker, market_data):
+    """Return {timeframe: bars} for a ticker, updating its cached bars
+
+    `market_data` is a load_yahoo_finance_data() dict (with 'dates' when
+    the history is dated).
+    """
+    result = {}
+    for timeframe in TIMEFRAMES:
+        bars, _ = update_bars(timeframe, cache[timeframe].get(ticker),
+                              np.asarray(market_data['prices'], dtype=float),
+                              np.asarray(market_data['volumes'], dtype=float),
+                              market_data.get('dates'), market_data.get('highs'),
+                              market_data.get('lows'))
+        cache[timeframe][ticker] = bars
+        result[timeframe] = bars
+    return result
+
+def cache_slice(cache, tickers):
+    """Return the part of a cache covering `tickers` (for a worker chunk)"""
+    return {timeframe: {ticker: by_ticker[ticker] for ticker in tickers if ticker in by_ticker}
+            for timeframe, by_ticker in cache.items()}
+
+def merge_cache(cache, chunk_cache):
+    """Merge a worker's updated bars back into the cache"""
+    for timeframe, by_ticker in chunk_cache.items():
+        cache[timeframe].update(by_ticker)
+
+def save_timeframe_cache(path, cache):
+    """Write the cache as flat columns per timeframe in one .npz file, atomically"""
+    arrays = {'version': CACHE_VERSION}
+    for timeframe, by_ticker in cache.items():
+        tickers = sorted(by_ticker)
+        bars = [by_ticker[ticker] for ticker in tickers]
+        arrays[f"{timeframe}_tickers"] = np.array(tickers, dtype=str)
+        arrays[f"{timeframe}_lengths"] = np.array([len(b['period']) for b in bars], dtype=np.int64)
+        arrays[f"{timeframe}_n_bars"] = np.array([b['n_bars'] for b in bars], dtype=np.int64)
+        for tail in ('tail_closes', 'tail_days'):
+            arrays[f"{timeframe}_{tail}_lengths"] = np.array([len(b[tail]) for b in bars], dtype=np.int64)
+            arrays[f"{timeframe}_{tail}"] = (np.concatenate([b[tail] for b in bars]) if bars
+                                             else np.zeros(0))
+        for field in BAR_FIELDS:
+            arrays[f"{timeframe}_{field}"] = (np.concatenate([b[field] for b in bars]) if bars
+                                              else np.zeros(0))
+
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+def load_timeframe_cache(path):
+    """Read the cache, or an empty one when missing or outdated"""
+    cache = new_timeframe_cache()
+    if not os.path.exists(path):
+        return cache
+
+    try:
+        with np.load(path) as data:
+            if int(data['version']) != CACHE_VERSION:
+                return cache
+            for timeframe in TIMEFRAMES:
+                if f"{timeframe}_tickers" not in data.files:
+                    continue
+                offsets = np.concatenate([[0], np.cumsum(data[f"{timeframe}_lengths"])])
+                columns = {field: data[f"{timeframe}_{field}"] for field in BAR_FIELDS}
+                tails = {tail: (data[f"{timeframe}_{tail}"],
+                                np.concatenate([[0], np.cumsum(data[f"{timeframe}_{tail}_lengths"])]))
+                         for tail in ('tail_closes', 'tail_days')}
+                for i, ticker in enumerate(data[f"{timeframe}_tickers"].tolist()):
+                    bars = {field: columns[field][offsets[i]:offsets[i+1]] for field in BAR_FIELDS}
+                    bars['period'] = bars['period'].astype(np.int64)
+                    bars['n_bars'] = int(data[f"{timeframe}_n_bars"][i])
+                    for tail, (values, tail_offsets) in tails.items():
+                        bars[tail] = values[tail_offsets[i]:tail_offsets[i+1]]
+                    bars['tail_days'] = bars['tail_days'].astype(np.int64)
+                    cache[timeframe][ticker] = bars
+    except Exception as e:
+        print(f"  WARNING: Could not read timeframe cache ({e}), rebuilding")
+        return new_timeframe_cache()
+
+    return cache
+
+def timeframe_trend(indicators):
+    """Trend of a timeframe from its MACD histogram and the close against MA20
+
+    Each indicator votes up or down (missing ones abstain).
+    """
+    votes = 0
+    histogram = indicators['macd_histogram']
+    if histogram:
+        votes += 1 if histogram > 0 else -1
+    ma20 = indicators['ma20']
+    if ma20:
+        votes += 1 if indicators['close'] > ma20 else -1
+
+    if votes > 0:
+        return TREND_BULLISH
+    if votes < 0:
+        return TREND_BEARISH
+    return TREND_NEUTRAL
+
+def _same_bars(a, b):
+    """True when two sets of bars are equal field by field"""
+    return all(np.array_equal(a[field], b[field]) for field in BAR_FIELDS)
+
+def check_updates(n_days=400):
+    """Check update_bars against build_bars on appended and rewritten histories
+
+    Covers dated and undated series: appending days must update the bars
+    in place, while correcting an earlier close, backfilling a missing day
+    or shifting the dates must rebuild them. Returns True when every case
+    passes.
+    """
+    rng = np.random.RandomState(0)
+    closes = 100 * np.cumprod(1 + rng.randn(n_days) * 0.01)
+    volumes = rng.randint(1000, 5000, n_days).astype(float)
+    # Business days from a Monday, with one holiday to backfill later
+    weekdays = np.arange(20004, 20004 + n_days * 7 // 5 + 7)
+    weekdays = weekdays[(weekdays + 3) % 7 < 5]
+    holiday = n_days - 30
+    calendar = np.delete(weekdays, holiday)[:n_days]
+    backfilled = weekdays[:n_days]
+
+    corrected = closes.copy()
+    corrected[n_days - 20] *= 1.05
+    cases = (
+        # (case, cached history, updated history, whether it must rebuild)
+        ("append 12 days", closes[:-12], calendar[:-12], closes, calendar, False),
+        ("correct an earlier close", closes[:-12], calendar[:-12], corrected, calendar, True),
+        ("backfill a missing day", closes[:-12], calendar[:-12], closes, backfilled, True),
+        ("shift the dates", closes[:-12], calendar[:-12], closes, calendar + 1, True),
+        ("undated, append 12 days", closes[:-12], None, closes, None, False),
+        ("undated, correct an earlier close", closes[:-12], None, corrected, None, True),
+    )
+
+    ok = True
+    for timeframe in TIMEFRAMES:
+        for name, cached_closes, cached_days, new_closes, new_days, expect_rebuild in cases:
+            n_cached = len(cached_closes)
+            cached = build_bars(timeframe, cached_closes, volumes[:n_cached], cached_days)
+            updated, rebuilt = update_bars(timeframe, cached, new_closes, volumes, new_days)
+            expected = build_bars(timeframe, new_closes, volumes, new_days)
+            passed = rebuilt == expect_rebuild and _same_bars(updated, expected)
+            ok = ok and passed
+            print(f"  {timeframe:<8} {name:<36} {'rebuilt' if rebuilt else 'updated':<8} "
+                  f"{'OK' if passed else 'FAILED'}")
+
+    return ok
+
+def main():
+    """Main execution"""
+    if len(sys.argv) != 2 or sys.argv[1] != 'check':
+        print(__doc__)
+        sys.exit(1)
+
+    if not check_updates():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
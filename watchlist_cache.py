@@ -0,0 +1,108 @@
+"""
+Market Watcher PEA - Watchlist Cache
+Caches the parsed Watchlist/Indicateurs tables of the Excel workbook in a
+pickle next to it, so the workbook is only re-read when it changes
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+CACHE_VERSION = 1
+
+def cache_paths(excel_file):
+    """Return the (data, metadata) cache file paths for a workbook"""
+    return f"{excel_file}.cache.pkl", f"{excel_file}.cache.json"
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_meta(meta_file):
+    """Read the cache metadata, or None when missing or outdated"""
+    try:
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    return meta
+
+def _write_meta(meta_file, meta):
+    """Write the cache metadata atomically"""
+    tmp_file = f"{meta_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_file, meta_file)
+
+def _read_tables(data_file):
+    """Read the cached tables, or None when the pickle is missing or unreadable"""
+    try:
+        with open(data_file, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+def cached_parse_watchlist(excel_file, parse_watchlist):
+    """Return parse_watchlist(excel_file), served from the cache when possible
+
+    The cache is valid when the workbook's mtime and size are unchanged, or
+    when they changed but its content hash did not (e.g. a copy or touch).
+    Any other change, or an unreadable cache, re-reads the workbook.
+    """
+    data_file, meta_file = cache_paths(excel_file)
+
+    try:
+        stat = os.stat(excel_file)
+    except OSError:
+        # Let the parser report the missing workbook
+        return parse_watchlist(excel_file)
+
+    meta = _read_meta(meta_file)
+    content_hash = None
+    reason = None
+
+    if meta and meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+        reason = "mtime unchanged"
+    elif meta:
+        content_hash = file_sha256(excel_file)
+        if meta['sha256'] == content_hash:
+            reason = "content unchanged"
+
+    if reason:
+        tables = _read_tables(data_file)
+        if tables is not None:
+            if reason == "content unchanged":
+                meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                _write_meta(meta_file, meta)
+            active_tickers, indicateurs_df = tables
+            print(f"Watchlist cache hit ({reason}): {len(active_tickers)} active tickers")
+            return active_tickers, indicateurs_df
+
+    print(f"Watchlist cache miss: reading {os.path.basename(excel_file)}")
+    active_tickers, indicateurs_df = parse_watchlist(excel_file)
+
+    if content_hash is None:
+        content_hash = file_sha256(excel_file)
+
+    try:
+        tmp_file = f"{data_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump((active_tickers, indicateurs_df), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, data_file)
+        _write_meta(meta_file, {
+            'version': CACHE_VERSION,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': content_hash,
+        })
+    except OSError as e:
+        print(f"  WARNING: Could not write watchlist cache: {e}")
+
+    return active_tickers, indicateurs_df